@@ -0,0 +1,129 @@
+"""
+Microbenchmark of PowerBI querydata decoding.
+
+    python -m benchmarks.decode --dnis 1,50,500
+
+Compares ``json.loads`` + ``_extract_rows`` (what ``response.json()`` did)
+with ``_parse_querydata`` + ``_extract_rows`` on synthetic responses shaped
+like PowerBI's, including the descriptor and metrics blocks.
+"""
+
+import argparse
+import json
+import timeit
+from typing import Optional
+
+from benchmarks.stubs import gaso_values
+from vcc_totem.clients import gaso
+from vcc_totem.clients.gaso import FIELD_NAMES, _extract_rows, _parse_querydata
+
+
+def querydata_body(dnis: int) -> bytes:
+    """A batch answer for ``dnis`` clients, serialized like PowerBI does."""
+    schema = [{"N": "G0", "T": 1}] + [
+        {"N": f"M{i}", "T": 1} for i in range(len(FIELD_NAMES))
+    ]
+    dm0: list[dict] = []
+    for i in range(dnis):
+        dni = str(10000000 + i)
+        values = gaso_values(dni)
+        row: dict = {"C": [dni] + [values[name] for name in FIELD_NAMES]}
+        if i == 0:
+            row["S"] = schema
+        elif i % 3 == 0:
+            # Same district as the previous row, compressed away
+            row["C"].pop()
+            row["R"] = 1 << len(FIELD_NAMES)
+        dm0.append(row)
+
+    descriptor = {
+        "Select": [
+            {
+                "Kind": 2,
+                "Value": f"M{i}",
+                "Name": f"Medidas.{name}",
+                "Format": "0",
+            }
+            for i, name in enumerate(FIELD_NAMES)
+        ],
+        "Expressions": {
+            "Primary": {
+                "Groupings": [
+                    {"Keys": [{"Source": {"Entity": "BD", "Property": "DNI"}}]}
+                ]
+            }
+        },
+        "Version": 2,
+    }
+    metrics = {
+        "Version": "1.0.0",
+        "Events": [
+            {
+                "Id": f"{i:08X}-0000-0000-0000-000000000000",
+                "Name": "Execute Semantic Query",
+                "Component": "DSE",
+                "Start": "2026-01-01T00:00:00.000Z",
+                "End": "2026-01-01T00:00:00.100Z",
+                "Metrics": {"RowCount": dnis, "QueryText": "EVALUATE " + "x" * 400},
+            }
+            for i in range(20)
+        ],
+    }
+    response = {
+        "jobIds": ["00000000-0000-0000-0000-000000000000"],
+        "results": [
+            {
+                "jobId": "00000000-0000-0000-0000-000000000000",
+                "result": {
+                    "data": {
+                        "timestamp": "2026-01-01T00:00:00.000Z",
+                        "descriptor": descriptor,
+                        "dsr": {
+                            "Version": 2,
+                            "MinorVersion": 1,
+                            "DS": [{"N": "DS0", "PH": [{"DM0": dm0}], "IC": True}],
+                        },
+                        "metrics": metrics,
+                    }
+                },
+            }
+        ],
+    }
+    return json.dumps(response, separators=(",", ":")).encode("utf-8")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--dnis", type=lambda v: [int(n) for n in v.split(",")], default=[1, 50, 500]
+    )
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    decoders = {
+        "response.json()": lambda body: _extract_rows(json.loads(body)),
+        "_parse_querydata": lambda body: _extract_rows(_parse_querydata(body)),
+    }
+    print(f"orjson: {'yes' if gaso.orjson is not None else 'no'}")
+
+    for dnis in args.dnis:
+        body = querydata_body(dnis)
+        expected = decoders["response.json()"](body)
+        number = max(1, 20000 // (dnis + 10))
+
+        print(f"\n{dnis} DNIs, {len(body) / 1024:.1f} KiB")
+        best = dict.fromkeys(decoders, float("inf"))
+        # Interleaved, so a noisy moment does not favour one decoder
+        for _ in range(args.repeat):
+            for name, decode in decoders.items():
+                assert decode(body) == expected, f"{name} decoded different rows"
+                elapsed = timeit.timeit(lambda: decode(body), number=number)
+                best[name] = min(best[name], elapsed / number * 1e6)
+
+        baseline = best["response.json()"]
+        for name, per_call in best.items():
+            print(f"  {name:<18} {per_call:10.1f} µs  x{baseline / per_call:.2f}")
+
+
+if __name__ == "__main__":
+    main()
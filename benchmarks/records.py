@@ -0,0 +1,88 @@
+"""
+Memory held per cached result: QueryResult vs ClientRecord.
+
+    python -m benchmarks.records --count 100000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from typing import Callable, Optional
+
+from benchmarks.stubs import fnb_response, gaso_values
+from vcc_totem.clients.gaso import _build_client_data
+from vcc_totem.models import ClientRecord, QueryResult
+
+
+def fnb_result(i: int) -> QueryResult:
+    dni = str(10000000 + i * 3 + 2)
+    data = fnb_response(dni)["data"]
+    data["segmento"] = "fnb"
+    return QueryResult(
+        success=True,
+        dni=dni,
+        channel="fnb",
+        data=data,
+        has_offer=True,
+        status="success",
+    )
+
+
+def gaso_result(i: int) -> QueryResult:
+    dni = str(10000000 + i * 3)
+    return QueryResult(
+        success=True,
+        dni=dni,
+        channel="gaso",
+        data=_build_client_data(dni, gaso_values(dni)),
+        has_offer=True,
+        status="success",
+        fallback_mode="sequential",
+    )
+
+
+def not_found_result(i: int) -> QueryResult:
+    return QueryResult(
+        success=False,
+        dni=str(10000000 + i * 3 + 1),
+        channel="gaso",
+        error_message="Client not found in GASO",
+        status="not_found",
+        fallback_mode="sequential",
+    )
+
+
+KINDS = {"fnb": fnb_result, "gaso": gaso_result, "not_found": not_found_result}
+
+
+def retained_bytes(count: int, build: Callable[[int], object]) -> float:
+    """Bytes per object still allocated once ``count`` of them are built."""
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(count)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del kept
+    return used / count
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    for kind, build in KINDS.items():
+        result = retained_bytes(args.count, build)
+        record = retained_bytes(
+            args.count, lambda i: ClientRecord.from_result(build(i))
+        )
+        print(
+            f"{kind:<10} QueryResult {result:7.0f} B  ClientRecord {record:7.0f} B"
+            f"  -{(1 - record / result) * 100:.0f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
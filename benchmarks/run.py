@@ -0,0 +1,215 @@
+"""
+Offline benchmark of query_with_fallback and the FastAPI app against stubs.
+
+    python -m benchmarks.run --profile realistic --concurrency 1,8,32
+    python -m benchmarks.run --compare benchmarks/results/<previous>.json
+
+Results are written to benchmarks/results/ as JSON, named after the commit.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.stubs import PROFILES, StubServer, environment
+
+RESULTS_DIR = Path(__file__).parent / "results"
+FIRST_DNI = 10000000
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = _parse_args(argv)
+    server = StubServer(PROFILES[args.profile]).start()
+    # vcc_totem reads its configuration at import time
+    os.environ.update(environment(server))
+    # Per-request log lines would dominate the timings
+    logging.disable(logging.INFO)
+
+    runs = []
+    try:
+        for mode in args.modes:
+            for concurrency in args.concurrency:
+                run = BENCHMARKS[mode](args.requests, concurrency, args.use_cache)
+                run.update(mode=mode, concurrency=concurrency)
+                runs.append(run)
+                _print_run(run)
+    finally:
+        server.stop()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "profile": args.profile,
+        "requests": args.requests,
+        "use_cache": args.use_cache,
+        "stub_requests": server.requests,
+        "runs": runs,
+    }
+    path = _save(report, args.output)
+    print(f"\nSaved {path}")
+
+    if args.compare:
+        _compare(json.loads(Path(args.compare).read_text()), report)
+
+
+def bench_fallback(requests: int, concurrency: int, use_cache: bool) -> dict:
+    """Drive query_with_fallback from a thread pool, like the bulk runner."""
+    from vcc_totem.core.query import query_with_fallback
+
+    def one(dni: str) -> tuple[float, bool]:
+        start = time.perf_counter()
+        result = query_with_fallback(dni, use_cache=use_cache)
+        ok = result.success or result.status == "not_found"
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(one, _dnis(requests)))
+    return _summarize(samples, time.perf_counter() - start)
+
+
+def bench_api(requests: int, concurrency: int, use_cache: bool) -> dict:
+    """POST /query to the in-process FastAPI app over an ASGI transport."""
+    import httpx
+
+    from vcc_totem.api_wrapper import app
+
+    async def run() -> tuple[list, float]:
+        semaphore = asyncio.Semaphore(concurrency)
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+
+            async def one(dni: str) -> tuple[float, bool]:
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post(
+                        "/query", json={"dni": dni, "use_cache": use_cache}
+                    )
+                    elapsed = time.perf_counter() - start
+                    if response.status_code != 200:
+                        return elapsed, False
+                    # As in bench_fallback: a 200 can still carry a failed lookup
+                    result = response.json()
+                    ok = result["success"] or result["status"] == "not_found"
+                    return elapsed, ok
+
+            start = time.perf_counter()
+            samples = await asyncio.gather(*(one(dni) for dni in _dnis(requests)))
+            return samples, time.perf_counter() - start
+
+    samples, elapsed = asyncio.run(run())
+    return _summarize(samples, elapsed)
+
+
+BENCHMARKS = {"fallback": bench_fallback, "api": bench_api}
+
+
+def _dnis(requests: int) -> list[str]:
+    return [str(FIRST_DNI + i) for i in range(requests)]
+
+
+def _summarize(samples: list[tuple[float, bool]], elapsed: float) -> dict:
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    cuts = (
+        statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    )
+
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, ok in samples if not ok),
+        "p50_ms": round(cuts[49], 1),
+        "p95_ms": round(cuts[94], 1),
+        "p99_ms": round(cuts[98], 1),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+    }
+
+
+def _print_run(run: dict) -> None:
+    print(
+        f"{run['mode']:<9} c={run['concurrency']:<4} "
+        f"p50={run['p50_ms']:>8.1f}ms p95={run['p95_ms']:>8.1f}ms "
+        f"p99={run['p99_ms']:>8.1f}ms {run['throughput_rps']:>8.1f} req/s "
+        f"errors={run['errors']}"
+    )
+
+
+def _compare(before: dict, after: dict) -> None:
+    print(f"\nvs {before['commit']} ({before['profile']})")
+    previous = {(r["mode"], r["concurrency"]): r for r in before["runs"]}
+
+    for run in after["runs"]:
+        old = previous.get((run["mode"], run["concurrency"]))
+        if old is None:
+            continue
+        deltas = ", ".join(
+            f"{key} {_delta(old[key], run[key])}"
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+        )
+        print(f"{run['mode']:<9} c={run['concurrency']:<4} {deltas}")
+
+
+def _delta(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _save(report: dict, output: Optional[str]) -> Path:
+    if output:
+        path = Path(output)
+    else:
+        stamp = report["timestamp"].replace(":", "").replace("-", "")
+        path = RESULTS_DIR / f"{stamp}-{report['commit']}-{report['profile']}.json"
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return path
+
+
+def _parse_args(argv: Optional[list[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="realistic")
+    parser.add_argument(
+        "--modes",
+        type=lambda v: v.split(","),
+        default=["fallback", "api"],
+        help="Comma separated: fallback, api",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=lambda v: [int(c) for c in v.split(",")],
+        default=[1, 8, 32],
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--use-cache", action="store_true")
+    parser.add_argument("--output", help="Result file, default benchmarks/results/")
+    parser.add_argument("--compare", help="Previous result file to diff against")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main()
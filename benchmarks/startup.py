@@ -0,0 +1,100 @@
+"""
+Import time of the CLI entry point, checked against a budget.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget-ms 250 --runs 9
+
+Exits with status 1 when the median import time of vcc_totem.main is over
+budget, and lists the heaviest imports of the slowest module tree.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+MODULE = "vcc_totem.main"
+# Median import time before the async clients, metrics and cache tiers, on the
+# reference machine; asyncio (~30 ms) is the only growth accepted since
+BASELINE_MS = 203
+BUDGET_MS = round(BASELINE_MS * 1.2)
+
+# Loaded on demand; the one-shot CLI must not import them up front
+LAZY_MODULES = (
+    "httpx",
+    "fastapi",
+    "uvicorn",
+    "jwt",
+    "prometheus_client",
+    "vcc_totem.clients.gaso",
+)
+
+
+def import_times(module: str = MODULE) -> dict[str, float]:
+    """Cumulative import time in ms per module, from ``python -X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def loaded_modules(module: str = MODULE) -> set[str]:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; print('\\n'.join(sys.modules))",
+        ],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(result.stdout.split())
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    # The first run warms the bytecode cache
+    import_times()
+    runs = [import_times() for _ in range(args.runs)]
+    median = statistics.median(run[MODULE] for run in runs)
+
+    slowest = max(runs, key=lambda run: run[MODULE])
+    print(f"Heaviest imports under {MODULE}:")
+    for name, ms in sorted(slowest.items(), key=lambda kv: -kv[1])[1 : args.top + 1]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    eager = sorted(m for m in LAZY_MODULES if m in loaded_modules())
+    if eager:
+        print(f"\nLoaded eagerly: {', '.join(eager)}")
+
+    print(
+        f"\n{MODULE}: {median:.1f} ms median of {args.runs} (budget {args.budget_ms:.0f} ms)"
+    )
+    if median > args.budget_ms or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Local stand-ins for the FNB login, FNB credit line and PowerBI querydata APIs.
+
+Every DNI gets a fixed outcome from ``int(dni) % 3``: 0 is an FNB client
+with an offer, 1 is only found in GASO, 2 is found nowhere.
+"""
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import jwt
+
+LOGIN_PATH = "/FNB_Services/api/Seguridad/autenticar"
+CONSULTA_PATH = "/FNB_Services/api/financiamiento/lineaCredito"
+POWERBI_PATH = "/public/reports/querydata"
+
+
+@dataclass(frozen=True)
+class Profile:
+    """How one stub endpoint behaves: latency in seconds and failure rates."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+
+
+PROFILES = {
+    "fast": {},
+    "realistic": {
+        "login": Profile(latency=0.4, jitter=0.1),
+        "fnb": Profile(latency=0.25, jitter=0.1),
+        "powerbi": Profile(latency=0.15, jitter=0.05),
+    },
+    "flaky": {
+        "login": Profile(latency=0.4, jitter=0.1, error_rate=0.05),
+        "fnb": Profile(latency=0.25, jitter=0.1, error_rate=0.05),
+        "powerbi": Profile(latency=0.15, jitter=0.05, error_rate=0.05),
+    },
+    "throttled": {
+        "login": Profile(latency=0.4, jitter=0.1),
+        "fnb": Profile(latency=0.25, jitter=0.1, rate_limit_rate=0.2),
+        "powerbi": Profile(latency=0.15, jitter=0.05, rate_limit_rate=0.1),
+    },
+}
+
+
+def outcome(dni: str) -> str:
+    return ("fnb", "gaso", "none")[int(dni) % 3]
+
+
+def gaso_values(dni: str) -> dict:
+    return {
+        "Estado": "ACTIVO",
+        "Cliente": f"CLIENTE {dni}",
+        "Saldo": "1500.00",
+        "Cuenta_contrato": f"9{dni}",
+        "Dirección": "AV. STUB 123",
+        "Distrito": "LIMA",
+    }
+
+
+def powerbi_response(payload: dict) -> dict:
+    """Answer a querydata payload the way PowerBI shapes its DSR rows."""
+    command = payload["queries"][0]["Query"]["Commands"][0]
+    query = command["SemanticQueryDataShapeCommand"]["Query"]
+    measures = [s["Measure"]["Property"] for s in query["Select"] if "Measure" in s]
+    condition = query["Where"][0]["Condition"]
+
+    if "In" in condition:
+        dnis = [v[0]["Literal"]["Value"].strip("'") for v in condition["In"]["Values"]]
+        schema = [{"N": "G0"}] + [{"N": f"M{i}"} for i in range(len(measures))]
+        dm0: list[dict] = []
+        for dni in dnis:
+            if outcome(dni) == "gaso":
+                values = gaso_values(dni)
+                row: dict = {"C": [dni] + [values.get(m) for m in measures]}
+                if not dm0:
+                    row["S"] = schema
+                dm0.append(row)
+    else:
+        dni = condition["Contains"]["Right"]["Literal"]["Value"].strip("'")
+        dm0 = []
+        if outcome(dni) == "gaso":
+            values = gaso_values(dni)
+            dm0.append({f"M{i}": values.get(m) for i, m in enumerate(measures)})
+
+    ds = {"PH": [{"DM0": dm0}]}
+    return {"results": [{"result": {"data": {"dsr": {"DS": [ds]}}}}]}
+
+
+def fnb_response(dni: str) -> dict:
+    if outcome(dni) != "fnb":
+        return {"valid": False, "message": "Cliente no encontrado"}
+
+    return {
+        "valid": True,
+        "data": {
+            "nombre": f"CLIENTE {dni}",
+            "tieneLineaCredito": True,
+            "lineaCredito": 2500.0,
+        },
+    }
+
+
+def login_response() -> dict:
+    token = jwt.encode(
+        {"commercialAllyId": "1", "exp": int(time.time()) + 3600},
+        "stub",
+        algorithm="HS256",
+    )
+    return {"valid": True, "data": {"authToken": token}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle and the client's
+    # delayed ACK every keep-alive response would stall ~40 ms
+    disable_nagle_algorithm = True
+    server: "StubServer"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != CONSULTA_PATH:
+            return self._send(404, {})
+
+        dni = parse_qs(url.query).get("numeroDocumento", [""])[0]
+        self._respond("fnb", lambda: fnb_response(dni))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = urlparse(self.path).path
+
+        if path == LOGIN_PATH:
+            self._respond("login", login_response)
+        elif path == POWERBI_PATH:
+            self._respond("powerbi", lambda: powerbi_response(body))
+        else:
+            self._send(404, {})
+
+    def _respond(self, endpoint: str, build) -> None:
+        self.server.count(endpoint)
+        profile = self.server.profiles.get(endpoint, Profile())
+
+        delay = profile.latency + random.uniform(-profile.jitter, profile.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = random.random()
+        if roll < profile.rate_limit_rate:
+            return self._send(429, {"message": "Too many requests"})
+        if roll < profile.rate_limit_rate + profile.error_rate:
+            return self._send(500, {"message": "Stub error"})
+
+        self._send(200, build())
+
+    def _send(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """All three stub APIs on one local port, served from a daemon thread."""
+
+    daemon_threads = True
+
+    def __init__(self, profiles: Optional[dict[str, Profile]] = None, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.profiles = profiles or {}
+        self.requests: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def powerbi_url(self) -> str:
+        return self.base_url + POWERBI_PATH
+
+    def count(self, endpoint: str) -> None:
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def environment(server: StubServer) -> dict[str, str]:
+    """Environment variables pointing vcc_totem at a running StubServer."""
+    return {
+        "BASE_URL": server.base_url,
+        "LOGIN_API": LOGIN_PATH,
+        "CONSULTA_API": CONSULTA_PATH,
+        "POWERBI_API_URL": server.powerbi_url,
+        "CALIDDA_USUARIO": "bench",
+        "CALIDDA_PASSWORD": "bench",
+        "CALIDDA_CREDENTIALS": "",
+        "HTTP_RETRIES": "0",
+        "CACHE_BACKEND": "memory",
+    }
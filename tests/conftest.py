@@ -6,6 +6,8 @@ Our strategy is:
 """
 
 import json
+import socket
+import threading
 from pathlib import Path
 
 import pytest
@@ -33,6 +35,14 @@ def load_test_dnis():
     return dnis if dnis else ["44076453"]
 
 
+def reset_breakers():
+    """Close every circuit, so failures of one test never skip another's calls."""
+    from vcc_totem.clients.breaker import FNB_BREAKER, GASO_BREAKER, LOGIN_BREAKER
+
+    for breaker in (FNB_BREAKER, LOGIN_BREAKER, GASO_BREAKER):
+        breaker.reset()
+
+
 def _cache_path(dni, channel):
     return CACHE_DIR / f"{channel}_{dni}.json"
 
@@ -57,6 +67,7 @@ def fetch_gaso(dni):
 
     from vcc_totem.clients.gaso import query_credit_line
 
+    reset_breakers()
     data, status, error = query_credit_line(dni)
     result = {"dni": dni, "data": data, "status": status, "error": error}
     _save_cached(dni, "gaso", result)
@@ -71,6 +82,7 @@ def fetch_fnb(dni):
 
     from vcc_totem.clients import fnb, session
 
+    reset_breakers()
     try:
         sess, ally_id = session.get_session()
         data, status, error = fnb.query_credit_line(sess, dni, ally_id)
@@ -82,6 +94,13 @@ def fetch_fnb(dni):
     return result
 
 
+@pytest.fixture(autouse=True)
+def closed_breakers():
+    reset_breakers()
+    yield
+    reset_breakers()
+
+
 @pytest.fixture(scope="session")
 def test_dnis():
     """All DNIs from test_dnis.txt."""
@@ -98,3 +117,24 @@ def gaso_responses(test_dnis):
 def fnb_responses(test_dnis):
     """All FNB responses for test DNIs, cached."""
     return {dni: fetch_fnb(dni) for dni in test_dnis}
+
+
+@pytest.fixture
+def silent_server():
+    """URL of a server that never answers, and its accepted connection count."""
+    server = socket.create_server(("127.0.0.1", 0))
+    accepted = []
+
+    def accept():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            accepted.append(conn)
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}/", accepted
+    server.close()
+    for conn in accepted:
+        conn.close()
@@ -0,0 +1,69 @@
+"""
+Tests for the streaming /query/batch endpoint.
+
+Lookups are stubbed, no API calls.
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from vcc_totem import api_wrapper
+from vcc_totem.models import QueryResult
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def fake_query(dni, **kwargs):
+        if dni == "66666666":
+            raise RuntimeError("boom")
+        return QueryResult(
+            success=True, dni=dni, channel="fnb", data={"nombre": "X"}, status="success"
+        )
+
+    monkeypatch.setattr(api_wrapper, "query_with_fallback_async", fake_query)
+    # Without a ``with`` block the lifespan, and its background threads, never start
+    return TestClient(api_wrapper.app)
+
+
+def _lines(response):
+    body = response.text
+    assert body.endswith("\n")
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_batch_streams_one_ndjson_line_per_dni(client):
+    dnis = ["12345678", "87654321", "11223344"]
+
+    response = client.post("/query/batch", json={"dnis": dnis})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = _lines(response)
+    assert sorted(row["dni"] for row in rows) == sorted(dnis)
+    assert all(row["success"] for row in rows)
+
+
+def test_batch_rejects_an_invalid_dni(client):
+    response = client.post("/query/batch", json={"dnis": ["12345678", "12ab"]})
+
+    assert response.status_code == 400
+
+
+def test_batch_reports_failed_lookups_as_rows(client):
+    """One DNI raising does not end the stream for the others."""
+    response = client.post("/query/batch", json={"dnis": ["66666666", "12345678"]})
+
+    assert response.status_code == 200
+    rows = {row["dni"]: row for row in _lines(response)}
+    assert rows["66666666"]["success"] is False
+    assert rows["66666666"]["error"] == "Internal error"
+    assert rows["12345678"]["success"] is True
+
+
+def test_query_reports_the_lookup_status(client):
+    response = client.post("/query", json={"dni": "12345678"})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
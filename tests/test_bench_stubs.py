@@ -0,0 +1,47 @@
+"""
+Tests for the benchmark stubs: their PowerBI answers must decode like real ones.
+"""
+
+from benchmarks.stubs import (
+    StubServer,
+    environment,
+    gaso_values,
+    outcome,
+    powerbi_response,
+)
+from vcc_totem.clients.gaso import (
+    FIELD_NAMES,
+    VISUAL_IDS,
+    _build_batch_payload,
+    _build_measures_payload,
+    _extract_rows,
+)
+
+
+def test_measures_answer_decodes():
+    dni = "10000003"
+    assert outcome(dni) == "gaso"
+
+    payload = _build_measures_payload(dni, FIELD_NAMES, VISUAL_IDS.estado)
+    rows = _extract_rows(powerbi_response(payload))
+
+    expected = gaso_values(dni)
+    assert rows == [[expected.get(name) for name in FIELD_NAMES]]
+
+
+def test_batch_answer_only_has_gaso_clients():
+    dnis = ["10000000", "10000001", "10000002", "10000003"]
+
+    payload = _build_batch_payload(dnis, FIELD_NAMES, VISUAL_IDS.estado)
+    rows = _extract_rows(powerbi_response(payload))
+
+    assert [row[0] for row in rows] == ["10000000", "10000003"]
+
+
+def test_environment_keeps_default_rates():
+    """Benchmarks measure the shipped pacing, not a raised one."""
+    server = StubServer()
+    try:
+        assert not any(name.startswith("RATE_") for name in environment(server))
+    finally:
+        server.server_close()
@@ -0,0 +1,90 @@
+"""
+Tests for the per-channel circuit breakers.
+"""
+
+import time
+
+from vcc_totem.clients.breaker import CircuitBreaker
+from vcc_totem.core import query
+from vcc_totem.models import QueryResult
+
+
+def _open_breaker(open_seconds=60.0):
+    breaker = CircuitBreaker("t", failure_threshold=2, open_seconds=open_seconds)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("t", failure_threshold=3)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow() is False
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = _open_breaker(open_seconds=0.05)
+    time.sleep(0.06)
+
+    assert breaker.state == "half_open"
+    assert breaker.allow() is True
+    assert breaker.allow() is False, "only one probe at a time"
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = _open_breaker(open_seconds=0.05)
+    time.sleep(0.06)
+
+    assert breaker.allow() is True
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
+
+
+def test_fallback_skips_fnb_while_circuit_open(monkeypatch):
+    """With FNB open, GASO is queried directly and FNB is never called."""
+    monkeypatch.setattr(query, "FNB_BREAKER", _open_breaker())
+    monkeypatch.setattr(
+        query,
+        "query_fnb",
+        lambda dni, **kwargs: (_ for _ in ()).throw(AssertionError("FNB called")),
+    )
+    monkeypatch.setattr(
+        query,
+        "query_gaso",
+        lambda dni, **kwargs: QueryResult(
+            success=True, dni=dni, channel="gaso", data={"x": 1}, status="success"
+        ),
+    )
+
+    result = query.query_with_fallback("12345678", speculative=True)
+
+    assert result.channel == "gaso"
+    assert result.fallback_mode == "fnb_skipped"
+
+
+def test_reset_closes_the_circuit():
+    breaker = _open_breaker()
+
+    breaker.reset()
+
+    assert breaker.allow()
+    assert breaker.stats() == {
+        "rejected": 0,
+        "opened": 0,
+        "state": "closed",
+        "failures": 0,
+    }
@@ -0,0 +1,95 @@
+"""
+Tests for the resumable bulk extraction.
+
+Lookups are stubbed, no API calls.
+"""
+
+import json
+
+from vcc_totem.core import bulk
+from vcc_totem.models import QueryResult
+
+
+def _stub_lookups(monkeypatch, seen):
+    def fake_query(dni, **kwargs):
+        seen.append(dni)
+        return QueryResult(
+            success=True, dni=dni, channel="fnb", data={"nombre": "X"}, status="success"
+        )
+
+    monkeypatch.setattr(bulk, "query_with_fallback", fake_query)
+
+
+def test_bulk_writes_results(tmp_path, monkeypatch):
+    seen = []
+    _stub_lookups(monkeypatch, seen)
+    dnis = tmp_path / "dnis.txt"
+    dnis.write_text("# header\n12345678\n87654321, comment\nbad\n", encoding="utf-8")
+
+    stats = bulk.run_bulk(dnis, tmp_path / "out", workers=2)
+
+    rows = (tmp_path / "out" / bulk.RESULTS_FILE).read_text().splitlines()
+    assert sorted(json.loads(r)["dni"] for r in rows) == ["12345678", "87654321"]
+    assert stats["processed"] == 2
+    assert stats["invalid"] == 1
+    assert (tmp_path / "out" / bulk.CHECKPOINT_FILE).exists()
+
+
+def test_bulk_resumes_without_requerying(tmp_path, monkeypatch):
+    """DNIs already in results.jsonl are skipped on the next run."""
+    seen = []
+    _stub_lookups(monkeypatch, seen)
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / bulk.RESULTS_FILE).write_text(
+        json.dumps({"dni": "12345678", "success": True, "status": "success"})
+        + "\n"
+        + '{"dni": "8765',
+        encoding="utf-8",
+    )
+    dnis = tmp_path / "dnis.txt"
+    dnis.write_text("12345678\n87654321\n", encoding="utf-8")
+
+    bulk.run_bulk(dnis, out, workers=1)
+
+    assert seen == ["87654321"]
+    rows = (out / bulk.RESULTS_FILE).read_text().splitlines()
+    assert json.loads(rows[-1])["dni"] == "87654321"
+
+
+def test_bulk_retries_failed_lookups(tmp_path, monkeypatch):
+    """Only answers count as done, and the latest row for a DNI wins."""
+    rows = [
+        {"dni": "11111111", "success": False, "status": "not_found"},
+        {"dni": "22222222", "success": False, "status": "timeout"},
+        {"dni": "33333333", "success": True, "status": "success"},
+        {"dni": "33333333", "success": False, "status": "circuit_open"},
+        {"dni": "44444444", "success": False, "status": "error"},
+        {"dni": "44444444", "success": True, "status": "success"},
+    ]
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / bulk.RESULTS_FILE).write_text(
+        "".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8"
+    )
+    dnis = tmp_path / "dnis.txt"
+    dnis.write_text("11111111\n22222222\n33333333\n44444444\n", encoding="utf-8")
+    seen = []
+    _stub_lookups(monkeypatch, seen)
+
+    stats = bulk.run_bulk(dnis, out, workers=1)
+
+    assert sorted(seen) == ["22222222", "33333333"]
+    assert stats["resumed_from"] == 2
+
+
+def test_row_keeps_fallback_mode():
+    result = QueryResult(
+        success=True,
+        dni="12345678",
+        channel="gaso",
+        status="success",
+        fallback_mode="speculative",
+    )
+
+    assert bulk._to_row(result)["fallback_mode"] == "speculative"
@@ -0,0 +1,224 @@
+"""
+Tests for the in-process result cache.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from vcc_totem.models import QueryResult
+from vcc_totem.core.cache import (
+    CacheBackend,
+    MemoryBackend,
+    ResultCache,
+    SQLiteBackend,
+    TieredBackend,
+    classify,
+)
+
+TTLS = {"offer": 60, "no_offer": 60, "not_found": 30, "error": 0}
+
+
+def _offer(dni="12345678"):
+    return QueryResult(
+        success=True,
+        dni=dni,
+        channel="fnb",
+        data={"nombre": "JUAN"},
+        has_offer=True,
+        status="success",
+    )
+
+
+def _error(dni="12345678"):
+    return QueryResult(
+        success=False, dni=dni, channel="fnb", error_message="x", status="timeout"
+    )
+
+
+def test_classify():
+    assert classify(_offer()) == "offer"
+    assert classify(_error()) == "error"
+    not_found = QueryResult(success=False, dni="1", channel="gaso", status="not_found")
+    assert classify(not_found) == "not_found"
+
+
+def test_hit_after_set():
+    cache = ResultCache(TTLS)
+    cache.set(("12345678", "fnb"), _offer())
+
+    result, stale = cache.get(("12345678", "fnb"))
+
+    assert result.has_offer is True
+    assert stale is False
+    assert cache.stats()["hits"] == 1
+
+
+def test_errors_not_cached():
+    """A TTL of 0 means the outcome is never stored."""
+    cache = ResultCache(TTLS)
+    cache.set(("12345678", "fnb"), _error())
+
+    assert cache.get(("12345678", "fnb")) == (None, False)
+    assert cache.stats()["misses"] == 1
+
+
+def test_returns_copies():
+    """Callers mutating a cached result don't change the cache."""
+    cache = ResultCache(TTLS)
+    cache.set(("12345678", "fnb"), _offer())
+
+    first, _ = cache.get(("12345678", "fnb"))
+    first.fallback_mode = "speculative"
+    second, _ = cache.get(("12345678", "fnb"))
+
+    assert second.fallback_mode is None
+
+
+def test_lru_eviction_by_entries():
+    cache = ResultCache(TTLS, max_entries=2)
+    cache.set(("1", "fnb"), _offer("1"))
+    cache.set(("2", "fnb"), _offer("2"))
+    cache.get(("1", "fnb"))
+    cache.set(("3", "fnb"), _offer("3"))
+
+    assert cache.get(("2", "fnb"))[0] is None
+    assert cache.get(("1", "fnb"))[0] is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes():
+    cache = ResultCache(TTLS, max_bytes=1000)
+    for i in range(10):
+        cache.set((str(i), "fnb"), _offer(str(i)))
+
+    assert cache.stats()["bytes"] <= 1000
+    assert cache.stats()["entries"] < 10
+
+
+def test_stale_while_revalidate():
+    cache = ResultCache({"offer": 0.01}, stale_seconds=60)
+    cache.set(("1", "fnb"), _offer("1"))
+    time.sleep(0.02)
+
+    result, stale = cache.get(("1", "fnb"))
+
+    assert result is not None
+    assert stale is True
+    assert cache.begin_refresh(("1", "fnb")) is True
+    assert cache.begin_refresh(("1", "fnb")) is False
+
+
+def _shared_cache(path, **kwargs):
+    backend = TieredBackend(MemoryBackend(), SQLiteBackend(path, **kwargs))
+    return ResultCache(TTLS, backend=backend)
+
+
+def test_sqlite_shared_between_workers(tmp_path):
+    """A result stored by one worker is served to another."""
+    path = tmp_path / "results.sqlite3"
+    worker_a = _shared_cache(path)
+    worker_b = _shared_cache(path)
+
+    worker_a.set(("12345678", "gaso"), _offer())
+    result, _ = worker_b.get(("12345678", "gaso"))
+
+    assert result is not None
+    assert result.data == {"nombre": "JUAN"}
+
+
+def test_sqlite_compaction_caps_size(tmp_path):
+    backend = SQLiteBackend(tmp_path / "results.sqlite3", max_entries=5)
+    cache = ResultCache(TTLS, backend=backend)
+    for i in range(20):
+        cache.set((f"{i:08d}", "fnb"), _offer(f"{i:08d}"))
+
+    backend.compact()
+
+    assert backend.stats()["entries"] <= 5
+    assert cache.get(("00000019", "fnb"))[0] is not None
+
+
+def test_sqlite_warm_load(tmp_path):
+    path = tmp_path / "results.sqlite3"
+    _shared_cache(path).set(("12345678", "fnb"), _offer())
+
+    backend = TieredBackend(MemoryBackend(), SQLiteBackend(path))
+    assert backend.warm_load(100) == 1
+    assert backend.memory.get(("12345678", "fnb")) is not None
+
+
+def test_sqlite_async_calls_leave_the_event_loop(tmp_path, monkeypatch):
+    """File reads and writes from async callers run in worker threads."""
+    cache = _shared_cache(tmp_path / "results.sqlite3")
+    shared = cache.backend.shared
+    threads = []
+
+    for name in ("get", "set"):
+        original = getattr(shared, name)
+
+        def recording(*args, _original=original):
+            threads.append(threading.current_thread())
+            return _original(*args)
+
+        monkeypatch.setattr(shared, name, recording)
+
+    async def roundtrip():
+        await cache.set_async(("12345678", "gaso"), _offer())
+        cache.backend.memory.clear()
+        return await cache.get_async(("12345678", "gaso"))
+
+    result, stale = asyncio.run(roundtrip())
+
+    assert result is not None and not stale
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def test_sqlite_set_does_not_compact(tmp_path, monkeypatch):
+    backend = SQLiteBackend(tmp_path / "results.sqlite3", compact_interval=0)
+    monkeypatch.setattr(backend, "compact", lambda: 1 / 0)
+
+    ResultCache(TTLS, backend=backend).set(("12345678", "fnb"), _offer())
+
+    assert backend.stats()["entries"] == 1
+
+
+def test_sqlite_compactor_runs_in_background(tmp_path):
+    backend = SQLiteBackend(
+        tmp_path / "results.sqlite3", max_entries=5, compact_interval=0.01
+    )
+    cache = ResultCache(TTLS, backend=backend)
+    for i in range(20):
+        cache.set((f"{i:08d}", "fnb"), _offer(f"{i:08d}"))
+
+    backend.start_compactor()
+    try:
+        for _ in range(100):
+            if backend.stats()["entries"] <= 5:
+                break
+            time.sleep(0.01)
+    finally:
+        backend.stop_compactor()
+
+    assert backend.stats()["entries"] <= 5
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class NoStats(CacheBackend):
+        def get(self, key):
+            return None
+
+        def set(self, key, entry):
+            pass
+
+        def delete(self, key):
+            pass
+
+        def clear(self):
+            pass
+
+    with pytest.raises(TypeError):
+        NoStats()
@@ -0,0 +1,190 @@
+"""
+Tests for per-request deadlines across the FNB and GASO calls.
+"""
+
+import threading
+import time
+
+import requests
+
+from vcc_totem import deadline
+from vcc_totem.clients import fnb, gaso
+from vcc_totem.clients.breaker import FNB_BREAKER, GASO_BREAKER
+from vcc_totem.clients.ratelimit import GASO_RATE
+from vcc_totem.core import query
+from vcc_totem.models import QueryResult
+
+
+def test_nested_limit_only_shortens():
+    with deadline.limit(10):
+        with deadline.limit(60):
+            assert deadline.remaining() <= 10
+        with deadline.limit(1):
+            assert deadline.remaining() <= 1
+        with deadline.limit(None):
+            assert 1 < deadline.remaining() <= 10
+
+    assert deadline.remaining() is None
+
+
+def test_timeout_is_capped_by_remaining_budget():
+    assert deadline.timeout(300) == 300
+
+    with deadline.limit(2):
+        assert deadline.timeout(300) <= 2
+        assert deadline.timeout(0.5) == 0.5
+
+    with deadline.limit(0.001):
+        time.sleep(0.005)
+        assert deadline.expired()
+        assert deadline.timeout(300) == deadline.MIN_TIMEOUT
+
+
+def test_unbounded_drops_the_deadline():
+    with deadline.limit(1), deadline.unbounded():
+        assert deadline.remaining() is None
+
+
+def test_fnb_timeout_from_deadline_is_not_a_failure():
+    """A call cut short by our own budget does not count against FNB."""
+    seen = {}
+
+    class SlowSession:
+        def get(self, url, params, timeout):
+            seen["timeout"] = timeout
+            time.sleep(timeout)
+            raise requests.exceptions.Timeout()
+
+    failures = FNB_BREAKER.stats()["failures"]
+    with deadline.limit(0.05):
+        data, status, error = fnb.query_credit_line(SlowSession(), "12345678", "1")
+
+    assert seen["timeout"] <= 0.05
+    assert (data, status) == (None, deadline.EXCEEDED)
+    assert FNB_BREAKER.stats()["failures"] == failures
+
+
+def test_gaso_skips_calls_once_expired(monkeypatch):
+    def no_session():
+        raise AssertionError("PowerBI must not be called past the deadline")
+
+    monkeypatch.setattr(gaso.http, "get_session", no_session)
+
+    with deadline.limit(0.001):
+        time.sleep(0.005)
+        data, status, error = gaso.query_credit_line("12345678")
+
+    assert (data, status) == (None, deadline.EXCEEDED)
+
+
+def test_gaso_fields_cut_by_deadline_are_not_a_no_offer(monkeypatch):
+    """A Saldo lost to the deadline must not read as a client without credit."""
+
+    def cut_fields(dni):
+        time.sleep(0.005)
+        return {"Estado": "ACTIVO", "Cliente": "X", "Saldo": None}
+
+    monkeypatch.setattr(gaso, "_query_fields", cut_fields)
+
+    with deadline.limit(0.001):
+        data, status, error = gaso.query_credit_line("12345678")
+
+    assert (data, status) == (None, deadline.EXCEEDED)
+    result = query._gaso_result("12345678", data, status, error)
+    assert not result.success and not result.has_offer
+
+
+def test_fallback_returns_fnb_answer_when_out_of_time(monkeypatch):
+    def slow_fnb(dni, **kwargs):
+        time.sleep(0.02)
+        return QueryResult(success=False, dni=dni, channel="fnb", status="not_found")
+
+    def gaso_called(dni, **kwargs):
+        raise AssertionError("GASO must be skipped past the deadline")
+
+    monkeypatch.setattr(query, "query_fnb", slow_fnb)
+    monkeypatch.setattr(query, "query_gaso", gaso_called)
+
+    with deadline.limit(0.01):
+        result = query.query_with_fallback("12345678", speculative=False)
+
+    assert result.channel == "fnb"
+    assert result.fallback_mode == "deadline"
+
+
+def test_result_past_deadline_is_not_cached():
+    """It may be missing the fields of the calls that were skipped."""
+    key = ("87654321", "gaso")
+
+    def compute(dni):
+        time.sleep(0.02)
+        return QueryResult(success=True, dni=dni, channel="gaso", data={"x": 1})
+
+    with deadline.limit(0.01):
+        result = query._compute_and_store(key, compute, "87654321")
+
+    assert result.success
+    assert query.RESULT_CACHE.get(key) == (None, False)
+
+
+def test_gaso_call_cut_by_deadline_keeps_breaker_and_rate(silent_server, monkeypatch):
+    """The budget bounds the whole call, retries included, and is not a failure."""
+    url, _ = silent_server
+    monkeypatch.setattr(gaso, "CONFIG", gaso.PowerBIConfig(api_url=url))
+    breaker = GASO_BREAKER.stats()["failures"]
+    throttles = GASO_RATE.stats()["throttles"]
+
+    start = time.monotonic()
+    with deadline.limit(0.3):
+        data, status, error = gaso.query_credit_line("12345678")
+
+    assert time.monotonic() - start < 0.6
+    assert (data, status) == (None, deadline.EXCEEDED)
+    assert GASO_BREAKER.stats()["failures"] == breaker
+    assert GASO_RATE.stats()["throttles"] == throttles
+
+
+def _coalesced(leader_deadline, follower_deadline, work=0.1):
+    """Run a leader and a follower for the same key, return both results."""
+    runs = []
+
+    def compute(dni):
+        runs.append(None)
+        time.sleep(work)
+        status = deadline.EXCEEDED if deadline.expired() else "success"
+        return QueryResult(success=True, dni=dni, channel="gaso", status=status)
+
+    results = {}
+
+    def run(name, seconds):
+        with deadline.limit(seconds):
+            results[name] = query._cached("11223344", "gaso", compute, False)
+
+    leader = threading.Thread(target=run, args=("leader", leader_deadline))
+    leader.start()
+    time.sleep(0.02)
+    start = time.monotonic()
+    run("follower", follower_deadline)
+    waited = time.monotonic() - start
+    leader.join()
+    return results, runs, waited
+
+
+def test_follower_does_not_get_deadline_cut_result():
+    """A caller without a deadline recomputes instead of sharing a cut result."""
+    results, runs, _ = _coalesced(leader_deadline=0.05, follower_deadline=None)
+
+    assert results["leader"].status == deadline.EXCEEDED
+    assert results["follower"].status == "success"
+    assert len(runs) == 2
+
+
+def test_follower_wait_is_bounded_by_its_own_deadline():
+    results, runs, waited = _coalesced(
+        leader_deadline=None, follower_deadline=0.05, work=0.3
+    )
+
+    assert results["follower"].status == deadline.EXCEEDED
+    assert waited < 0.2
+    assert results["leader"].status == "success"
+    assert len(runs) == 1
@@ -4,8 +4,16 @@ Tests for the fallback mechanism.
 FNB first, then GASO if not found.
 """
 
+import asyncio
+import time
+
 from vcc_totem.models import QueryResult
-from vcc_totem.core.query import query_with_fallback, query_fnb, query_gaso
+from vcc_totem.core.query import (
+    query_with_fallback,
+    query_with_fallback_async,
+    query_fnb,
+    query_gaso,
+)
 
 
 def test_query_result_found_client():
@@ -50,9 +58,83 @@ def test_fallback_returns_result(test_dnis):
     assert result.channel in ["fnb", "gaso"]
 
 
+def test_async_fallback_returns_result(test_dnis):
+    """query_with_fallback_async returns QueryResult."""
+    result = asyncio.run(query_with_fallback_async(test_dnis[0]))
+
+    assert isinstance(result, QueryResult)
+    assert result.channel in ["fnb", "gaso"]
+
+
 def test_fallback_invalid_dni_no_crash():
     """Fallback handles invalid DNI gracefully."""
     result = query_with_fallback("00000000")
 
     assert isinstance(result, QueryResult)
     # Should not crash, just return failure
+
+
+def test_speculative_prefers_fnb(monkeypatch):
+    """Speculative mode still returns FNB when it finds the client."""
+    from vcc_totem.core import query
+
+    fnb_hit = QueryResult(success=True, dni="123", channel="fnb", data={"x": 1})
+    monkeypatch.setattr(query, "query_fnb", lambda dni, **kwargs: fnb_hit)
+    monkeypatch.setattr(
+        query,
+        "query_gaso",
+        lambda dni, **kwargs: QueryResult(
+            success=True, dni=dni, channel="gaso", data={}
+        ),
+    )
+
+    result = query_with_fallback("123", speculative=True)
+
+    assert result.channel == "fnb"
+    assert result.fallback_mode == "speculative"
+
+
+def test_speculative_falls_back_to_gaso(monkeypatch):
+    """Speculative mode returns GASO on an FNB miss."""
+    from vcc_totem.core import query
+
+    monkeypatch.setattr(
+        query,
+        "query_fnb",
+        lambda dni, **kwargs: QueryResult(success=False, dni=dni, channel="fnb"),
+    )
+    monkeypatch.setattr(
+        query,
+        "query_gaso",
+        lambda dni, **kwargs: QueryResult(
+            success=True, dni=dni, channel="gaso", data={}
+        ),
+    )
+
+    result = query_with_fallback("123", speculative=True)
+
+    assert result.channel == "gaso"
+    assert result.fallback_mode == "speculative"
+    assert result.wasted_seconds == 0.0
+
+
+def test_speculative_waste_is_gaso_own_time(monkeypatch):
+    """A GASO lookup that finished early wasted only its own duration."""
+    from vcc_totem.core import query
+
+    def slow_fnb(dni, **kwargs):
+        time.sleep(0.2)
+        return QueryResult(success=True, dni=dni, channel="fnb", data={"x": 1})
+
+    def fast_gaso(dni, **kwargs):
+        time.sleep(0.01)
+        return QueryResult(success=True, dni=dni, channel="gaso", data={})
+
+    monkeypatch.setattr(query, "SPECULATIVE_HEDGE_DELAY", "0")
+    monkeypatch.setattr(query, "query_fnb", slow_fnb)
+    monkeypatch.setattr(query, "query_gaso", fast_gaso)
+
+    result = query_with_fallback("123", speculative=True)
+
+    assert result.channel == "fnb"
+    assert 0.01 <= result.wasted_seconds < 0.1
@@ -23,6 +23,9 @@ def test_fnb_status_valid(fnb_responses):
         "timeout",
         "session_expired",
         "rate_limited",
+        "circuit_open",
+        "deadline_exceeded",
+        "throttled",
     }
     for dni, resp in fnb_responses.items():
         assert resp["status"] in valid, (
@@ -12,7 +12,15 @@ def test_gaso_responds(gaso_responses):
 
 def test_gaso_status_valid(gaso_responses):
     """Status is always one of expected values."""
-    valid = {"success", "not_found", "error", "timeout"}
+    valid = {
+        "success",
+        "not_found",
+        "error",
+        "timeout",
+        "circuit_open",
+        "deadline_exceeded",
+        "throttled",
+    }
     for dni, resp in gaso_responses.items():
         assert resp["status"] in valid, (
             f"Unexpected status '{resp['status']}' for {dni}"
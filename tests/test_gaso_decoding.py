@@ -0,0 +1,250 @@
+"""
+Tests for PowerBI querydata decoding.
+
+These use synthetic DSR payloads, no API calls.
+"""
+
+import json
+import time
+
+import pytest
+
+from vcc_totem import deadline
+from vcc_totem.clients import gaso
+from vcc_totem.clients.gaso import (
+    FIELD_NAMES,
+    FIELDS,
+    ChunkSizer,
+    PowerBIConfig,
+    _build_batch_payload,
+    _build_measures_payload,
+    _extract_rows,
+    _extract_value,
+    _parse_querydata,
+)
+
+
+def _response(dm0, value_dicts=None):
+    ds = {"PH": [{"DM0": dm0}]}
+    if value_dicts:
+        ds["ValueDicts"] = value_dicts
+    return {"results": [{"result": {"data": {"dsr": {"DS": [ds]}}}}]}
+
+
+def test_measures_payload_selects_all_fields():
+    """One query selects every field."""
+    names = [name for name, _ in FIELDS]
+    payload = _build_measures_payload("12345678", names, "visual")
+    command = payload["queries"][0]["Query"]["Commands"][0]
+    query = command["SemanticQueryDataShapeCommand"]
+
+    selected = [s["Measure"]["Property"] for s in query["Query"]["Select"]]
+    assert selected == names
+    projections = query["Binding"]["Primary"]["Groupings"][0]["Projections"]
+    assert projections == list(range(len(names)))
+
+
+def test_extract_single_measure():
+    assert _extract_value(_response([{"M0": " ACTIVO "}])) == "ACTIVO"
+
+
+def test_extract_multi_measure_row():
+    rows = _extract_rows(_response([{"M0": "ACTIVO", "M1": "JUAN", "M2": "S/ 100"}]))
+    assert rows == [["ACTIVO", "JUAN", "S/ 100"]]
+
+
+def test_extract_compressed_rows():
+    """R repeats columns from the previous row, Ø marks nulls."""
+    schema = [{"N": "G0"}, {"N": "M0"}, {"N": "M1"}]
+    dm0 = [
+        {"S": schema, "C": ["111", "ACTIVO", "S/ 10"]},
+        {"C": ["222", "S/ 20"], "R": 2},
+        {"C": ["333"], "Ø": 6},
+    ]
+    rows = _extract_rows(_response(dm0))
+
+    assert rows == [
+        ["111", "ACTIVO", "S/ 10"],
+        ["222", "ACTIVO", "S/ 20"],
+        ["333", None, None],
+    ]
+
+
+def test_extract_value_dicts():
+    schema = [{"N": "G0"}, {"N": "M0", "DN": "D0"}]
+    dm0 = [{"S": schema, "C": ["111", 1]}, {"C": ["222"], "R": 2}]
+    rows = _extract_rows(_response(dm0, {"D0": ["NO APLICA", "ACTIVO"]}))
+
+    assert rows == [["111", "ACTIVO"], ["222", "ACTIVO"]]
+
+
+def test_extract_empty_result():
+    """No rows is a miss, not an error."""
+    assert _extract_rows(_response([])) == []
+    assert _extract_value(_response([])) is None
+
+
+def test_extract_error_response():
+    """Rejected queries return None so callers can fall back."""
+    response = {
+        "results": [
+            {
+                "result": {
+                    "data": {"dsr": {"DataShapes": [{"odata.error": {"code": "x"}}]}}
+                }
+            }
+        ]
+    }
+    assert _extract_rows(response) is None
+    assert _extract_rows({}) is None
+
+
+def test_parse_querydata_skips_metadata(monkeypatch):
+    """Without orjson only the dsr section is decoded, with the same rows."""
+    monkeypatch.setattr(gaso, "orjson", None)
+    response = _response([{"M0": "ACTIVO"}])
+    response["results"][0]["result"]["data"]["descriptor"] = {"Select": [1, 2]}
+    body = json.dumps(response, indent=1).encode()
+
+    parsed = _parse_querydata(body)
+
+    assert _extract_rows(parsed) == _extract_rows(response) == [["ACTIVO"]]
+    assert "descriptor" not in json.dumps(parsed)
+
+
+def test_parse_querydata_keeps_errors():
+    response = {
+        "results": [
+            {"result": {"data": {"dsr": {"DataShapes": [{"odata.error": {}}]}}}}
+        ]
+    }
+
+    assert _extract_rows(_parse_querydata(json.dumps(response).encode())) is None
+    with pytest.raises(ValueError):
+        _parse_querydata(b'{"results": [{"result": {"data": {"dsr": {')
+
+
+def test_batch_payload_uses_exact_in_filter():
+    """Batch queries match DNIs exactly and group by DNI."""
+    payload = _build_batch_payload(["11111111", "22222222"], ["Estado"], "visual")
+    query = payload["queries"][0]["Query"]["Commands"][0]
+    query = query["SemanticQueryDataShapeCommand"]
+
+    condition = query["Query"]["Where"][0]["Condition"]
+    assert "Contains" not in condition
+    values = [v[0]["Literal"]["Value"] for v in condition["In"]["Values"]]
+    assert values == ["'11111111'", "'22222222'"]
+    assert query["Query"]["Select"][0]["Column"]["Property"] == "DNI"
+
+
+def test_chunk_sizer_adapts():
+    """Fast small responses grow the chunk, failures shrink it."""
+    sizer = ChunkSizer(PowerBIConfig(batch_initial_size=50))
+
+    sizer.record(50, elapsed=0.5, nbytes=10_000, ok=True)
+    assert sizer.next_size() == 100
+
+    sizer.record(100, elapsed=1.0, nbytes=10_000, ok=False)
+    assert sizer.next_size() == 50
+
+    sizer.record(50, elapsed=20.0, nbytes=10_000, ok=True)
+    assert sizer.next_size() == 25
+
+
+def test_large_querydata_is_parsed_whole(monkeypatch):
+    """Big batch answers skip the partial decode, which is slower for them."""
+    monkeypatch.setattr(gaso, "orjson", None)
+
+    class NoPartialDecode:
+        def raw_decode(self, text, index):
+            raise AssertionError("large bodies are parsed with json.loads")
+
+    monkeypatch.setattr(gaso, "_DECODER", NoPartialDecode())
+    dm0 = [{"C": [str(10000000 + i), "x" * 50]} for i in range(500)]
+    body = json.dumps(_response(dm0)).encode()
+    assert len(body) > gaso._PARTIAL_DECODE_MAX
+
+    assert _extract_rows(_parse_querydata(body)) == [row["C"] for row in dm0]
+
+
+def _batch_dnis(payload):
+    query = payload["queries"][0]["Query"]["Commands"][0]
+    condition = query["SemanticQueryDataShapeCommand"]["Query"]["Where"][0]
+    return [
+        v[0]["Literal"]["Value"].strip("'")
+        for v in condition["Condition"]["In"]["Values"]
+    ]
+
+
+class _Answer:
+    def __init__(self, response):
+        self.content = json.dumps(response).encode()
+
+
+def test_batch_lookup_splits_rows_and_retries_smaller(monkeypatch):
+    """Rows go to their DNI, absent DNIs are not_found, failed chunks shrink."""
+    values = {name: "x" for name in FIELD_NAMES}
+    values.update(Estado="ACTIVO", Cliente="JUAN", Saldo="1500")
+    sent = []
+
+    def fake_send(payload, field):
+        dnis = _batch_dnis(payload)
+        sent.append(dnis)
+        if len(dnis) > 2:
+            return None
+        rows = [
+            {"C": [dni] + [values[name] for name in FIELD_NAMES]}
+            for dni in dnis
+            if dni != "44444444"
+        ]
+        return _Answer(_response(rows))
+
+    monkeypatch.setattr(gaso, "_post", fake_send)
+    monkeypatch.setattr(
+        gaso, "CHUNK_SIZER", ChunkSizer(PowerBIConfig(batch_initial_size=4))
+    )
+    dnis = ["11111111", "22222222", "33333333", "44444444"]
+
+    results = gaso.query_credit_lines(dnis)
+
+    assert sent == [dnis, dnis[:2], dnis[2:]]
+    assert set(results) == set(dnis)
+    for dni in dnis[:3]:
+        data, status, error = results[dni]
+        assert status == "success"
+        assert data["dni"] == dni
+        assert data["nombre"] == "JUAN"
+    assert results["44444444"][1] == "not_found"
+
+
+def test_failed_single_dni_is_retried_as_an_exact_match(monkeypatch):
+    sent = []
+
+    def fake_send(payload, field):
+        sent.append(_batch_dnis(payload))
+        return None
+
+    monkeypatch.setattr(gaso, "_post", fake_send)
+    monkeypatch.setattr(gaso, "CHUNK_SIZER", ChunkSizer(PowerBIConfig()))
+
+    results = gaso.query_credit_lines(["12345678"])
+
+    assert sent == [["12345678"], ["12345678"]]
+    assert results["12345678"][1] == "error"
+
+
+def test_batch_past_deadline_keeps_the_chunk_size(monkeypatch):
+    def no_send(payload, field):
+        raise AssertionError("PowerBI must not be called past the deadline")
+
+    monkeypatch.setattr(gaso, "_post", no_send)
+    sizer = ChunkSizer(PowerBIConfig(batch_initial_size=4))
+    monkeypatch.setattr(gaso, "CHUNK_SIZER", sizer)
+    dnis = ["11111111", "22222222", "33333333"]
+
+    with deadline.limit(0.001):
+        time.sleep(0.005)
+        results = gaso.query_credit_lines(dnis)
+
+    assert {status for _, status, _ in results.values()} == {deadline.EXCEEDED}
+    assert sizer.next_size() == 4
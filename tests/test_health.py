@@ -0,0 +1,114 @@
+"""
+Tests for the cached readiness behind /readyz.
+
+Probes are plain functions, no upstream calls are made.
+"""
+
+import time
+
+from vcc_totem import health
+from vcc_totem.health import HealthMonitor, is_failure
+
+
+def _monitor(results, calls=None, **kwargs):
+    def probe(name):
+        def check():
+            if calls is not None:
+                calls.append(name)
+            return results[name]
+
+        return check
+
+    return HealthMonitor({name: probe(name) for name in results}, **kwargs)
+
+
+def test_not_ready_until_every_channel_was_checked():
+    monitor = _monitor({"fnb": True, "gaso": True})
+    assert not monitor.status()["ready"]
+
+    monitor.probe()
+
+    assert monitor.status()["ready"]
+
+
+def test_failed_probe_marks_channel_down():
+    monitor = _monitor({"fnb": True, "gaso": False})
+
+    monitor.probe()
+    status = monitor.status()
+
+    assert not status["ready"]
+    assert status["channels"]["gaso"]["status"] == "error"
+
+
+def test_probe_skips_channels_with_recent_traffic():
+    """Real traffic stands in for the probe, only quiet channels are queried."""
+    calls = []
+    monitor = _monitor({"fnb": True, "gaso": True}, calls, interval=60)
+
+    monitor.observe("gaso", "200")
+    monitor.observe("login", "200")
+    monitor.probe()
+
+    assert calls == []
+    assert monitor.status()["ready"]
+
+
+def test_repeated_traffic_failures_mark_channel_down():
+    monitor = _monitor({"fnb": True, "gaso": True}, failure_threshold=3)
+    monitor.probe(force=True)
+
+    monitor.observe("fnb", "timeout")
+    monitor.observe("fnb", "timeout")
+    assert monitor.status()["channels"]["fnb"]["status"] == "ok"
+
+    monitor.observe("fnb", "connection_error")
+    assert monitor.status()["channels"]["fnb"]["status"] == "error"
+
+    monitor.observe("fnb", "success")
+    assert monitor.status()["ready"]
+
+
+def test_answers_are_not_failures():
+    assert not is_failure("not_found")
+    assert not is_failure("rate_limited")
+    assert not is_failure("429")
+    assert is_failure("503")
+    assert is_failure("timeout")
+
+
+def test_stale_status_is_unknown(monkeypatch):
+    monitor = _monitor({"fnb": True, "gaso": True}, interval=1)
+    monitor.probe()
+
+    later = time.monotonic() + 10
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+
+    assert monitor.status()["channels"]["fnb"]["status"] == "unknown"
+    assert not monitor.status()["ready"]
+
+
+def test_fnb_probe_does_not_log_in(monkeypatch):
+    """The probe only checks that the login endpoint answers."""
+    from vcc_totem.clients import session
+
+    calls = []
+
+    class Response:
+        status_code = 405
+
+    def fake_head(url, timeout, allow_redirects):
+        calls.append((url, timeout))
+        return Response()
+
+    def no_login(*args, **kwargs):
+        raise AssertionError("the probe must not log in")
+
+    monkeypatch.setattr(health.requests, "head", fake_head)
+    monkeypatch.setattr(session.POOL, "acquire", no_login)
+
+    assert health._probe_fnb() is True
+    assert calls == [(health.LOGIN_API, health.HEALTH_PROBE_TIMEOUT)]
+
+    Response.status_code = 503
+    assert health._probe_fnb() is False
@@ -0,0 +1,159 @@
+"""
+Tests for hedged upstream calls.
+"""
+
+import asyncio
+import threading
+import time
+
+from vcc_totem.clients.hedge import MIN_SAMPLES, Hedger
+
+
+def _warm(hedger, latency=0.001):
+    """Record enough fast calls for a p95, and budget for one hedge."""
+
+    async def fast():
+        await asyncio.sleep(latency)
+        return "ok"
+
+    async def warm():
+        for _ in range(MIN_SAMPLES):
+            await hedger.run_async(fast)
+
+    asyncio.run(warm())
+
+
+def _slow_then_fast(slow=0.5, first="slow", later="fast"):
+    """First call is slow, later ones answer at once."""
+    calls = []
+
+    async def fn():
+        calls.append(None)
+        if len(calls) == 1:
+            await asyncio.sleep(slow)
+            return first
+        return later
+
+    return fn, calls
+
+
+def test_no_hedge_until_enough_samples():
+    hedger = Hedger("t", enabled=True, budget=1.0, min_delay=0.01)
+    fn, calls = _slow_then_fast(slow=0.05)
+
+    assert asyncio.run(hedger.run_async(fn)) == "slow"
+    assert len(calls) == 1
+    assert hedger.delay() is None
+
+
+def test_sync_calls_are_never_hedged():
+    """A blocked caller could not use a faster duplicate's answer."""
+    hedger = Hedger("t", enabled=True, budget=1.0, min_delay=0.01)
+    _warm(hedger)
+    caller = threading.current_thread()
+    threads = []
+
+    def fn():
+        threads.append(threading.current_thread())
+        time.sleep(0.05)
+        return "slow"
+
+    assert hedger.run(fn) == "slow"
+    assert threads == [caller]
+    assert hedger.stats()["hedged"] == 0
+
+
+def test_hedge_rescues_a_slow_failed_call():
+    """The hedge sent at the p95 answers while the slow primary fails."""
+    hedger = Hedger("t", enabled=True, budget=0.05, min_delay=0.01)
+    _warm(hedger)
+    fn, calls = _slow_then_fast(slow=0.2, first=None)
+
+    start = time.monotonic()
+    assert asyncio.run(hedger.run_async(fn)) == "fast"
+
+    assert time.monotonic() - start < 0.15
+    assert len(calls) == 2
+    stats = hedger.stats()
+    assert stats["hedged"] == 1
+    assert stats["won"] == 1
+
+
+def test_fast_call_sends_no_hedge():
+    hedger = Hedger("t", enabled=True, budget=1.0, min_delay=0.05)
+    _warm(hedger)
+    calls = []
+
+    async def fn():
+        calls.append(None)
+        return "ok"
+
+    async def main():
+        for _ in range(5):
+            assert await hedger.run_async(fn) == "ok"
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert len(calls) == 5
+    assert hedger.stats()["hedged"] == 0
+
+
+def test_budget_limits_hedges():
+    """With 5% budget, 20 calls earn one hedge and the next slow call waits."""
+    hedger = Hedger("t", enabled=True, budget=0.05, min_delay=0.01)
+    _warm(hedger)
+
+    fn, _ = _slow_then_fast(slow=0.05)
+    asyncio.run(hedger.run_async(fn))
+    fn, calls = _slow_then_fast(slow=0.05)
+
+    assert asyncio.run(hedger.run_async(fn)) == "slow"
+    assert len(calls) == 1
+    assert hedger.stats()["over_budget"] == 1
+
+
+def test_failed_copy_waits_for_the_other():
+    """A None answer is a failure, not a result to return early."""
+    hedger = Hedger("t", enabled=True, budget=0.05, min_delay=0.01)
+    _warm(hedger)
+    fn, calls = _slow_then_fast(slow=0.1, later=None)
+
+    assert asyncio.run(hedger.run_async(fn)) == "slow"
+    assert len(calls) == 2
+    assert hedger.stats()["won"] == 0
+
+
+def test_disabled_never_hedges():
+    hedger = Hedger("t", enabled=False, budget=1.0, min_delay=0.01)
+    _warm(hedger)
+    fn, calls = _slow_then_fast(slow=0.05)
+
+    assert asyncio.run(hedger.run_async(fn)) == "slow"
+    assert len(calls) == 1
+
+
+def test_async_hedge_cancels_the_loser():
+    hedger = Hedger("t", enabled=True, budget=0.05, min_delay=0.01)
+    _warm(hedger)
+    calls = []
+    cancelled = []
+
+    async def fn():
+        calls.append(None)
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(None)
+                raise
+            return "slow"
+        return "fast"
+
+    async def main():
+        result = await hedger.run_async(fn)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == "fast"
+    assert cancelled == [None]
+    assert hedger.stats()["won"] == 1
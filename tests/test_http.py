@@ -0,0 +1,57 @@
+"""
+Tests for the shared HTTP adapter's retry policy.
+
+Uses a local server that accepts connections and never answers.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+import requests
+
+from vcc_totem.clients import fnb, gaso, http
+from vcc_totem.clients.breaker import FNB_BREAKER, GASO_BREAKER
+
+
+def test_read_timeout_is_not_retried(silent_server):
+    """A POST that timed out reading is not sent again, and stays a Timeout."""
+    url, accepted = silent_server
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        http.new_session().post(url, json={}, timeout=0.2)
+
+    assert len(accepted) == 1
+
+
+def test_fnb_read_timeout_maps_to_timeout_status(silent_server, monkeypatch):
+    url, _ = silent_server
+    monkeypatch.setattr(fnb, "CONSULTA_API", url)
+    monkeypatch.setattr(fnb, "TIMEOUT", 0.2)
+    monkeypatch.setattr(FNB_BREAKER, "allow", lambda: True)
+
+    data, status, error = fnb.query_credit_line(http.new_session(), "12345678", "1")
+
+    assert (data, status) == (None, "timeout")
+
+
+def test_gaso_read_timeout_maps_to_timeout_status(silent_server, monkeypatch):
+    url, _ = silent_server
+    monkeypatch.setattr(gaso, "CONFIG", gaso.PowerBIConfig(api_url=url, timeout=0.2))
+    monkeypatch.setattr(GASO_BREAKER, "allow", lambda: True)
+    statuses = []
+    monkeypatch.setattr(
+        gaso.metrics, "upstream_call", _recording_upstream_call(statuses)
+    )
+
+    assert gaso._send_query({}, "Estado") is None
+    assert statuses == ["timeout"]
+
+
+def _recording_upstream_call(statuses):
+    @contextmanager
+    def upstream_call(channel, field="-"):
+        call = type("Call", (), {"status": "error"})()
+        yield call
+        statuses.append(call.status)
+
+    return upstream_call
@@ -0,0 +1,41 @@
+"""
+Tests for the Prometheus metrics helpers.
+"""
+
+import pytest
+
+from vcc_totem import metrics
+
+
+def _sample(name, labels):
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_upstream_call_records_latency_and_status():
+    labels = {"channel": "test", "field": "Estado"}
+    before = _sample("vcc_upstream_seconds_count", labels)
+
+    with metrics.upstream_call("test", "Estado") as call:
+        call.status = "200"
+
+    assert _sample("vcc_upstream_seconds_count", labels) == before + 1
+    assert _sample("vcc_upstream_requests_total", {**labels, "status": "200"}) >= 1
+    assert _sample("vcc_upstream_in_flight", {"channel": "test"}) == 0
+
+
+def test_upstream_call_defaults_to_error_on_exception():
+    labels = {"channel": "test", "field": "-", "status": "error"}
+    before = _sample("vcc_upstream_requests_total", labels)
+
+    with pytest.raises(RuntimeError):
+        with metrics.upstream_call("test"):
+            raise RuntimeError("boom")
+
+    assert _sample("vcc_upstream_requests_total", labels) == before + 1
+
+
+def test_render_exposes_metrics():
+    data, content_type = metrics.render()
+
+    assert b"vcc_upstream_seconds" in data
+    assert content_type.startswith("text/plain")
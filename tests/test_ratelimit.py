@@ -0,0 +1,114 @@
+"""
+Tests for AIMD request pacing.
+"""
+
+import time
+
+from vcc_totem import deadline
+from vcc_totem.clients.ratelimit import (
+    THROTTLED,
+    RateController,
+    is_throttle_status,
+    paced,
+)
+
+
+def test_success_increases_rate_additively():
+    rc = RateController("t", initial_rate=2.0, min_rate=0.1, max_rate=10.0)
+
+    rc.on_success()
+
+    assert rc.rate == 2.25
+
+
+def test_rate_is_capped_at_max():
+    rc = RateController("t", initial_rate=9.9, min_rate=0.1, max_rate=10.0)
+
+    for _ in range(10):
+        rc.on_success()
+
+    assert rc.rate == 10.0
+
+
+def test_throttle_burst_cuts_once_per_cooldown():
+    """In-flight requests failing together count as a single congestion signal."""
+    rc = RateController("t", initial_rate=8.0, min_rate=0.5, max_rate=10.0)
+
+    for _ in range(5):
+        rc.on_throttle()
+
+    assert rc.rate == 4.0
+    assert rc.stats()["throttles"] == 5
+    assert rc.stats()["cuts"] == 1
+
+
+def test_rate_never_drops_below_min():
+    rc = RateController(
+        "t", initial_rate=1.0, min_rate=0.5, max_rate=10.0, cooldown=0.0
+    )
+
+    for _ in range(5):
+        rc.on_throttle()
+
+    assert rc.rate == 0.5
+
+
+def test_acquire_spaces_requests_by_rate():
+    rc = RateController(
+        "t", initial_rate=20.0, min_rate=1.0, max_rate=20.0, pace_all=True
+    )
+
+    start = time.monotonic()
+    for _ in range(5):
+        rc.acquire()
+    elapsed = time.monotonic() - start
+
+    assert 0.15 <= elapsed < 0.5
+
+
+def test_interactive_calls_are_not_paced():
+    """Only bulk runs (paced()) wait for a slot by default."""
+    rc = RateController("t", initial_rate=1.0, min_rate=0.1, max_rate=1.0)
+
+    start = time.monotonic()
+    for _ in range(5):
+        assert rc.acquire() is None
+    assert time.monotonic() - start < 0.1
+
+    with paced():
+        rc.acquire()
+        start = time.monotonic()
+        rc.acquire()
+    assert time.monotonic() - start >= 0.9
+
+
+def test_acquire_refuses_past_max_wait():
+    rc = RateController(
+        "t", initial_rate=1.0, min_rate=0.1, max_rate=1.0, max_wait=0.5, pace_all=True
+    )
+
+    assert rc.acquire() is None
+    start = time.monotonic()
+    assert rc.acquire() == THROTTLED
+    assert time.monotonic() - start < 0.1
+    assert rc.stats()["refused"] == 1
+
+
+def test_acquire_refuses_past_deadline():
+    """A slot beyond the deadline fails fast instead of sleeping through it."""
+    rc = RateController(
+        "t", initial_rate=0.2, min_rate=0.1, max_rate=1.0, pace_all=True
+    )
+
+    rc.acquire()
+    start = time.monotonic()
+    with deadline.limit(0.5):
+        assert rc.acquire() == deadline.EXCEEDED
+    assert time.monotonic() - start < 0.1
+
+
+def test_throttle_statuses():
+    assert is_throttle_status(429)
+    assert is_throttle_status(503)
+    assert not is_throttle_status(200)
+    assert not is_throttle_status(401)
@@ -0,0 +1,40 @@
+"""
+Tests for the compact ClientRecord form of QueryResult.
+"""
+
+import pytest
+
+from benchmarks.records import KINDS, retained_bytes
+from vcc_totem.models import ClientRecord, QueryResult
+
+
+@pytest.mark.parametrize("kind", sorted(KINDS))
+def test_round_trip_is_lossless(kind):
+    result = KINDS[kind](7)
+
+    restored = ClientRecord.from_result(result).to_result()
+
+    assert restored == result
+    assert list(restored.data or {}) == list(result.data or {}), "key order"
+
+
+def test_unexpected_types_stay_in_extra():
+    """Values that do not fit their slot keep their exact type."""
+    result = QueryResult(
+        success=True,
+        dni="A1234",
+        channel="fnb",
+        data={"lineaCredito": 2500, "tieneLineaCredito": "S", "segmento": "x"},
+        status="success",
+    )
+
+    assert ClientRecord.from_result(result).to_result() == result
+
+
+def test_record_is_smaller_than_result():
+    build = KINDS["fnb"]
+
+    result = retained_bytes(2000, build)
+    record = retained_bytes(2000, lambda i: ClientRecord.from_result(build(i)))
+
+    assert record < result * 0.6
@@ -0,0 +1,243 @@
+"""
+Tests for the pool of authenticated FNB sessions.
+
+Logins are stubbed, no real credentials are used.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from vcc_totem import deadline
+from vcc_totem.clients import session
+from vcc_totem.clients.session import SessionPool
+
+
+def _stub_login(monkeypatch, logins, lifetime=3600):
+    def fake_login(username, password):
+        logins.append(username)
+        return object(), f"ally-{username}", time.time() + lifetime
+
+    monkeypatch.setattr(session, "login", fake_login)
+
+
+def test_spreads_concurrent_queries_across_accounts(monkeypatch):
+    _stub_login(monkeypatch, [])
+    pool = SessionPool([("a", "1"), ("b", "2")])
+
+    first = pool.acquire()
+    second = pool.acquire()
+
+    assert {first.ally_id, second.ally_id} == {"ally-a", "ally-b"}
+
+
+def test_rate_limited_session_leaves_rotation(monkeypatch):
+    _stub_login(monkeypatch, [])
+    pool = SessionPool([("a", "1"), ("b", "2")])
+
+    limited = pool.acquire()
+    pool.release(limited, "rate_limited")
+
+    for _ in range(3):
+        other = pool.acquire()
+        assert other.slot is not limited.slot
+        pool.release(other, "success")
+
+
+def test_relogs_after_max_queries(monkeypatch):
+    logins = []
+    _stub_login(monkeypatch, logins)
+    monkeypatch.setattr(session, "MAX_CONSULTAS_POR_SESION", 2)
+    pool = SessionPool([("a", "1")])
+
+    for _ in range(5):
+        pool.release(pool.acquire(), "success")
+
+    assert logins == ["a", "a", "a"]
+
+
+def test_expired_session_logs_in_again(monkeypatch):
+    logins = []
+    _stub_login(monkeypatch, logins)
+    pool = SessionPool([("a", "1")])
+
+    pool.release(pool.acquire(), "session_expired")
+    pool.release(pool.acquire(), "success")
+
+    assert logins == ["a", "a"]
+
+
+def test_concurrent_401s_cause_a_single_relogin(monkeypatch):
+    """Late 401s from an old generation do not expire the new session."""
+    logins = []
+    _stub_login(monkeypatch, logins)
+    pool = SessionPool([("a", "1")])
+
+    handles = [pool.acquire() for _ in range(5)]
+    pool.release(handles[0], "session_expired")
+    fresh = pool.acquire()
+    for handle in handles[1:]:
+        pool.release(handle, "session_expired")
+    pool.release(pool.acquire(), "success")
+
+    assert fresh.generation == handles[0].generation + 1
+    assert logins == ["a", "a"]
+    assert pool.stats()["invalidations"] == 1
+    assert pool.stats()["suppressed_invalidations"] == 4
+
+
+def test_refresher_keeps_a_standby_and_swaps_it_in(monkeypatch):
+    """Requests never log in once the refresher has warmed the account."""
+    logins = []
+    _stub_login(monkeypatch, logins)
+    pool = SessionPool([("a", "1")])
+
+    pool.refresh()
+    assert len(logins) == 2, "active and standby"
+
+    pool.release(pool.acquire(), "session_expired")
+    pool.acquire()
+
+    assert len(logins) == 2
+
+
+def test_refresh_renews_tokens_close_to_expiry(monkeypatch):
+    logins = []
+    _stub_login(monkeypatch, logins, lifetime=100)
+    monkeypatch.setattr(session, "SESSION_REFRESH_AHEAD", 300)
+    pool = SessionPool([("a", "1")])
+
+    pool.refresh()
+    before = len(logins)
+    pool.refresh()
+
+    assert len(logins) > before
+
+
+def test_login_runs_outside_the_slot_lock(monkeypatch):
+    """Concurrent acquirers of one account share a single login."""
+    logins = []
+    pool = SessionPool([("a", "1")])
+    slot = pool._slots[0]
+
+    def slow_login(username, password):
+        assert not slot.lock.locked()
+        logins.append(username)
+        time.sleep(0.05)
+        return object(), "ally-a", time.time() + 3600
+
+    monkeypatch.setattr(session, "login", slow_login)
+    threads = [
+        threading.Thread(target=lambda: pool.release(pool.acquire())) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert logins == ["a"]
+    assert slot.queries == 4
+
+
+def test_async_login_never_takes_the_thread_lock(monkeypatch):
+    logins = []
+    pool = SessionPool([("a", "1")])
+    slot = pool._slots[0]
+
+    async def slow_login(username, password):
+        assert not slot.lock.locked()
+        logins.append(username)
+        await asyncio.sleep(0.05)
+        return object(), "ally-a", time.time() + 3600
+
+    monkeypatch.setattr(session, "login_async", slow_login)
+
+    async def run():
+        handles = await asyncio.gather(*(pool.acquire_async() for _ in range(4)))
+        for handle in handles:
+            pool.release(handle)
+
+    asyncio.run(run())
+
+    assert logins == ["a"]
+    assert slot.queries == 4
+    assert pool.stats()["suppressed_logins"] == 3
+
+
+def test_login_wait_is_bounded_by_the_deadline(monkeypatch):
+    """A request gives up on a slow login in time; the login still lands."""
+    pool = SessionPool([("a", "1")])
+    slot = pool._slots[0]
+
+    async def slow_login(username, password):
+        await asyncio.sleep(0.2)
+        return object(), "ally-a", time.time() + 3600
+
+    monkeypatch.setattr(session, "login_async", slow_login)
+
+    async def run():
+        with deadline.limit(0.05):
+            with pytest.raises(session.LoginWaitTimeout):
+                await pool.acquire_async()
+        await asyncio.sleep(0.3)
+
+    start = time.monotonic()
+    asyncio.run(run())
+
+    assert slot.session is not None
+    assert slot.in_flight == 0
+    assert not slot.async_lock.locked()
+    pool.release(pool.acquire())
+    assert pool.stats()["logins"] == 1
+    assert time.monotonic() - start < 0.6
+
+
+def test_sync_login_wait_is_bounded_by_the_deadline(monkeypatch):
+    pool = SessionPool([("a", "1")])
+    started = threading.Event()
+
+    def slow_login(username, password):
+        started.set()
+        time.sleep(0.2)
+        return object(), "ally-a", time.time() + 3600
+
+    monkeypatch.setattr(session, "login", slow_login)
+    leader = threading.Thread(target=lambda: pool.release(pool.acquire()))
+    leader.start()
+    started.wait()
+
+    start = time.monotonic()
+    with deadline.limit(0.05), pytest.raises(session.LoginWaitTimeout):
+        pool.acquire()
+    waited = time.monotonic() - start
+    leader.join()
+
+    assert waited < 0.15
+    assert pool._slots[0].in_flight == 0
+
+
+def test_async_login_lock_follows_the_event_loop(monkeypatch):
+    """Each ``asyncio.run`` waits on a lock of its own loop."""
+    logins = []
+    pool = SessionPool([("a", "1")])
+
+    async def slow_login(username, password):
+        logins.append(username)
+        await asyncio.sleep(0.01)
+        return object(), "ally-a", time.time() + 3600
+
+    monkeypatch.setattr(session, "login_async", slow_login)
+
+    async def run():
+        handles = await asyncio.gather(
+            *(pool.acquire_async(force_refresh=True) for _ in range(3))
+        )
+        for handle in handles:
+            pool.release(handle)
+
+    asyncio.run(run())
+    asyncio.run(run())
+
+    assert logins == ["a", "a"]
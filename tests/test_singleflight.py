@@ -0,0 +1,128 @@
+"""
+Tests for request coalescing.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from vcc_totem.core.singleflight import Group, WaitTimeout
+
+
+def test_concurrent_calls_share_one_execution():
+    group = Group()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(group.do("k", slow)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert group.stats()["coalesced"] == 4
+
+
+def test_sequential_calls_run_again():
+    group = Group()
+    assert group.do("k", lambda: 1) == 1
+    assert group.do("k", lambda: 2) == 2
+    assert group.stats()["coalesced"] == 0
+
+
+def test_async_calls_share_one_execution():
+    group = Group()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*(group.do_async("k", slow) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert len(calls) == 1
+
+
+def test_async_cancelled_waiter_keeps_flight_alive():
+    """Cancelling one caller doesn't cancel the others' computation."""
+    group = Group()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        first = asyncio.create_task(group.do_async("k", slow))
+        second = asyncio.create_task(group.do_async("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "result"
+
+
+def test_unshareable_result_is_recomputed_by_waiters():
+    group = Group()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return len(calls)
+
+    results = {}
+    leader = threading.Thread(
+        target=lambda: results.update(
+            leader=group.do("k", slow, shareable=lambda: len(calls) > 1)
+        )
+    )
+    leader.start()
+    time.sleep(0.01)
+    results["waiter"] = group.do("k", slow)
+    leader.join()
+
+    assert results == {"leader": 1, "waiter": 2}
+    assert group.stats()["unshared"] == 1
+
+
+def test_waiter_gives_up_after_its_timeout():
+    group = Group()
+    leader = threading.Thread(target=lambda: group.do("k", lambda: time.sleep(0.2)))
+    leader.start()
+    time.sleep(0.01)
+
+    with pytest.raises(WaitTimeout):
+        group.do("k", lambda: None, timeout=0.02)
+    leader.join()
+
+
+def test_async_waiter_gives_up_after_its_timeout():
+    group = Group()
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def run():
+        first = asyncio.create_task(group.do_async("k", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(WaitTimeout):
+            await group.do_async("k", slow, timeout=0.01)
+        return await first
+
+    assert asyncio.run(run()) == "result"
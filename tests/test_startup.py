@@ -0,0 +1,15 @@
+"""
+Tests for the CLI startup cost.
+
+Runs a fresh interpreter, the absolute time budget is left to
+``python -m benchmarks.startup``.
+"""
+
+from benchmarks.startup import LAZY_MODULES, loaded_modules
+
+
+def test_cli_defers_optional_clients():
+    """httpx, the API stack, JWT, Prometheus and the GASO client load only when used."""
+    loaded = loaded_modules("vcc_totem.main")
+
+    assert [m for m in LAZY_MODULES if m in loaded] == []
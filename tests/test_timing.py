@@ -0,0 +1,66 @@
+"""
+Tests for per-request span timing.
+"""
+
+import asyncio
+
+from vcc_totem import metrics, timing
+
+
+def test_spans_nest_under_the_trace():
+    with timing.trace() as root:
+        with timing.span("query_fnb"):
+            with metrics.upstream_call("login"):
+                pass
+            with metrics.upstream_call("fnb"):
+                pass
+        with timing.span("query_gaso"):
+            with metrics.upstream_call("gaso", "Estado"):
+                pass
+
+    summary = timing.summary(root)
+    assert summary["upstream_calls"] == 3
+    assert [s["name"] for s in summary["spans"]] == ["query_fnb", "query_gaso"]
+    assert [c["name"] for c in summary["spans"][0]["children"]] == ["login", "fnb"]
+
+
+def test_span_outside_trace_is_noop():
+    with timing.span("query_fnb") as span:
+        assert span is None
+
+
+def test_timed_span_is_measured_outside_trace():
+    with timing.timed("speculative_gaso") as span:
+        assert span.elapsed() >= 0
+
+    assert span.duration > 0
+    assert span.elapsed() == span.duration
+
+
+def test_child_tasks_report_into_the_request_trace():
+    async def fetch(field):
+        with metrics.upstream_call("gaso", field):
+            await asyncio.sleep(0)
+
+    async def handler():
+        with timing.trace() as root:
+            await asyncio.gather(fetch("Cliente"), fetch("Saldo"))
+        return root
+
+    root = asyncio.run(handler())
+
+    assert root.upstream_calls == 2
+    assert {s.name for s in root.children} == {"gaso.Cliente", "gaso.Saldo"}
+
+
+def test_server_timing_header():
+    with timing.trace() as root:
+        with timing.span("query_gaso"):
+            with timing.span("gaso.Dirección"):
+                pass
+
+    header = timing.server_timing(root)
+
+    names = [entry.split(";")[0] for entry in header.split(", ")]
+    assert names == ["total", "query_gaso", "gaso.Direcci_n"]
+    assert all(";dur=" in entry for entry in header.split(", "))
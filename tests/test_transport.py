@@ -0,0 +1,113 @@
+"""
+Tests for recording and replaying upstream traffic.
+
+The live side is a fake adapter / httpx.MockTransport, no network is used.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from vcc_totem.clients.transport import (
+    Cassette,
+    CassetteAdapter,
+    CassetteTransport,
+    request_key,
+)
+
+URL = "https://appweb.calidda.com.pe/FNB_Services/api/financiamiento/lineaCredito"
+
+
+class FakeAdapter(BaseAdapter):
+    def __init__(self):
+        super().__init__()
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response._content = json.dumps({"valid": True, "n": self.sent}).encode()
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def _session(adapter):
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
+
+
+def test_replays_recorded_responses_without_network(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    live = FakeAdapter()
+    recorder = _session(CassetteAdapter(live, Cassette(path, "record")))
+    recorder.get(URL, params={"numeroDocumento": "12345678"})
+
+    replayer = _session(CassetteAdapter(FakeAdapter(), Cassette(path, "replay", 0)))
+    response = replayer.get(URL, params={"numeroDocumento": "12345678"})
+
+    assert response.json() == {"valid": True, "n": 1}
+    assert live.sent == 1
+
+
+def test_unrecorded_request_fails_like_a_connection_error(tmp_path):
+    cassette = Cassette(tmp_path / "cassette.jsonl", "replay", 0)
+    session = _session(CassetteAdapter(FakeAdapter(), cassette))
+
+    with pytest.raises(requests.ConnectionError):
+        session.get(URL, params={"numeroDocumento": "87654321"})
+
+    assert cassette.stats()["misses"] == 1
+
+
+def test_password_is_not_part_of_the_key():
+    """Logins with the same user replay regardless of the password."""
+    first = request_key("POST", URL, json.dumps({"usuario": "a", "password": "x"}))
+    second = request_key("POST", URL, '{"password":"y","usuario":"a"}')
+
+    assert first == second
+
+
+def test_requests_recording_replays_through_httpx(tmp_path):
+    """Sync and async clients share cassettes despite different JSON encoding."""
+    path = tmp_path / "cassette.jsonl"
+    recorder = _session(CassetteAdapter(FakeAdapter(), Cassette(path, "record")))
+    recorder.post(URL, json={"queries": [1, 2]})
+
+    async def replay():
+        transport = CassetteTransport(
+            httpx.AsyncHTTPTransport(), Cassette(path, "replay", 0)
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.post(URL, json={"queries": [1, 2]})
+
+    response = asyncio.run(replay())
+
+    assert response.status_code == 200
+    assert response.json()["n"] == 1
+
+
+def test_httpx_recording_keeps_the_live_response(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    live = httpx.MockTransport(lambda request: httpx.Response(429, json={"x": 1}))
+
+    async def record():
+        transport = CassetteTransport(live, Cassette(path, "record"))
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get(URL)
+
+    response = asyncio.run(record())
+    entry = json.loads(path.read_text(encoding="utf-8"))
+
+    assert response.status_code == 429
+    assert response.json() == {"x": 1}
+    assert entry["status"] == 429
@@ -1,31 +1,98 @@
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 
 from vcc_totem.core.query import (
-    query_with_fallback,
-    query_fnb,
-    query_gaso,
+    FLIGHTS,
+    RESULT_CACHE,
+    query_with_fallback_async,
+    query_fnb_async,
+    query_gaso_async,
     validate_dni,
 )
+from vcc_totem import deadline, health, metrics, timing
+from vcc_totem.config import BATCH_CONCURRENCY, BATCH_MAX_DNIS, REQUEST_DEADLINE
 from vcc_totem.core.messages import format_response
-from vcc_totem.clients.gaso import check_connection
-from vcc_totem.clients.session import get_session
+from vcc_totem.models import QueryResult
+from vcc_totem.clients.session import (
+    session_stats,
+    start_refresher,
+    stop_refresher,
+)
+from vcc_totem.clients.hedge import hedge_stats
+from vcc_totem.clients.http import close_async_client, connection_stats
+from vcc_totem.clients.ratelimit import rate_stats
+from vcc_totem.clients.transport import transport_stats
+from vcc_totem.clients.breaker import breaker_states
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Up front, so the first request does not pay for importing prometheus_client
+    metrics.load()
+    start_refresher()
+    health.start_prober()
+    yield
+    health.stop_prober()
+    stop_refresher()
+    await close_async_client()
+
+
 app = FastAPI(
     title="API Cálidda",
     version="3.0",
     description="API de consulta de líneas de crédito Cálidda",
+    lifespan=lifespan,
 )
 
 
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    metrics.HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        metrics.observe_request(
+            request.method,
+            route.path if route else "unmatched",
+            status,
+            time.perf_counter() - start,
+        )
+
+
 class DNIRequest(BaseModel):
     dni: str = Field(pattern=r"^\d{8}$", examples=["12345678"])
+    speculative: bool | None = None
+    use_cache: bool = True
+    timings: bool = False
+    deadline: float | None = Field(default=None, gt=0)
+
+
+class BatchRequest(BaseModel):
+    dnis: list[str] = Field(min_length=1, max_length=BATCH_MAX_DNIS)
+    speculative: bool | None = None
+    use_cache: bool = True
+    timings: bool = False
+    # Per DNI, not for the whole batch
+    deadline: float | None = Field(default=None, gt=0)
+
+
+# Seconds, the shorter of the header and the body field wins
+DeadlineHeader = Header(default=None, alias="X-Deadline", gt=0)
 
 
 class QueryResponse(BaseModel):
@@ -34,55 +101,72 @@ class QueryResponse(BaseModel):
     channel: str
     client_message: str
     has_offer: bool
+    status: str | None = None
     data: dict | None = None
     error: str | None = None
+    fallback_mode: str | None = None
+    wasted_seconds: float = 0.0
+    timings: dict | None = None
 
 
-@app.get("/health")
-def health():
-    fnb_ok = False
-    gaso_ok = False
-
-    try:
-        get_session()
-        fnb_ok = True
-    except Exception as e:
-        logger.error(f"FNB health check failed: {e}")
+@app.get("/livez")
+async def livez():
+    return {"status": "ok"}
 
-    try:
-        gaso_ok = check_connection()
-    except Exception as e:
-        logger.error(f"GASO health check failed: {e}")
 
-    all_ok = fnb_ok and gaso_ok
-    status_code = 200 if all_ok else 503
+@app.get("/readyz")
+async def readyz():
+    """Cached channel status, no upstream call is made while serving it."""
+    readiness = health.readiness()
+    channels = readiness["channels"]
 
     return JSONResponse(
-        status_code=status_code,
+        status_code=200 if readiness["ready"] else 503,
         content={
-            "status": "ok" if all_ok else "degraded",
-            "fnb": "ok" if fnb_ok else "error",
-            "gaso": "ok" if gaso_ok else "error",
+            "status": "ok" if readiness["ready"] else "degraded",
+            "fnb": channels["fnb"]["status"],
+            "gaso": channels["gaso"]["status"],
+            "checks": channels,
+            "circuits": breaker_states(),
         },
     )
 
 
+@app.get("/health")
+async def health_check():
+    return await readyz()
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "connections": connection_stats(),
+        "cache": RESULT_CACHE.stats(),
+        "singleflight": FLIGHTS.stats(),
+        "rates": rate_stats(),
+        "hedging": hedge_stats(),
+        "sessions": session_stats(),
+        "transport": transport_stats(),
+    }
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    data, content_type = metrics.render()
+    return Response(content=data, media_type=content_type)
+
+
 @app.post("/query", response_model=QueryResponse)
-def query_endpoint(body: DNIRequest):
+async def query_endpoint(
+    body: DNIRequest, response: Response, x_deadline: float | None = DeadlineHeader
+):
     try:
         dni = validate_dni(body.dni)
-        result = query_with_fallback(dni)
-        message, has_offer = format_response(result)
-
-        return QueryResponse(
-            success=result.success,
-            dni=result.dni,
-            channel=result.channel,
-            client_message=message,
-            has_offer=has_offer,
-            data=result.data,
-            error=result.error_message,
-        )
+        with timing.trace() as trace, _deadline(body, x_deadline):
+            result = await query_with_fallback_async(
+                dni, speculative=body.speculative, use_cache=body.use_cache
+            )
+        return _with_timings(_to_response(result), trace, body.timings, response)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
@@ -90,22 +174,110 @@ def query_endpoint(body: DNIRequest):
         raise HTTPException(status_code=500, detail="Internal error")
 
 
+@app.post("/query/batch")
+async def query_batch_endpoint(
+    body: BatchRequest, x_deadline: float | None = DeadlineHeader
+):
+    """Stream one QueryResponse per DNI as NDJSON, in completion order."""
+    try:
+        dnis = [validate_dni(dni) for dni in body.dnis]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        _stream_batch(dnis, body, x_deadline), media_type="application/x-ndjson"
+    )
+
+
+async def _stream_batch(dnis: list[str], body: BatchRequest, x_deadline: float | None):
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(dni: str) -> QueryResponse:
+        async with semaphore:
+            try:
+                with timing.trace() as trace, _deadline(body, x_deadline):
+                    result = await query_with_fallback_async(
+                        dni, speculative=body.speculative, use_cache=body.use_cache
+                    )
+            except Exception:
+                logger.exception(f"Batch query failed for DNI {dni}")
+                result = QueryResult(
+                    success=False,
+                    dni=dni,
+                    channel="none",
+                    error_message="Internal error",
+                )
+        return _with_timings(_to_response(result), trace, body.timings)
+
+    tasks = [asyncio.create_task(run(dni)) for dni in dnis]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            response = await completed
+            yield response.model_dump_json() + "\n"
+    finally:
+        # Client disconnected or batch finished: drop whatever is still queued
+        for task in tasks:
+            task.cancel()
+
+
+def _deadline(body: DNIRequest | BatchRequest, x_deadline: float | None):
+    """Bound the upstream calls of one query by the requested time budget."""
+    given = [seconds for seconds in (body.deadline, x_deadline) if seconds is not None]
+    return deadline.limit(min(given) if given else REQUEST_DEADLINE)
+
+
+def _to_response(result: QueryResult) -> QueryResponse:
+    message, has_offer = format_response(result)
+
+    return QueryResponse(
+        success=result.success,
+        dni=result.dni,
+        channel=result.channel,
+        client_message=message,
+        has_offer=has_offer,
+        status=result.status,
+        data=result.data,
+        error=result.error_message,
+        fallback_mode=result.fallback_mode,
+        wasted_seconds=result.wasted_seconds,
+    )
+
+
+def _with_timings(
+    payload: QueryResponse,
+    trace: timing.Span,
+    include: bool,
+    response: Response | None = None,
+) -> QueryResponse:
+    """Report the request's span tree as Server-Timing and, if asked, in the body."""
+    if response is not None:
+        response.headers["Server-Timing"] = timing.server_timing(trace)
+    if include:
+        payload.timings = timing.summary(trace)
+    return payload
+
+
 @app.post("/query/fnb", response_model=QueryResponse)
-def query_fnb_endpoint(body: DNIRequest):
+async def query_fnb_endpoint(
+    body: DNIRequest, response: Response, x_deadline: float | None = DeadlineHeader
+):
     try:
         dni = validate_dni(body.dni)
-        result = query_fnb(dni)
+        with timing.trace() as trace, _deadline(body, x_deadline):
+            result = await query_fnb_async(dni, use_cache=body.use_cache)
         message, has_offer = format_response(result)
 
-        return QueryResponse(
+        payload = QueryResponse(
             success=result.success,
             dni=result.dni,
             channel="fnb",
             client_message=message,
             has_offer=has_offer,
+            status=result.status,
             data=result.data,
             error=result.error_message,
         )
+        return _with_timings(payload, trace, body.timings, response)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
@@ -114,21 +286,26 @@ def query_fnb_endpoint(body: DNIRequest):
 
 
 @app.post("/query/gaso", response_model=QueryResponse)
-def query_gaso_endpoint(body: DNIRequest):
+async def query_gaso_endpoint(
+    body: DNIRequest, response: Response, x_deadline: float | None = DeadlineHeader
+):
     try:
         dni = validate_dni(body.dni)
-        result = query_gaso(dni)
+        with timing.trace() as trace, _deadline(body, x_deadline):
+            result = await query_gaso_async(dni, use_cache=body.use_cache)
         message, has_offer = format_response(result)
 
-        return QueryResponse(
+        payload = QueryResponse(
             success=result.success,
             dni=result.dni,
             channel="gaso",
             client_message=message,
             has_offer=has_offer,
+            status=result.status,
             data=result.data,
             error=result.error_message,
         )
+        return _with_timings(payload, trace, body.timings, response)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
@@ -1,65 +1,167 @@
-import jwt
 import requests
 import logging
+from typing import Optional
 
 from vcc_totem.config import USUARIO, PASSWORD, LOGIN_API, TIMEOUT
+from vcc_totem import metrics
+from vcc_totem.clients.breaker import LOGIN_BREAKER
+from vcc_totem.clients.http import get_async_client, new_session
+from vcc_totem.clients.transport import replaying
 
 logger = logging.getLogger(__name__)
 
+LOGIN_HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "es-419,es;q=0.9",
+    "content-type": "application/json",
+    "origin": "https://appweb.calidda.com.pe",
+    "referer": "https://appweb.calidda.com.pe/WebFNB/login",
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+}
 
-def login():
-    session = requests.Session()
-    session.headers.update(
-        {
-            "accept": "application/json, text/plain, */*",
-            "accept-language": "es-419,es;q=0.9",
-            "content-type": "application/json",
-            "origin": "https://appweb.calidda.com.pe",
-            "referer": "https://appweb.calidda.com.pe/WebFNB/login",
-            "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-        }
-    )
 
-    payload = {
-        "usuario": USUARIO,
-        "password": PASSWORD,
+def login(username: Optional[str] = USUARIO, password: Optional[str] = PASSWORD):
+    """Log in and return ``(session, ally_id, expires_at)``.
+
+    ``expires_at`` is the token's ``exp`` claim (epoch seconds), or None when
+    the token does not carry one.
+    """
+    if not LOGIN_BREAKER.allow():
+        logger.warning("Login skipped, circuit open")
+        return None, None, None
+
+    session = new_session()
+    session.headers.update(LOGIN_HEADERS)
+
+    with metrics.upstream_call("login") as call:
+        try:
+            response = session.post(
+                LOGIN_API, json=_login_payload(username, password), timeout=TIMEOUT
+            )
+            call.status = str(response.status_code)
+            _record(response.status_code)
+            token, ally_id, expires_at = _parse_login(
+                response.status_code, response.json
+            )
+
+            if not token:
+                return None, None, None
+
+            _authorize(session, token)
+            return session, ally_id, expires_at
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            call.status = "connection_error"
+            LOGIN_BREAKER.record_failure()
+            logger.error(f"Login request failed: {e}")
+            return None, None, None
+
+        except Exception as e:
+            logger.error(f"Login exception: {e}")
+            return None, None, None
+
+
+async def login_async(
+    username: Optional[str] = USUARIO, password: Optional[str] = PASSWORD
+):
+    """Async login over the shared client.
+
+    Returns the same ``(session, ally_id, expires_at)`` as ``login``; the session is
+    only used as the holder of the authorization headers.
+    """
+    import httpx
+
+    if not LOGIN_BREAKER.allow():
+        logger.warning("Login skipped, circuit open")
+        return None, None, None
+
+    with metrics.upstream_call("login") as call:
+        try:
+            client = get_async_client()
+            response = await client.post(
+                LOGIN_API,
+                json=_login_payload(username, password),
+                headers=LOGIN_HEADERS,
+                timeout=TIMEOUT,
+            )
+            call.status = str(response.status_code)
+            _record(response.status_code)
+            token, ally_id, expires_at = _parse_login(
+                response.status_code, response.json
+            )
+
+            if not token:
+                return None, None, None
+
+            session = new_session()
+            session.headers.update(LOGIN_HEADERS)
+            _authorize(session, token)
+            return session, ally_id, expires_at
+
+        except httpx.TransportError as e:
+            call.status = "connection_error"
+            LOGIN_BREAKER.record_failure()
+            logger.error(f"Login request failed: {e}")
+            return None, None, None
+
+        except Exception as e:
+            logger.error(f"Login exception: {e}")
+            return None, None, None
+
+
+def _login_payload(username: Optional[str], password: Optional[str]) -> dict:
+    return {
+        "usuario": username,
+        "password": password,
         "captcha": "exitoso",
         "Latitud": "",
         "Longitud": "",
     }
 
-    try:
-        response = session.post(LOGIN_API, json=payload, timeout=TIMEOUT)
 
-        if response.status_code != 200:
-            logger.error(f"Login failed: HTTP {response.status_code}")
-            return None, None
+def _parse_login(
+    status_code: int, read_json
+) -> tuple[Optional[str], Optional[str], Optional[float]]:
+    if status_code != 200:
+        logger.error(f"Login failed: HTTP {status_code}")
+        return None, None, None
 
-        data = response.json()
+    data = read_json()
 
-        if not data.get("valid"):
-            logger.error(f"Login invalid: {data.get('message')}")
-            return None, None
+    if not data.get("valid"):
+        logger.error(f"Login invalid: {data.get('message')}")
+        return None, None, None
 
-        auth_data = data.get("data", {})
-        token = auth_data.get("authToken")
+    auth_data = data.get("data", {})
+    token = auth_data.get("authToken")
 
-        if not token:
-            logger.error("No authToken in response")
-            return None, None
+    if not token:
+        logger.error("No authToken in response")
+        return None, None, None
 
-        decoded = jwt.decode(token, options={"verify_signature": False})
-        ally_id = decoded.get("commercialAllyId")
+    import jwt
 
-        session.headers.update(
-            {
-                "authorization": f"Bearer {token}",
-                "referer": "https://appweb.calidda.com.pe/WebFNB/consulta-credito",
-            }
-        )
+    decoded = jwt.decode(token, options={"verify_signature": False})
+    ally_id = decoded.get("commercialAllyId")
+    expires_at = decoded.get("exp")
+    if replaying():
+        # Recorded tokens are long expired, keep the session for SESSION_TTL
+        expires_at = None
 
-        return session, ally_id
+    return token, ally_id, float(expires_at) if expires_at else None
 
-    except Exception as e:
-        logger.error(f"Login exception: {e}")
-        return None, None
+
+def _record(status_code: int) -> None:
+    if status_code >= 500:
+        LOGIN_BREAKER.record_failure()
+    else:
+        LOGIN_BREAKER.record_success()
+
+
+def _authorize(session: requests.Session, token: str) -> None:
+    session.headers.update(
+        {
+            "authorization": f"Bearer {token}",
+            "referer": "https://appweb.calidda.com.pe/WebFNB/consulta-credito",
+        }
+    )
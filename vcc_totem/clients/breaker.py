@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+
+from vcc_totem.config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_HALF_OPEN_PROBES,
+    BREAKER_OPEN_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fails fast while an upstream is down instead of waiting for timeouts.
+
+    ``failure_threshold`` consecutive failures open the circuit. After
+    ``open_seconds`` up to ``half_open_probes`` calls are let through; the
+    circuit closes once that many succeed and reopens on any failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._probed_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def available(self) -> bool:
+        """Whether a call would be let through, without reserving a probe."""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (
+                state == HALF_OPEN and self._probes < self.half_open_probes
+            )
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+
+            if state == OPEN:
+                self._stats["rejected"] += 1
+                return False
+
+            if state == HALF_OPEN:
+                if self._state == OPEN:
+                    self._state = HALF_OPEN
+                    self._probes = 0
+                    self._probe_successes = 0
+                if self._probes >= self.half_open_probes:
+                    if time.monotonic() - self._probed_at < self.open_seconds:
+                        self._stats["rejected"] += 1
+                        return False
+                    # Probes that never reported back (cancelled tasks)
+                    self._probes = self._probe_successes
+                self._probes += 1
+                self._probed_at = time.monotonic()
+
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state != HALF_OPEN:
+                return
+
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._state = CLOSED
+                logger.info(f"Circuit {self.name} closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def reset(self) -> None:
+        """Close the circuit and forget past failures and stats."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+            self._probe_successes = 0
+            self._stats = {"rejected": 0, "opened": 0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "state": self._current_state(),
+                "failures": self._failures,
+            }
+
+    def _current_state(self) -> str:
+        if (
+            self._state == OPEN
+            and time.monotonic() - self._opened_at >= self.open_seconds
+        ):
+            return HALF_OPEN
+        return self._state
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._stats["opened"] += 1
+        logger.warning(
+            f"Circuit {self.name} open for {self.open_seconds}s "
+            f"after {self._failures} failures"
+        )
+
+
+def _breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        open_seconds=BREAKER_OPEN_SECONDS,
+        half_open_probes=BREAKER_HALF_OPEN_PROBES,
+    )
+
+
+FNB_BREAKER = _breaker("fnb")
+LOGIN_BREAKER = _breaker("fnb_login")
+GASO_BREAKER = _breaker("gaso")
+
+
+def breaker_states() -> dict:
+    return {b.name: b.stats() for b in (FNB_BREAKER, LOGIN_BREAKER, GASO_BREAKER)}
@@ -2,7 +2,11 @@ import requests
 import logging
 from typing import Optional
 
+from vcc_totem import deadline
 from vcc_totem.config import CONSULTA_API, TIMEOUT
+from vcc_totem.clients.breaker import FNB_BREAKER
+from vcc_totem.clients.http import get_async_client
+from vcc_totem.clients.ratelimit import FNB_RATE, THROTTLED, is_throttle_status
 
 logger = logging.getLogger(__name__)
 
@@ -10,48 +14,150 @@ logger = logging.getLogger(__name__)
 def query_credit_line(
     session: requests.Session, dni: str, ally_id: str
 ) -> tuple[Optional[dict], str, Optional[str]]:
-    params = {
-        "numeroDocumento": dni,
-        "tipoDocumento": "PE2",
-        "idAliado": ally_id,
-        "canal": "FNB",
-    }
+    if deadline.expired():
+        return deadline.exceeded()
+    if not FNB_BREAKER.allow():
+        return None, "circuit_open", "FNB circuit open"
 
+    refused = FNB_RATE.acquire()
+    if refused:
+        return _refused(dni, refused)
     try:
-        response = session.get(CONSULTA_API, params=params, timeout=TIMEOUT)
-
-        if response.status_code == 200:
-            data = response.json()
+        response = session.get(
+            CONSULTA_API,
+            params=_params(dni, ally_id),
+            timeout=deadline.timeout(TIMEOUT),
+        )
+        _pace(response.status_code)
+        return _parse_response(dni, response.status_code, response.json)
 
-            if data is None:
-                logger.error(f"Empty response for DNI {dni}")
-                return None, "error", "Empty response from API"
+    except requests.exceptions.Timeout:
+        if deadline.expired():
+            return _deadline_exceeded(dni)
+        FNB_RATE.on_throttle()
+        FNB_BREAKER.record_failure()
+        logger.error(f"Timeout querying DNI {dni} after {TIMEOUT}s")
+        return None, "timeout", f"Request timeout after {TIMEOUT} seconds"
 
-            if data.get("valid"):
-                if "data" not in data:
-                    logger.error(f"Missing data field for DNI {dni}")
-                    return None, "error", "Missing data field in response"
+    except requests.exceptions.ConnectionError as e:
+        if deadline.expired():
+            return _deadline_exceeded(dni)
+        FNB_BREAKER.record_failure()
+        logger.error(f"FNB connection error for DNI {dni}: {e}")
+        return None, "error", str(e)
 
-                client_data = data["data"]
-                client_data["segmento"] = "fnb"
-                return client_data, "success", None
+    except Exception as e:
+        logger.error(f"FNB query exception for DNI {dni}: {e}")
+        return None, "error", str(e)
 
-            message = data.get("message", "No message provided")
-            return None, "not_found", message
 
-        if response.status_code == 401:
-            return None, "session_expired", "Session expired"
+async def query_credit_line_async(
+    session: requests.Session, dni: str, ally_id: str
+) -> tuple[Optional[dict], str, Optional[str]]:
+    import httpx
 
-        if response.status_code == 429:
-            return None, "rate_limited", "Too many requests"
+    if deadline.expired():
+        return deadline.exceeded()
+    if not FNB_BREAKER.allow():
+        return None, "circuit_open", "FNB circuit open"
 
-        logger.error(f"FNB API error: HTTP {response.status_code}")
-        return None, "error", f"HTTP {response.status_code}"
+    refused = await FNB_RATE.acquire_async()
+    if refused:
+        return _refused(dni, refused)
+    try:
+        client = get_async_client()
+        response = await client.get(
+            CONSULTA_API,
+            params=_params(dni, ally_id),
+            headers=dict(session.headers),
+            timeout=deadline.timeout(TIMEOUT),
+        )
+        _pace(response.status_code)
+        return _parse_response(dni, response.status_code, response.json)
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
+        if deadline.expired():
+            return _deadline_exceeded(dni)
+        FNB_RATE.on_throttle()
+        FNB_BREAKER.record_failure()
         logger.error(f"Timeout querying DNI {dni} after {TIMEOUT}s")
         return None, "timeout", f"Request timeout after {TIMEOUT} seconds"
 
+    except httpx.TransportError as e:
+        if deadline.expired():
+            return _deadline_exceeded(dni)
+        FNB_BREAKER.record_failure()
+        logger.error(f"FNB connection error for DNI {dni}: {e}")
+        return None, "error", str(e)
+
     except Exception as e:
         logger.error(f"FNB query exception for DNI {dni}: {e}")
         return None, "error", str(e)
+
+
+def _refused(dni: str, status: str) -> tuple[None, str, str]:
+    """No send slot within the rate limiter's max wait or the deadline."""
+    if status == THROTTLED:
+        logger.warning(f"FNB query for DNI {dni} throttled locally, not sent")
+        return None, THROTTLED, "Too many queued FNB queries"
+    deadline.spend()
+    return _deadline_exceeded(dni)
+
+
+def _deadline_exceeded(dni: str) -> tuple[None, str, str]:
+    # Our own budget ran out, FNB is not to blame: no backoff, no breaker failure
+    logger.warning(f"Deadline exceeded querying DNI {dni}")
+    return deadline.exceeded()
+
+
+def _pace(status_code: int) -> None:
+    if is_throttle_status(status_code):
+        FNB_RATE.on_throttle()
+    else:
+        FNB_RATE.on_success()
+
+    if status_code >= 500:
+        FNB_BREAKER.record_failure()
+    else:
+        FNB_BREAKER.record_success()
+
+
+def _params(dni: str, ally_id: str) -> dict:
+    return {
+        "numeroDocumento": dni,
+        "tipoDocumento": "PE2",
+        "idAliado": ally_id,
+        "canal": "FNB",
+    }
+
+
+def _parse_response(
+    dni: str, status_code: int, read_json
+) -> tuple[Optional[dict], str, Optional[str]]:
+    if status_code == 200:
+        data = read_json()
+
+        if data is None:
+            logger.error(f"Empty response for DNI {dni}")
+            return None, "error", "Empty response from API"
+
+        if data.get("valid"):
+            if "data" not in data:
+                logger.error(f"Missing data field for DNI {dni}")
+                return None, "error", "Missing data field in response"
+
+            client_data = data["data"]
+            client_data["segmento"] = "fnb"
+            return client_data, "success", None
+
+        message = data.get("message", "No message provided")
+        return None, "not_found", message
+
+    if status_code == 401:
+        return None, "session_expired", "Session expired"
+
+    if status_code == 429:
+        return None, "rate_limited", "Too many requests"
+
+    logger.error(f"FNB API error: HTTP {status_code}")
+    return None, "error", f"HTTP {status_code}"
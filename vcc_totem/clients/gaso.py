@@ -1,19 +1,43 @@
+import asyncio
+import contextvars
+import json
 import requests
+import httpx
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from dataclasses import dataclass
 
+from vcc_totem import deadline, metrics
+from vcc_totem.config import POWERBI_API_URL
+from vcc_totem.clients import http
+from vcc_totem.clients.breaker import GASO_BREAKER
+from vcc_totem.clients.hedge import GASO_HEDGE
+from vcc_totem.clients.ratelimit import GASO_RATE, THROTTLED, is_throttle_status
+
+try:
+    import orjson
+except ImportError:  # optional: pip install "vcc-totem[fast]"
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
 @dataclass(frozen=True)
 class PowerBIConfig:
-    api_url: str = "https://wabi-south-central-us-api.analysis.windows.net/public/reports/querydata"
+    api_url: str = POWERBI_API_URL
     resource_key: str = "96e10df6-51ec-4855-90c0-46efab054e4a"
     dataset_id: str = "4570cf7b-a48f-440e-8f93-226828a3a243"
     report_id: str = "2f8ea0ef-30a2-442c-af53-b3fc7bfa1027"
     model_id: int = 11453601
     timeout: int = 30
+    batch_initial_size: int = 50
+    batch_min_size: int = 1
+    batch_max_size: int = 500
+    batch_target_seconds: float = 5.0
+    batch_max_bytes: int = 2_000_000
 
 
 @dataclass(frozen=True)
@@ -29,8 +53,41 @@ class VisualIDs:
     estado_cta: str = "fedcba9876543210abcd"
 
 
+class ChunkSizer:
+    """Picks how many DNIs go into one PowerBI query.
+
+    After each chunk, the size is re-estimated from the observed latency and
+    response size per DNI so that a chunk stays under the configured latency
+    and byte targets. Failed chunks halve the size.
+    """
+
+    def __init__(self, config: PowerBIConfig):
+        self.config = config
+        self.size = config.batch_initial_size
+        self._lock = threading.Lock()
+
+    def next_size(self) -> int:
+        with self._lock:
+            return self.size
+
+    def record(self, chunk_size: int, elapsed: float, nbytes: int, ok: bool) -> None:
+        config = self.config
+
+        with self._lock:
+            if not ok:
+                estimate = chunk_size // 2
+            else:
+                by_time = chunk_size * config.batch_target_seconds / max(elapsed, 0.001)
+                by_bytes = chunk_size * config.batch_max_bytes / max(nbytes, 1)
+                estimate = int(min(by_time, by_bytes) * 0.8)
+                estimate = max(min(estimate, chunk_size * 2), chunk_size // 2)
+
+            self.size = max(config.batch_min_size, min(config.batch_max_size, estimate))
+
+
 CONFIG = PowerBIConfig()
 VISUAL_IDS = VisualIDs()
+CHUNK_SIZER = ChunkSizer(CONFIG)
 
 HEADERS = {
     "Accept": "application/json, text/plain, */*",
@@ -43,17 +100,141 @@ HEADERS = {
 }
 
 
+FIELDS = (
+    ("Estado", VISUAL_IDS.estado),
+    ("Cliente", VISUAL_IDS.nombre),
+    ("Saldo", VISUAL_IDS.saldo),
+    ("Cuenta_contrato", VISUAL_IDS.cta_contrato),
+    ("Dirección", VISUAL_IDS.direccion),
+    ("Distrito", VISUAL_IDS.distrito),
+)
+FIELD_NAMES = [name for name, _ in FIELDS]
+# Without these the client data would misstate the offer
+REQUIRED_FIELDS = ("Estado", "Saldo")
+
+
 def query_credit_line(dni: str) -> tuple[Optional[dict], str, Optional[str]]:
-    estado = _query_field(dni, "Estado", VISUAL_IDS.estado)
+    if not GASO_BREAKER.available():
+        return _circuit_open()
+
+    values = _query_fields(dni)
+    if values is None and deadline.expired():
+        return deadline.exceeded()
+    return _to_credit_line(dni, values)
+
+
+async def query_credit_line_async(
+    dni: str,
+) -> tuple[Optional[dict], str, Optional[str]]:
+    if not GASO_BREAKER.available():
+        return _circuit_open()
+
+    values = await _query_fields_async(dni)
+    if values is None and deadline.expired():
+        return deadline.exceeded()
+    return _to_credit_line(dni, values)
+
+
+def query_credit_lines(
+    dnis: list[str],
+) -> dict[str, tuple[Optional[dict], str, Optional[str]]]:
+    """Look up many DNIs with exact-match ``In`` queries, one per chunk.
+
+    Returns the same ``(client_data, status, error)`` tuple as
+    ``query_credit_line`` for every requested DNI.
+    """
+    results = {}
+    pending = list(dict.fromkeys(dnis))
+
+    if not GASO_BREAKER.available():
+        return {dni: _circuit_open() for dni in pending}
+
+    while pending:
+        size = CHUNK_SIZER.next_size()
+        chunk, pending = pending[:size], pending[size:]
+        chunk_results = _query_chunk(chunk)
+
+        if chunk_results is not None:
+            results.update(chunk_results)
+        elif len(chunk) > 1:
+            # The sizer halved the chunk size after the failure, retry smaller
+            pending = chunk + pending
+        else:
+            # Once more, still as an exact In match: a Contains query would
+            # also return clients whose DNI merely includes this one
+            results.update(_query_chunk(chunk) or {chunk[0]: _chunk_failed()})
+
+    return results
+
 
-    if not estado or estado == "--" or not estado.strip():
+def check_connection() -> bool:
+    try:
+        payload = _build_query_payload("00000000", "Estado", VISUAL_IDS.estado)
+        response = _execute_query(payload, "health")
+        return response is not None
+    except Exception:
+        return False
+
+
+async def check_connection_async() -> bool:
+    try:
+        payload = _build_query_payload("00000000", "Estado", VISUAL_IDS.estado)
+        response = await _execute_query_async(payload, "health")
+        return response is not None
+    except Exception:
+        return False
+
+
+def _to_credit_line(
+    dni: str, values: Optional[dict[str, Optional[str]]]
+) -> tuple[Optional[dict], str, Optional[str]]:
+    if values is None:
+        return None, "error", "PowerBI query failed"
+
+    estado = values.get("Estado")
+
+    if not _is_found(estado):
         return None, "not_found", "Client not found in GASO"
+    # A balance cut off by the deadline would read as 0, i.e. no credit line
+    if any(values.get(name) is None for name in REQUIRED_FIELDS):
+        if deadline.expired():
+            return deadline.exceeded()
+
+    return _build_client_data(dni, values), "success", None
+
+
+def _refused(status: str, field: str) -> None:
+    """No send slot within the rate limiter's max wait or the deadline."""
+    if status == deadline.EXCEEDED:
+        deadline.spend()
+    logger.warning(f"PowerBI query {field} not sent: {status}")
+
+
+def _cut_short(call, field: str) -> None:
+    # Our own budget ran out: not a PowerBI failure, no backoff or breaker
+    call.status = deadline.EXCEEDED
+    logger.warning(f"PowerBI query {field} cut short by the deadline")
+
+
+def _chunk_failed() -> tuple[None, str, str]:
+    return None, "error", "PowerBI batch query failed"
 
-    name = _query_field(dni, "Cliente", VISUAL_IDS.nombre)
-    balance = _query_field(dni, "Saldo", VISUAL_IDS.saldo)
-    account = _query_field(dni, "Cuenta_contrato", VISUAL_IDS.cta_contrato)
-    address = _query_field(dni, "Dirección", VISUAL_IDS.direccion)
-    district = _query_field(dni, "Distrito", VISUAL_IDS.distrito)
+
+def _circuit_open() -> tuple[None, str, str]:
+    return None, "circuit_open", "PowerBI circuit open"
+
+
+def _is_found(estado: Optional[str]) -> bool:
+    return bool(estado and estado != "--" and estado.strip())
+
+
+def _build_client_data(dni: str, values: dict) -> dict:
+    estado = values.get("Estado")
+    name = values.get("Cliente")
+    balance = values.get("Saldo")
+    account = values.get("Cuenta_contrato")
+    address = values.get("Dirección")
+    district = values.get("Distrito")
 
     balance_amount = _parse_balance(balance)
     has_credit = balance_amount > 0 and estado.upper() != "NO APLICA"
@@ -66,7 +247,7 @@ def query_credit_line(dni: str) -> tuple[Optional[dict], str, Optional[str]]:
     elif district:
         full_address = district
 
-    client_data = {
+    return {
         "dni": dni,
         "nombre": name or "Cliente GASO",
         "estado": estado,
@@ -78,21 +259,162 @@ def query_credit_line(dni: str) -> tuple[Optional[dict], str, Optional[str]]:
         "segmento": "gaso",
     }
 
-    return client_data, "success", None
 
+def _query_fields(dni: str) -> Optional[dict[str, Optional[str]]]:
+    """Fetch every field in FIELDS with a single multi-measure query.
 
-def check_connection() -> bool:
-    try:
-        payload = _build_query_payload("00000000", "Estado", VISUAL_IDS.estado)
-        response = _execute_query(payload)
-        return response is not None
-    except Exception:
-        return False
+    Falls back to one query per field when the combined select is rejected.
+    Returns None when PowerBI could not be queried at all.
+    """
+    payload = _build_measures_payload(dni, FIELD_NAMES, VISUAL_IDS.estado)
+    response = _execute_query(payload, "all")
+    rows = _extract_rows(response) if response else None
+
+    if rows is None and deadline.expired():
+        return None
+    if rows is None:
+        logger.warning(
+            f"Combined PowerBI query failed for DNI {dni}, querying per field"
+        )
+        return _query_fields_per_field(dni)
+
+    return _values_from_rows(rows)
+
+
+async def _query_fields_async(dni: str) -> Optional[dict[str, Optional[str]]]:
+    payload = _build_measures_payload(dni, FIELD_NAMES, VISUAL_IDS.estado)
+    response = await _execute_query_async(payload, "all")
+    rows = _extract_rows(response) if response else None
+
+    if rows is None and deadline.expired():
+        return None
+    if rows is None:
+        logger.warning(
+            f"Combined PowerBI query failed for DNI {dni}, querying per field"
+        )
+        return await _query_fields_per_field_async(dni)
+
+    return _values_from_rows(rows)
+
+
+def _values_from_rows(rows: list[list]) -> dict[str, Optional[str]]:
+    if not rows:
+        return {}
+
+    return {name: _clean_value(value) for name, value in zip(FIELD_NAMES, rows[0])}
+
+
+def _query_fields_per_field(dni: str) -> Optional[dict[str, Optional[str]]]:
+    estado_name, estado_visual = FIELDS[0]
+    response = _execute_query(
+        _build_query_payload(dni, estado_name, estado_visual), estado_name
+    )
+
+    if response is None:
+        return None
+
+    values = {estado_name: _extract_value(response)}
+
+    if not _is_found(values[estado_name]):
+        return values
+
+    remaining = FIELDS[1:]
+    with ThreadPoolExecutor(max_workers=len(remaining)) as executor:
+        futures = {
+            name: executor.submit(
+                contextvars.copy_context().run, _query_field, dni, name, visual_id
+            )
+            for name, visual_id in remaining
+        }
+        for name, future in futures.items():
+            values[name] = future.result()
+
+    return values
+
+
+async def _query_fields_per_field_async(
+    dni: str,
+) -> Optional[dict[str, Optional[str]]]:
+    estado_name, estado_visual = FIELDS[0]
+    response = await _execute_query_async(
+        _build_query_payload(dni, estado_name, estado_visual), estado_name
+    )
+
+    if response is None:
+        return None
+
+    values = {estado_name: _extract_value(response)}
+
+    if not _is_found(values[estado_name]):
+        return values
+
+    remaining = FIELDS[1:]
+    fetched = await asyncio.gather(
+        *(_query_field_async(dni, name, visual_id) for name, visual_id in remaining)
+    )
+    values.update(zip((name for name, _ in remaining), fetched))
+
+    return values
+
+
+def _query_chunk(
+    dnis: list[str],
+) -> Optional[dict[str, tuple[Optional[dict], str, Optional[str]]]]:
+    unsent = _unsent("batch")
+    if unsent is not None:
+        return {dni: unsent for dni in dnis}
+
+    payload = _build_batch_payload(dnis, FIELD_NAMES, VISUAL_IDS.estado)
+    start = time.monotonic()
+    response = _post(payload, "batch")
+    elapsed = time.monotonic() - start
+
+    rows = None
+    if response is not None:
+        try:
+            rows = _extract_rows(_parse_querydata(response.content))
+        except ValueError as e:
+            logger.error(f"Invalid PowerBI JSON: {e}")
+
+    if rows is None and deadline.expired():
+        # Cut short by our own budget, which says nothing of the chunk size
+        return {dni: deadline.exceeded() for dni in dnis}
+
+    nbytes = len(response.content) if response is not None else 0
+    CHUNK_SIZER.record(len(dnis), elapsed, nbytes, ok=rows is not None)
+
+    if rows is None:
+        logger.warning(f"PowerBI batch query failed for {len(dnis)} DNIs")
+        return None
+
+    by_dni = {}
+    for row in rows:
+        dni = _clean_value(row[0])
+        if dni and dni not in by_dni:
+            by_dni[dni] = dict(zip(FIELD_NAMES, (_clean_value(v) for v in row[1:])))
+
+    results = {}
+    for dni in dnis:
+        results[dni] = _to_credit_line(dni, by_dni.get(dni, {}))
+
+    return results
 
 
 def _query_field(dni: str, field_name: str, visual_id: str) -> Optional[str]:
     payload = _build_query_payload(dni, field_name, visual_id)
-    response = _execute_query(payload)
+    response = _execute_query(payload, field_name)
+
+    if not response:
+        return None
+
+    return _extract_value(response)
+
+
+async def _query_field_async(
+    dni: str, field_name: str, visual_id: str
+) -> Optional[str]:
+    payload = _build_query_payload(dni, field_name, visual_id)
+    response = await _execute_query_async(payload, field_name)
 
     if not response:
         return None
@@ -126,6 +448,80 @@ def _parse_balance(balance_str: str) -> float:
 
 
 def _build_query_payload(dni: str, property_name: str, visual_id: str) -> dict:
+    return _build_measures_payload(dni, [property_name], visual_id)
+
+
+def _build_measures_payload(
+    dni: str, property_names: list[str], visual_id: str
+) -> dict:
+    selects = [_measure_select(name) for name in property_names]
+
+    condition = {
+        "Contains": {
+            "Left": _dni_column(),
+            "Right": {"Literal": {"Value": f"'{dni}'"}},
+        }
+    }
+
+    return _build_semantic_query(selects, condition, visual_id)
+
+
+def _build_batch_payload(
+    dnis: list[str], property_names: list[str], visual_id: str
+) -> dict:
+    dni_select = {
+        **_dni_column(),
+        "Name": "BD.DNI",
+        "NativeReferenceName": "DNI",
+    }
+    selects = [dni_select] + [_measure_select(name) for name in property_names]
+
+    condition = {
+        "In": {
+            "Expressions": [_dni_column()],
+            "Values": [[{"Literal": {"Value": f"'{dni}'"}}] for dni in dnis],
+        }
+    }
+
+    return _build_semantic_query(selects, condition, visual_id, window=len(dnis))
+
+
+def _measure_select(property_name: str) -> dict:
+    return {
+        "Measure": {
+            "Expression": {"SourceRef": {"Source": "m"}},
+            "Property": property_name,
+        },
+        "Name": f"Medidas.{property_name}",
+        "NativeReferenceName": property_name,
+    }
+
+
+def _dni_column() -> dict:
+    return {
+        "Column": {
+            "Expression": {"SourceRef": {"Source": "b"}},
+            "Property": "DNI",
+        }
+    }
+
+
+def _build_semantic_query(
+    selects: list[dict],
+    condition: dict,
+    visual_id: str,
+    window: Optional[int] = None,
+) -> dict:
+    binding = {
+        "Primary": {"Groupings": [{"Projections": list(range(len(selects)))}]},
+        "Version": 1,
+    }
+    if window:
+        binding["DataReduction"] = {
+            "DataVolume": 3,
+            "Primary": {"Window": {"Count": window}},
+        }
+
     return {
         "version": "1.0.0",
         "queries": [
@@ -140,44 +536,10 @@ def _build_query_payload(dni: str, property_name: str, visual_id: str) -> dict:
                                         {"Name": "m", "Entity": "Medidas", "Type": 0},
                                         {"Name": "b", "Entity": "BD", "Type": 0},
                                     ],
-                                    "Select": [
-                                        {
-                                            "Measure": {
-                                                "Expression": {
-                                                    "SourceRef": {"Source": "m"}
-                                                },
-                                                "Property": property_name,
-                                            },
-                                            "Name": f"Medidas.{property_name}",
-                                            "NativeReferenceName": property_name,
-                                        }
-                                    ],
-                                    "Where": [
-                                        {
-                                            "Condition": {
-                                                "Contains": {
-                                                    "Left": {
-                                                        "Column": {
-                                                            "Expression": {
-                                                                "SourceRef": {
-                                                                    "Source": "b"
-                                                                }
-                                                            },
-                                                            "Property": "DNI",
-                                                        }
-                                                    },
-                                                    "Right": {
-                                                        "Literal": {"Value": f"'{dni}'"}
-                                                    },
-                                                }
-                                            }
-                                        }
-                                    ],
-                                },
-                                "Binding": {
-                                    "Primary": {"Groupings": [{"Projections": [0]}]},
-                                    "Version": 1,
+                                    "Select": selects,
+                                    "Where": [{"Condition": condition}],
                                 },
+                                "Binding": binding,
                                 "ExecutionMetricsKind": 1,
                             }
                         }
@@ -195,60 +557,325 @@ def _build_query_payload(dni: str, property_name: str, visual_id: str) -> dict:
     }
 
 
-def _execute_query(payload: dict) -> Optional[dict]:
-    try:
-        url = f"{CONFIG.api_url}?synchronous=true"
-        response = requests.post(
-            url,
-            headers=HEADERS,
-            json=payload,
-            timeout=CONFIG.timeout,
-        )
+def _execute_query(payload: dict, field: str = "-") -> Optional[dict]:
+    return GASO_HEDGE.run(lambda: _execute_once(payload, field))
 
-        if response.status_code == 200:
-            return response.json()
 
-        logger.error(f"PowerBI API error: HTTP {response.status_code}")
-        return None
+def _execute_once(payload: dict, field: str = "-") -> Optional[dict]:
+    response = _send_query(payload, field)
 
-    except requests.exceptions.Timeout:
-        logger.error(f"PowerBI timeout ({CONFIG.timeout}s)")
+    if response is None:
         return None
-    except requests.exceptions.ConnectionError as e:
-        logger.error(f"PowerBI connection error: {e}")
+
+    try:
+        return _parse_querydata(response.content)
+    except ValueError as e:
+        logger.error(f"Invalid PowerBI JSON: {e}")
         return None
-    except Exception as e:
-        logger.error(f"PowerBI query exception: {e}")
+
+
+def _send_query(payload: dict, field: str = "-") -> Optional[requests.Response]:
+    if _unsent(field) is not None:
         return None
+    return _post(payload, field)
+
+
+def _unsent(field: str) -> Optional[tuple[None, str, str]]:
+    """Why a query cannot be sent now, as its ``(data, status, error)``.
+
+    None when it can: the deadline has not passed, the circuit lets it
+    through and the rate limiter gave it a send slot.
+    """
+    if deadline.expired():
+        return deadline.exceeded()
+    if not GASO_BREAKER.allow():
+        return _circuit_open()
+
+    refused = GASO_RATE.acquire()
+    if refused:
+        _refused(refused, field)
+        if refused == THROTTLED:
+            return None, THROTTLED, "Too many queued PowerBI queries"
+        return deadline.exceeded()
+    return None
+
+
+def _post(payload: dict, field: str) -> Optional[requests.Response]:
+    with metrics.upstream_call("gaso", field) as call:
+        try:
+            url = f"{CONFIG.api_url}?synchronous=true"
+            response = http.get_session().post(
+                url,
+                headers=HEADERS,
+                json=payload,
+                timeout=deadline.timeout(CONFIG.timeout),
+            )
+
+            call.status = str(response.status_code)
+            if response.status_code == 200:
+                GASO_RATE.on_success()
+                GASO_BREAKER.record_success()
+                return response
+
+            if is_throttle_status(response.status_code):
+                GASO_RATE.on_throttle()
+            if response.status_code >= 500:
+                GASO_BREAKER.record_failure()
+            else:
+                GASO_BREAKER.record_success()
+            logger.error(f"PowerBI API error: HTTP {response.status_code}")
+            return None
 
+        except requests.exceptions.Timeout:
+            if deadline.expired():
+                _cut_short(call, field)
+                return None
+            call.status = "timeout"
+            GASO_RATE.on_throttle()
+            GASO_BREAKER.record_failure()
+            logger.error(f"PowerBI timeout ({CONFIG.timeout}s)")
+            return None
+        except requests.exceptions.ConnectionError as e:
+            if deadline.expired():
+                _cut_short(call, field)
+                return None
+            call.status = "connection_error"
+            GASO_RATE.on_throttle()
+            GASO_BREAKER.record_failure()
+            logger.error(f"PowerBI connection error: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"PowerBI query exception: {e}")
+            return None
+
+
+async def _execute_query_async(payload: dict, field: str = "-") -> Optional[dict]:
+    return await GASO_HEDGE.run_async(lambda: _execute_once_async(payload, field))
+
+
+async def _execute_once_async(payload: dict, field: str = "-") -> Optional[dict]:
+    response = await _send_query_async(payload, field)
+
+    if response is None:
+        return None
 
-def _extract_value(response: dict) -> Optional[str]:
     try:
-        results = response.get("results", [])
-        if not results:
-            return None
+        return _parse_querydata(response.content)
+    except ValueError as e:
+        logger.error(f"Invalid PowerBI JSON: {e}")
+        return None
 
-        result = results[0].get("result", {})
-        data = result.get("data", {})
-        dsr = data.get("dsr", {})
-        ds = dsr.get("DS", [])
 
-        if not ds:
-            return None
+async def _send_query_async(
+    payload: dict, field: str = "-"
+) -> Optional[httpx.Response]:
+    if deadline.expired() or not GASO_BREAKER.allow():
+        return None
 
-        ph = ds[0].get("PH", [])
-        if not ph:
+    refused = await GASO_RATE.acquire_async()
+    if refused:
+        _refused(refused, field)
+        return None
+    with metrics.upstream_call("gaso", field) as call:
+        try:
+            client = http.get_async_client()
+            url = f"{CONFIG.api_url}?synchronous=true"
+            response = await client.post(
+                url,
+                headers=HEADERS,
+                json=payload,
+                timeout=deadline.timeout(CONFIG.timeout),
+            )
+
+            call.status = str(response.status_code)
+            if response.status_code == 200:
+                GASO_RATE.on_success()
+                GASO_BREAKER.record_success()
+                return response
+
+            if is_throttle_status(response.status_code):
+                GASO_RATE.on_throttle()
+            if response.status_code >= 500:
+                GASO_BREAKER.record_failure()
+            else:
+                GASO_BREAKER.record_success()
+            logger.error(f"PowerBI API error: HTTP {response.status_code}")
             return None
 
-        dm0 = ph[0].get("DM0", [])
-        if not dm0:
+        except httpx.TimeoutException:
+            if deadline.expired():
+                _cut_short(call, field)
+                return None
+            call.status = "timeout"
+            GASO_RATE.on_throttle()
+            GASO_BREAKER.record_failure()
+            logger.error(f"PowerBI timeout ({CONFIG.timeout}s)")
+            return None
+        except httpx.TransportError as e:
+            if deadline.expired():
+                _cut_short(call, field)
+                return None
+            call.status = "connection_error"
+            GASO_RATE.on_throttle()
+            GASO_BREAKER.record_failure()
+            logger.error(f"PowerBI connection error: {e}")
             return None
+        except Exception as e:
+            logger.error(f"PowerBI query exception: {e}")
+            return None
+
+
+_DECODER = json.JSONDecoder()
+_DSR_KEY = '"dsr":'
+# Past this size the rows outweigh the blocks skipped around ``dsr`` and a
+# plain json.loads is faster (python -m benchmarks.decode: about 30 KiB,
+# some 200 DNIs per batch)
+_PARTIAL_DECODE_MAX = 24 * 1024
+
+
+def _parse_querydata(body: bytes) -> dict:
+    """Parse a querydata body down to what ``_extract_rows`` reads.
+
+    With orjson installed the whole body is parsed, which is faster still.
+    Otherwise only the ``dsr`` object of a small body (single DNIs and small
+    batches) is decoded: ``raw_decode`` stops at its end, skipping the
+    descriptor and metrics blocks around it. Large bodies, and bodies that
+    mention an error so ``_extract_rows`` can report it, are parsed whole.
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+
+    if len(body) > _PARTIAL_DECODE_MAX:
+        return json.loads(body)
+
+    text = body.decode("utf-8")
+    start = text.find(_DSR_KEY)
+    if start == -1 or 'error"' in text:
+        return json.loads(text)
+
+    index = start + len(_DSR_KEY)
+    while index < len(text) and text[index].isspace():
+        index += 1
+    dsr, _ = _DECODER.raw_decode(text, index)
 
-        value = dm0[0].get("M0")
-        if value is not None:
-            return str(value).strip() or None
+    return {"results": [{"result": {"data": {"dsr": dsr}}}]}
 
+
+def _extract_value(response: dict) -> Optional[str]:
+    rows = _extract_rows(response)
+
+    if not rows or not rows[0]:
+        return None
+
+    return _clean_value(rows[0][0])
+
+
+def _extract_rows(response: dict) -> Optional[list[list]]:
+    """Decode the DM0 rows of a querydata response into lists of column values.
+
+    Handles measure-only rows (``M0``, ``M1``...), compressed ``C`` rows with
+    their ``R`` (repeated from previous row) and ``Ø`` (null) bitmasks, and
+    value dictionary references. Returns None when PowerBI reported an error
+    instead of data, and an empty list when the query matched nothing.
+    """
+    try:
+        result = response["results"][0]["result"]
+        dsr = result["data"]["dsr"]
+    except (KeyError, IndexError, TypeError):
+        logger.error("Unexpected PowerBI response shape")
         return None
+
+    if "error" in result or any(
+        "odata.error" in shape for shape in dsr.get("DataShapes", [])
+    ):
+        logger.error("PowerBI returned an error instead of data")
+        return None
+
+    ds_list = dsr.get("DS", [])
+    if not ds_list:
+        return []
+
+    ds = ds_list[0]
+    value_dicts = ds.get("ValueDicts", {})
+    ph = ds.get("PH", [])
+    if not ph:
+        return []
+
+    try:
+        schema = None
+        previous = None
+        rows = []
+
+        for row in ph[0].get("DM0", []):
+            schema = row.get("S", schema)
+
+            if "C" in row:
+                raw = _decode_compressed_row(row, schema, previous)
+            elif schema:
+                raw = [row.get(column["N"]) for column in schema]
+            else:
+                keys = [k for k in row if k[0] == "M" and k[1:].isdigit()]
+                raw = [row[k] for k in sorted(keys, key=lambda k: int(k[1:]))]
+
+            previous = raw
+            rows.append(_resolve_value_dicts(raw, schema, value_dicts))
+
+        return rows
     except Exception as e:
-        logger.error(f"Error extracting PowerBI value: {e}")
+        logger.error(f"Error extracting PowerBI rows: {e}")
         return None
+
+
+def _decode_compressed_row(
+    row: dict, schema: Optional[list], previous: Optional[list]
+) -> list:
+    cells = row["C"]
+    repeated = row.get("R", 0)
+    nulls = row.get("Ø", 0)
+
+    if schema:
+        width = len(schema)
+    else:
+        width = len(cells) + bin(repeated | nulls).count("1")
+
+    if not repeated and not nulls:
+        # Most rows: every cell present, in column order
+        values = cells[:width]
+        values.extend([None] * (width - len(values)))
+        return values
+
+    values = []
+    position = 0
+    for i in range(width):
+        bit = 1 << i
+        if nulls & bit:
+            values.append(None)
+        elif repeated & bit and previous is not None:
+            values.append(previous[i])
+        elif position < len(cells):
+            values.append(cells[position])
+            position += 1
+        else:
+            values.append(None)
+
+    return values
+
+
+def _resolve_value_dicts(raw: list, schema: Optional[list], value_dicts: dict) -> list:
+    if not schema or not value_dicts:
+        return raw
+
+    values = list(raw)
+    for i, column in enumerate(schema):
+        dict_name = column.get("DN")
+        if dict_name and isinstance(values[i], int):
+            values[i] = value_dicts[dict_name][values[i]]
+
+    return values
+
+
+def _clean_value(value) -> Optional[str]:
+    if value is None:
+        return None
+
+    return str(value).strip() or None
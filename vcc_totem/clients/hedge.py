@@ -0,0 +1,164 @@
+import asyncio
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from vcc_totem import metrics
+from vcc_totem.config import (
+    GASO_HEDGE_BUDGET,
+    GASO_HEDGE_ENABLED,
+    GASO_HEDGE_MIN_DELAY,
+)
+
+T = TypeVar("T")
+
+# Successful call latencies the p95 is taken from, and how many are needed
+WINDOW = 200
+MIN_SAMPLES = 20
+# Unspent budget carried over, in hedges
+MAX_TOKENS = 10.0
+
+
+class Hedger:
+    """Duplicates a call that is slower than the observed p95.
+
+    Whichever copy answers first with a result wins. Every call earns
+    ``budget`` tokens and each duplicate spends one, so hedges stay under
+    that fraction of calls. A call returning None counts as failed, and the
+    other copy is awaited instead. Only async calls are hedged.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        enabled: bool,
+        budget: float = 0.05,
+        min_delay: float = 0.05,
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.budget = budget
+        self.min_delay = min_delay
+        self._latencies: deque[float] = deque(maxlen=WINDOW)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "hedged": 0, "won": 0, "over_budget": 0}
+
+    def run(self, fn: Callable[[], Optional[T]]) -> Optional[T]:
+        """Run ``fn`` on the calling thread, without a hedge.
+
+        The blocked caller cannot return a faster duplicate's answer, so a
+        hedge here would only spend budget and PowerBI queries. The call
+        still feeds the p95 used by ``run_async``.
+        """
+        return self._timed(fn)
+
+    async def run_async(self, fn: Callable[[], Awaitable[Optional[T]]]) -> Optional[T]:
+        delay = self._start()
+        if delay is None:
+            return await self._timed_async(fn)
+
+        primary = asyncio.ensure_future(self._timed_async(fn))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._spend():
+            return await primary
+
+        hedge = asyncio.ensure_future(self._timed_async(fn))
+        pending = {primary, hedge}
+        result = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    result = task.result()
+                    if result is not None:
+                        self._count_win(task is hedge)
+                        return result
+            return result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def delay(self) -> Optional[float]:
+        """Observed p95, or None until enough calls succeeded."""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return None
+            p95 = statistics.quantiles(self._latencies, n=20)[-1]
+        return max(p95, self.min_delay)
+
+    def stats(self) -> dict:
+        delay = self.delay()
+        with self._lock:
+            return {
+                **self._stats,
+                "enabled": self.enabled,
+                "delay": round(delay, 3) if delay is not None else None,
+                "tokens": round(self._tokens, 2),
+            }
+
+    def _start(self) -> Optional[float]:
+        with self._lock:
+            self._stats["calls"] += 1
+            self._tokens = min(self._tokens + self.budget, MAX_TOKENS)
+        return self.delay() if self.enabled else None
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                self._stats["over_budget"] += 1
+                exhausted = True
+            else:
+                self._tokens -= 1
+                self._stats["hedged"] += 1
+                exhausted = False
+
+        if exhausted:
+            metrics.HEDGED_REQUESTS.labels(self.name, "budget_exhausted").inc()
+            return False
+
+        metrics.HEDGED_REQUESTS.labels(self.name, "sent").inc()
+        return True
+
+    def _count_win(self, hedge_won: bool) -> None:
+        if not hedge_won:
+            return
+        with self._lock:
+            self._stats["won"] += 1
+        metrics.HEDGED_REQUESTS.labels(self.name, "won").inc()
+
+    def _timed(self, fn: Callable[[], Optional[T]]) -> Optional[T]:
+        start = time.monotonic()
+        result = fn()
+        if result is not None:
+            self._observe(time.monotonic() - start)
+        return result
+
+    async def _timed_async(
+        self, fn: Callable[[], Awaitable[Optional[T]]]
+    ) -> Optional[T]:
+        start = time.monotonic()
+        result = await fn()
+        if result is not None:
+            self._observe(time.monotonic() - start)
+        return result
+
+    def _observe(self, elapsed: float) -> None:
+        with self._lock:
+            self._latencies.append(elapsed)
+
+
+GASO_HEDGE = Hedger(
+    "gaso",
+    enabled=GASO_HEDGE_ENABLED,
+    budget=GASO_HEDGE_BUDGET,
+    min_delay=GASO_HEDGE_MIN_DELAY,
+)
+
+
+def hedge_stats() -> dict:
+    return {"gaso": GASO_HEDGE.stats()}
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import socket
+import threading
+from typing import TYPE_CHECKING, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from vcc_totem import deadline
+from vcc_totem.clients import transport
+from vcc_totem.config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRIES,
+    HTTP_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+)
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import httpx
+
+_async_client: Optional["httpx.AsyncClient"] = None
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_async_stats = {"requests": 0, "connections": 0}
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with TCP keep-alive probes on pooled sockets."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        if HTTP_KEEPALIVE:
+            kwargs["socket_options"] = _keepalive_socket_options()
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _keepalive_socket_options() -> list[tuple]:
+    options = [
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30))
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10))
+    return options
+
+
+class DeadlineRetry(Retry):
+    """Stops retrying once the request's deadline has passed."""
+
+    def is_exhausted(self) -> bool:
+        return deadline.expired() or super().is_exhausted()
+
+
+_adapter = PooledAdapter(
+    pool_connections=HTTP_POOL_CONNECTIONS,
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+    # Only failures before the request is sent are retried. A read timeout
+    # is raised as is (requests' Timeout) instead of resending a POST, and
+    # 5xx statuses are retried for the idempotent default methods only.
+    max_retries=DeadlineRetry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=False,
+        status=HTTP_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+    ),
+)
+# Same adapter, behind the cassette in record/replay mode
+_session_adapter = transport.wrap_adapter(_adapter)
+
+
+def new_session() -> requests.Session:
+    """Session whose connections come from the shared, thread-safe pool.
+
+    Every session created here mounts the same adapter, so TCP+TLS
+    connections are reused across sessions and threads.
+    """
+    session = requests.Session()
+    session.mount("https://", _session_adapter)
+    session.mount("http://", _session_adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Per-thread session for unauthenticated calls (PowerBI)."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = new_session()
+        _local.session = session
+    return session
+
+
+def get_async_client() -> "httpx.AsyncClient":
+    """Shared pooled client for the async FNB and PowerBI calls.
+
+    The client is bound to the running event loop; a new loop (e.g. a new
+    ``asyncio.run`` from a test or the CLI) gets a fresh client.
+    """
+    global _async_client, _async_loop
+
+    # httpx is only needed by the API and async paths, not by the CLI
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_MAXSIZE * HTTP_POOL_CONNECTIONS,
+                max_keepalive_connections=HTTP_POOL_MAXSIZE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            transport=transport.wrap_async_transport(
+                httpx.AsyncHTTPTransport(retries=HTTP_RETRIES)
+            ),
+            event_hooks={"request": [_trace_async_request]},
+        )
+        _async_loop = loop
+
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client, _async_loop
+
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+
+    _async_client = None
+    _async_loop = None
+
+
+def connection_stats() -> dict:
+    """Requests sent vs. connections opened, for the sync and async pools."""
+    sync_requests = 0
+    sync_connections = 0
+    pools = _adapter.poolmanager.pools
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is not None:
+            sync_requests += pool.num_requests
+            sync_connections += pool.num_connections
+
+    with _stats_lock:
+        async_requests = _async_stats["requests"]
+        async_connections = _async_stats["connections"]
+
+    return {
+        "sync": _reuse(sync_requests, sync_connections),
+        "async": _reuse(async_requests, async_connections),
+    }
+
+
+def _reuse(requests_sent: int, connections: int) -> dict:
+    return {
+        "requests": requests_sent,
+        "connections": connections,
+        "reused": max(requests_sent - connections, 0),
+    }
+
+
+async def _trace_async_request(request: "httpx.Request") -> None:
+    with _stats_lock:
+        _async_stats["requests"] += 1
+    request.extensions["trace"] = _trace_async_connection
+
+
+async def _trace_async_connection(event_name: str, info: dict) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        with _stats_lock:
+            _async_stats["connections"] += 1
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from vcc_totem import deadline
+from vcc_totem.config import (
+    RATE_DECREASE,
+    RATE_FNB_INITIAL,
+    RATE_FNB_MAX,
+    RATE_FNB_MIN,
+    RATE_GASO_INITIAL,
+    RATE_GASO_MAX,
+    RATE_GASO_MIN,
+    RATE_INCREASE,
+    RATE_MAX_WAIT,
+    RATE_PACE_ALL,
+)
+
+# Status of a call refused because its send slot was more than max_wait away
+THROTTLED = "throttled"
+
+_paced: ContextVar[bool] = ContextVar("vcc_paced", default=False)
+
+
+@contextmanager
+def paced() -> Iterator[None]:
+    """Pace the upstream calls made inside this block (bulk runs).
+
+    Interactive queries are not paced unless RATE_PACE_ALL is set; the rates
+    still adapt to every 429, timeout and 5xx they see.
+    """
+    token = _paced.set(True)
+    try:
+        yield
+    finally:
+        _paced.reset(token)
+
+
+class RateController:
+    """AIMD request pacing shared by every thread and task in the process.
+
+    Each success raises the rate by ``increase / rate``, i.e. about
+    ``increase`` requests/s per second of traffic. A 429, timeout or 5xx
+    multiplies it by ``decrease``, at most once per ``cooldown`` seconds so a
+    burst of in-flight failures counts as one signal.
+
+    A caller never waits more than ``max_wait`` or past its deadline for a
+    slot; it is refused at once instead.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+        max_wait: float = 30.0,
+        pace_all: bool = False,
+    ):
+        self.name = name
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.max_wait = max_wait
+        self.pace_all = pace_all
+        self._next_slot = 0.0
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+        self._stats = {
+            "acquired": 0,
+            "refused": 0,
+            "successes": 0,
+            "throttles": 0,
+            "cuts": 0,
+        }
+
+    def acquire(self) -> Optional[str]:
+        """Wait for a send slot; None, or the status of a refused call."""
+        wait, refused = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return refused
+
+    async def acquire_async(self) -> Optional[str]:
+        wait, refused = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return refused
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._stats["successes"] += 1
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self) -> None:
+        now = time.monotonic()
+
+        with self._lock:
+            self._stats["throttles"] += 1
+            if now - self._last_cut < self.cooldown:
+                return
+
+            self._last_cut = now
+            self._stats["cuts"] += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            # Push back requests already scheduled at the old rate
+            self._next_slot = max(self._next_slot, now + 1 / self.rate)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "rate": round(self.rate, 3)}
+
+    def _reserve(self) -> tuple[float, Optional[str]]:
+        if not (self.pace_all or _paced.get()):
+            return 0.0, None
+
+        now = time.monotonic()
+        left = deadline.remaining()
+
+        with self._lock:
+            wait = max(self._next_slot, now) - now
+            if wait > self.max_wait or (left is not None and wait > left):
+                # Refused calls do not take a slot
+                self._stats["refused"] += 1
+                return 0.0, THROTTLED if wait > self.max_wait else deadline.EXCEEDED
+
+            self._stats["acquired"] += 1
+            self._next_slot = now + wait + 1 / self.rate
+            return wait, None
+
+
+FNB_RATE = RateController(
+    "fnb",
+    initial_rate=RATE_FNB_INITIAL,
+    min_rate=RATE_FNB_MIN,
+    max_rate=RATE_FNB_MAX,
+    increase=RATE_INCREASE,
+    decrease=RATE_DECREASE,
+    max_wait=RATE_MAX_WAIT,
+    pace_all=RATE_PACE_ALL,
+)
+GASO_RATE = RateController(
+    "gaso",
+    initial_rate=RATE_GASO_INITIAL,
+    min_rate=RATE_GASO_MIN,
+    max_rate=RATE_GASO_MAX,
+    increase=RATE_INCREASE,
+    decrease=RATE_DECREASE,
+    max_wait=RATE_MAX_WAIT,
+    pace_all=RATE_PACE_ALL,
+)
+
+
+def is_throttle_status(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def rate_stats() -> dict:
+    return {c.name: c.stats() for c in (FNB_RATE, GASO_RATE)}
@@ -1,43 +1,449 @@
 import time
+import asyncio
 import threading
 import logging
 import requests
-from typing import Tuple
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
 
-from vcc_totem.clients.auth import login
+from vcc_totem.config import (
+    CREDENTIALS,
+    MAX_CONSULTAS_POR_SESION,
+    SESSION_RATE_LIMIT_COOLDOWN,
+    SESSION_REFRESH_AHEAD,
+    SESSION_REFRESH_INTERVAL,
+)
+from vcc_totem import deadline
+from vcc_totem.clients.auth import login, login_async
 
 logger = logging.getLogger(__name__)
 
+# Assumed lifetime for tokens without an exp claim
 SESSION_TTL = 3600
-_cache = {"session": None, "ally_id": None, "timestamp": 0}
-_lock = threading.Lock()
+# Never hand out a token this close to its expiry
+EXPIRY_MARGIN = 30
 
 
-def get_session(force_refresh: bool = False) -> Tuple[requests.Session, str]:
-    now = time.time()
+class LoginWaitTimeout(TimeoutError):
+    """The request's deadline passed while its account was logging in."""
+
+
+class PooledSession:
+    """One FNB account: its logged-in session and usage counters."""
+
+    def __init__(self, username: str, password: str):
+        self.username = username
+        self.password = password
+        self.session: Optional[requests.Session] = None
+        self.ally_id = ""
+        self.expires_at = 0.0
+        # Bumped on every new active session; see SessionPool.release
+        self.generation = 0
+        self.expired = False
+        self.queries = 0
+        # A second logged-in session, swapped in when the active one is used up
+        self.standby: Optional[tuple] = None
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        # Guards the fields above; never held across a login request
+        self.lock = threading.Lock()
+        # One login at a time per account, for threads and for tasks
+        self.login_lock = threading.Lock()
+        self.async_lock: asyncio.Lock | None = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def loop_lock(self) -> asyncio.Lock:
+        """The async login lock, bound to the running event loop.
+
+        Like ``http.get_async_client``, a new loop (a new ``asyncio.run``
+        from the CLI, a test or a benchmark) gets a fresh lock.
+        """
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.async_lock is None or self._async_loop is not loop:
+                self.async_lock = asyncio.Lock()
+                self._async_loop = loop
+            return self.async_lock
+
+    def needs_login(self) -> bool:
+        return (
+            self.session is None
+            or self.expired
+            or time.time() >= self.expires_at - EXPIRY_MARGIN
+            or self.queries >= MAX_CONSULTAS_POR_SESION
+        )
+
+    def needs_refresh(self) -> bool:
+        return self.needs_login() or time.time() >= (
+            self.expires_at - SESSION_REFRESH_AHEAD
+        )
+
+    def wants_standby(self) -> bool:
+        return self.standby is None or time.time() >= (
+            self.standby[2] - SESSION_REFRESH_AHEAD
+        )
+
+    def set_login(
+        self, session: requests.Session, ally_id: str, expires_at: Optional[float]
+    ) -> None:
+        self.session = session
+        self.ally_id = ally_id
+        self.expires_at = expires_at or time.time() + SESSION_TTL
+        self.generation += 1
+        self.expired = False
+        self.queries = 0
+
+    def promote_standby(self) -> bool:
+        standby, self.standby = self.standby, None
+        if standby is None or time.time() >= standby[2] - EXPIRY_MARGIN:
+            return False
+
+        self.set_login(*standby)
+        return True
+
+    def handle(self) -> "SessionHandle":
+        return SessionHandle(self.session, self.ally_id, self.generation, self)
+
+
+@dataclass(frozen=True)
+class SessionHandle:
+    """A pooled session as seen by one request, tagged with its generation."""
+
+    session: requests.Session
+    ally_id: str
+    generation: int
+    slot: PooledSession = field(repr=False, compare=False)
+
+
+class SessionPool:
+    """Authenticated FNB sessions, one per configured account.
+
+    ``acquire`` hands out the least-loaded session that is not cooling down
+    after a 429, rotating between equally loaded ones. Each account logs in
+    lazily and again after ``MAX_CONSULTAS_POR_SESION`` queries or near its
+    token's expiry. Logins of one account are serialized, but the lock over
+    its state is only taken to swap the new session in, so a slow login never
+    blocks the other accounts or the event loop. With the refresher running,
+    a warm standby session is swapped in instead and no login happens on the
+    request path. Waiting for a login is bounded by the request's deadline,
+    with LoginWaitTimeout; the login itself goes on and still lands in the
+    pool.
+    """
+
+    def __init__(self, credentials: list[tuple[str, str]]):
+        self._slots = [PooledSession(user, password) for user, password in credentials]
+        self._next = 0
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats = {
+            "logins": 0,
+            "suppressed_logins": 0,
+            "invalidations": 0,
+            "suppressed_invalidations": 0,
+        }
+
+    def acquire(self, force_refresh: bool = False) -> SessionHandle:
+        tried: set[int] = set()
+
+        while len(tried) < len(self._slots):
+            slot = self._pick(tried)
+            tried.add(id(slot))
+
+            try:
+                handle = self._checkout(slot, force_refresh)
+                if handle is None:
+                    generation = slot.generation
+                    if not slot.login_lock.acquire(timeout=_lock_timeout()):
+                        raise LoginWaitTimeout(_waited(slot))
+                    try:
+                        # Another thread may have logged in while this one waited
+                        fresh = slot.generation != generation
+                        handle = self._checkout(slot, force_refresh and not fresh)
+                        if handle is None:
+                            self._install(slot, self._login(slot))
+                            handle = self._checkout(slot)
+                        else:
+                            self._count("suppressed_logins")
+                    finally:
+                        slot.login_lock.release()
+                if handle is not None:
+                    return handle
+            except BaseException:
+                self._release_slot(slot)
+                raise
+
+            self._login_failed(slot)
+
+        raise RuntimeError("Failed to authenticate with FNB")
+
+    async def acquire_async(self, force_refresh: bool = False) -> SessionHandle:
+        tried: set[int] = set()
+
+        while len(tried) < len(self._slots):
+            slot = self._pick(tried)
+            tried.add(id(slot))
+
+            try:
+                handle = self._checkout(slot, force_refresh)
+                if handle is None:
+                    handle = await self._login_in_turn_async(
+                        slot, slot.loop_lock(), force_refresh, slot.generation
+                    )
+                if handle is not None:
+                    return handle
+            except BaseException:
+                self._release_slot(slot)
+                raise
+
+            self._login_failed(slot)
+
+        raise RuntimeError("Failed to authenticate with FNB")
+
+    def release(self, handle: SessionHandle, status: Optional[str] = None) -> None:
+        """Return a session, reporting the FNB status seen with it.
+
+        A 401 only expires the session if it is still the generation the
+        caller used. Requests that raced on the same expired token therefore
+        trigger a single re-login instead of invalidating each other's.
+        """
+        slot = handle.slot
+        self._release_slot(slot)
+
+        if status == "session_expired":
+            with slot.lock:
+                current = handle.generation == slot.generation and not slot.expired
+                if current:
+                    slot.expired = True
+            self._count("invalidations" if current else "suppressed_invalidations")
+        elif status == "rate_limited":
+            logger.warning(
+                f"FNB session {_mask(slot.username)} rate limited, "
+                f"out of rotation for {SESSION_RATE_LIMIT_COOLDOWN}s"
+            )
+            slot.cooldown_until = time.monotonic() + SESSION_RATE_LIMIT_COOLDOWN
+
+    def invalidate(self) -> None:
+        for slot in self._slots:
+            slot.expired = True
+
+    def refresh(self) -> None:
+        """Renew expiring sessions and keep a standby warm for every account."""
+        for slot in self._slots:
+            # Twice: an empty account first gets its active session, then a standby
+            for _ in range(2):
+                with slot.lock:
+                    if slot.wants_standby():
+                        # A standby expiring along with the active one is no use
+                        slot.standby = None
+                    elif slot.needs_refresh() and slot.promote_standby():
+                        logger.info(f"FNB session {_mask(slot.username)} renewed")
+                    if not slot.wants_standby():
+                        break
+                if not self._login_standby(slot):
+                    break
+
+    def start_refresher(self, interval: float = SESSION_REFRESH_INTERVAL) -> None:
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._stop.clear()
+            self._refresher = threading.Thread(
+                target=self._refresh_loop,
+                args=(interval,),
+                name="fnb-session-refresh",
+                daemon=True,
+            )
+            self._refresher.start()
+
+    def stop_refresher(self) -> None:
+        self._stop.set()
 
-    if not force_refresh and _cache["session"]:
-        age = now - _cache["timestamp"]
-        if age < SESSION_TTL:
-            return _cache["session"], _cache["ally_id"]
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            accounts = [
+                {
+                    "user": _mask(slot.username),
+                    "logged_in": slot.session is not None,
+                    "expires_in": max(0, round(slot.expires_at - time.time())),
+                    "standby": slot.standby is not None,
+                    "queries": slot.queries,
+                    "in_flight": slot.in_flight,
+                    "cooling_down": slot.cooldown_until > now,
+                    "generation": slot.generation,
+                }
+                for slot in self._slots
+            ]
+            return {**self._stats, "accounts": accounts}
 
-    with _lock:
-        if not force_refresh and _cache["session"]:
-            age = time.time() - _cache["timestamp"]
-            if age < SESSION_TTL:
-                return _cache["session"], _cache["ally_id"]
+    def _pick(self, tried: set[int]) -> PooledSession:
+        now = time.monotonic()
 
-        session, ally_id = login()
+        with self._lock:
+            candidates = [s for s in self._slots if id(s) not in tried]
+            ready = [s for s in candidates if s.cooldown_until <= now]
+            # With every account cooling down, use the one that recovers first
+            if not ready:
+                ready = [min(candidates, key=lambda s: s.cooldown_until)]
 
+            start = self._next % len(ready)
+            self._next += 1
+            slot = min(ready[start:] + ready[:start], key=lambda s: s.in_flight)
+            slot.in_flight += 1
+            return slot
+
+    def _checkout(
+        self, slot: PooledSession, force_refresh: bool = False
+    ) -> Optional[SessionHandle]:
+        """Count a query on the slot's session; None if it needs a login first."""
+        with slot.lock:
+            if force_refresh or slot.needs_login():
+                if not slot.promote_standby():
+                    return None
+            slot.queries += 1
+            return slot.handle()
+
+    async def _login_in_turn_async(
+        self,
+        slot: PooledSession,
+        lock: asyncio.Lock,
+        force_refresh: bool,
+        generation: int,
+    ) -> Optional[SessionHandle]:
+        """Wait for the account's turn to log in, then log in, within the deadline.
+
+        The login is shielded from the deadline: a caller giving up on it
+        leaves it running, and the lock is freed only once it is installed.
+        """
+        try:
+            await asyncio.wait_for(lock.acquire(), deadline.remaining())
+        except asyncio.TimeoutError:
+            raise LoginWaitTimeout(_waited(slot)) from None
+
+        task = None
+        try:
+            fresh = slot.generation != generation
+            handle = self._checkout(slot, force_refresh and not fresh)
+            if handle is not None:
+                self._count("suppressed_logins")
+                return handle
+
+            self._count("logins")
+            task = asyncio.ensure_future(self._login_async(slot))
+            task.add_done_callback(lambda _: lock.release())
+            try:
+                await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+            except asyncio.TimeoutError:
+                raise LoginWaitTimeout(_waited(slot)) from None
+            return self._checkout(slot)
+        finally:
+            if task is None:
+                lock.release()
+
+    async def _login_async(self, slot: PooledSession) -> None:
+        self._install(slot, await login_async(slot.username, slot.password))
+
+    def _install(self, slot: PooledSession, login_result: tuple) -> None:
+        session, ally_id, expires_at = login_result
+        if session:
+            with slot.lock:
+                slot.set_login(session, ally_id, expires_at)
+
+    def _login(self, slot: PooledSession) -> tuple:
+        self._count("logins")
+        return login(slot.username, slot.password)
+
+    def _login_standby(self, slot: PooledSession) -> bool:
+        """Log in outside the lock so acquirers of this account never wait."""
+        self._count("logins")
+        session, ally_id, expires_at = login(slot.username, slot.password)
         if not session:
-            raise RuntimeError("Failed to authenticate with FNB")
+            return False
+
+        with slot.lock:
+            slot.standby = (session, ally_id, expires_at or time.time() + SESSION_TTL)
+        return True
+
+    def _release_slot(self, slot: PooledSession) -> None:
+        with self._lock:
+            slot.in_flight -= 1
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _refresh_loop(self, interval: float) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"FNB session refresh failed: {e}")
+            if self._stop.wait(interval):
+                return
+
+    def _login_failed(self, slot: PooledSession) -> None:
+        logger.error(f"FNB login failed for {_mask(slot.username)}")
+        self._release_slot(slot)
+        slot.cooldown_until = time.monotonic() + SESSION_RATE_LIMIT_COOLDOWN
+
+
+def _lock_timeout() -> float:
+    """How long ``Lock.acquire`` may block: -1 without a deadline."""
+    left = deadline.remaining()
+    return -1 if left is None else max(left, 0)
+
+
+def _waited(slot: PooledSession) -> str:
+    return f"Deadline exceeded waiting for the FNB login of {_mask(slot.username)}"
+
 
-        _cache["session"] = session
-        _cache["ally_id"] = ally_id
-        _cache["timestamp"] = time.time()
+def _mask(username: str) -> str:
+    return username[:3] + "***"
 
-        return session, ally_id
+
+POOL = SessionPool(CREDENTIALS)
+
+
+def acquire() -> SessionHandle:
+    """Take a pooled session; hand it back with ``release`` and the FNB status."""
+    return POOL.acquire()
+
+
+async def acquire_async() -> SessionHandle:
+    return await POOL.acquire_async()
+
+
+def release(handle: SessionHandle, status: Optional[str] = None) -> None:
+    POOL.release(handle, status)
+
+
+def get_session(force_refresh: bool = False) -> Tuple[requests.Session, str]:
+    handle = POOL.acquire(force_refresh=force_refresh)
+    POOL.release(handle)
+    return handle.session, handle.ally_id
+
+
+async def get_session_async(
+    force_refresh: bool = False,
+) -> Tuple[requests.Session, str]:
+    handle = await POOL.acquire_async(force_refresh=force_refresh)
+    POOL.release(handle)
+    return handle.session, handle.ally_id
 
 
 def invalidate_session() -> None:
-    _cache["timestamp"] = 0
+    POOL.invalidate()
+
+
+def start_refresher() -> None:
+    """Log every account in now and keep their sessions renewed ahead of expiry."""
+    POOL.start_refresher()
+
+
+def stop_refresher() -> None:
+    POOL.stop_refresher()
+
+
+def session_stats() -> dict:
+    return POOL.stats()
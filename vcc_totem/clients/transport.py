@@ -0,0 +1,284 @@
+"""
+Record/replay of the FNB and PowerBI traffic.
+
+``record`` sends requests as usual and appends every response, with its
+latency, to a JSON lines cassette. ``replay`` answers from the cassette
+without touching the network; a request that was never recorded fails like
+a connection error.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from vcc_totem.config import (
+    HTTP_CASSETTE_PATH,
+    HTTP_REPLAY_LATENCY_SCALE,
+    HTTP_TRANSPORT,
+)
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+MODES = ("live", "record", "replay")
+
+# Recorded responses kept per request; replay cycles through them
+MAX_VARIANTS = 5
+# Left out of the request key, so no password ends up hashed on disk
+REDACTED_FIELDS = ("password",)
+# Bodies are stored decoded, so transfer headers would no longer apply
+DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+
+class Cassette:
+    def __init__(self, path: Path, mode: str = "live", latency_scale: float = 1.0):
+        if mode not in MODES:
+            raise ValueError(f"HTTP_TRANSPORT must be one of {MODES}, got {mode!r}")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._entries: Optional[dict[str, list[dict]]] = None
+        self._cursor: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    def record(
+        self, key: str, status: int, headers, body: bytes, elapsed: float
+    ) -> None:
+        entry = {
+            "key": key,
+            "status": status,
+            "headers": {
+                k.lower(): v
+                for k, v in headers.items()
+                if k.lower() not in DROPPED_HEADERS
+            },
+            "body": body.decode("utf-8", errors="replace"),
+            "elapsed": round(elapsed, 4),
+        }
+
+        with self._lock:
+            variants = self._load().setdefault(key, [])
+            if len(variants) >= MAX_VARIANTS:
+                return
+            variants.append(entry)
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.recorded += 1
+
+    def next(self, key: str) -> Optional[dict]:
+        with self._lock:
+            variants = self._load().get(key)
+            if not variants:
+                self.misses += 1
+                logger.warning(f"No recorded response for {key}")
+                return None
+
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            self.replayed += 1
+            return variants[index % len(variants)]
+
+    def delay(self, entry: dict) -> float:
+        return entry["elapsed"] * self.latency_scale
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "cassette": str(self.path),
+                "requests": len(self._entries or {}),
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "misses": self.misses,
+            }
+
+    def _load(self) -> dict[str, list[dict]]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path.exists():
+                with self.path.open(encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._entries.setdefault(entry["key"], []).append(entry)
+        return self._entries
+
+
+class CassetteAdapter(BaseAdapter):
+    """requests adapter that records or replays around the pooled adapter."""
+
+    def __init__(self, inner: BaseAdapter, cassette: Cassette):
+        super().__init__()
+        self.inner = inner
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        key = request_key(request.method, request.url, request.body)
+
+        if self.cassette.mode == "replay":
+            entry = self.cassette.next(key)
+            if entry is None:
+                raise requests.ConnectionError(
+                    f"No recorded response for {key}", request=request
+                )
+            time.sleep(self.cassette.delay(entry))
+            return _requests_response(request, entry)
+
+        start = time.perf_counter()
+        response = self.inner.send(request, **kwargs)
+        body = response.content
+        self.cassette.record(
+            key,
+            response.status_code,
+            response.headers,
+            body,
+            time.perf_counter() - start,
+        )
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class CassetteTransport:
+    """httpx twin of CassetteAdapter for the async client.
+
+    Implements the AsyncBaseTransport interface without subclassing it, so
+    importing this module does not load httpx.
+    """
+
+    def __init__(self, inner: "httpx.AsyncBaseTransport", cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    async def __aenter__(self) -> "CassetteTransport":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def handle_async_request(self, request: "httpx.Request") -> "httpx.Response":
+        import httpx
+
+        key = request_key(request.method, str(request.url), request.content)
+
+        if self.cassette.mode == "replay":
+            entry = self.cassette.next(key)
+            if entry is None:
+                raise httpx.ConnectError(
+                    f"No recorded response for {key}", request=request
+                )
+            await asyncio.sleep(self.cassette.delay(entry))
+            return httpx.Response(
+                entry["status"],
+                headers=entry["headers"],
+                content=entry["body"].encode("utf-8"),
+                request=request,
+            )
+
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        elapsed = time.perf_counter() - start
+        self.cassette.record(key, response.status_code, response.headers, body, elapsed)
+
+        return httpx.Response(
+            response.status_code,
+            headers=[
+                (k, v)
+                for k, v in response.headers.multi_items()
+                if k.lower() not in DROPPED_HEADERS
+            ],
+            content=body,
+            request=request,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+CASSETTE = Cassette(HTTP_CASSETTE_PATH, HTTP_TRANSPORT, HTTP_REPLAY_LATENCY_SCALE)
+
+
+def wrap_adapter(adapter: BaseAdapter) -> BaseAdapter:
+    if CASSETTE.mode == "live":
+        return adapter
+    return CassetteAdapter(adapter, CASSETTE)
+
+
+def wrap_async_transport(transport: "httpx.AsyncBaseTransport"):
+    if CASSETTE.mode == "live":
+        return transport
+    return CassetteTransport(transport, CASSETTE)
+
+
+def replaying() -> bool:
+    return CASSETTE.mode == "replay"
+
+
+def transport_stats() -> dict:
+    return CASSETTE.stats()
+
+
+def request_key(method: str, url: str, body) -> str:
+    """Identify a request by method, path, sorted query and body digest.
+
+    The host is left out so a cassette recorded against production replays
+    under any BASE_URL.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    digest = hashlib.sha256(_normalize_body(body)).hexdigest()[:16] if body else "-"
+    return f"{method.upper()} {parts.path}?{query} {digest}"
+
+
+def _normalize_body(body) -> bytes:
+    # requests and httpx serialize json= with different separators
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k not in REDACTED_FIELDS}
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _requests_response(
+    request: requests.PreparedRequest, entry: dict
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response._content = entry["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    response.elapsed = timedelta(seconds=entry["elapsed"])
+    return response
@@ -15,8 +15,22 @@ if not env_path.exists():
 USUARIO = os.getenv("CALIDDA_USUARIO")
 PASSWORD = os.getenv("CALIDDA_PASSWORD")
 
-if not USUARIO or not PASSWORD:
-    raise ValueError("CALIDDA_USUARIO and CALIDDA_PASSWORD must be set in .env")
+# Accounts for the FNB session pool, "user1:pass1,user2:pass2". The
+# CALIDDA_USUARIO/CALIDDA_PASSWORD pair, when set, is always the first one.
+CREDENTIALS = [
+    (user.strip(), password.strip())
+    for user, _, password in (
+        pair.partition(":") for pair in os.getenv("CALIDDA_CREDENTIALS", "").split(",")
+    )
+    if user.strip() and password.strip()
+]
+if USUARIO and PASSWORD and (USUARIO, PASSWORD) not in CREDENTIALS:
+    CREDENTIALS.insert(0, (USUARIO, PASSWORD))
+
+if not CREDENTIALS:
+    raise ValueError(
+        "CALIDDA_USUARIO and CALIDDA_PASSWORD (or CALIDDA_CREDENTIALS) must be set in .env"
+    )
 
 BASE_URL = os.getenv("BASE_URL", "https://appweb.calidda.com.pe")
 LOGIN_API = BASE_URL + os.getenv("LOGIN_API", "/FNB_Services/api/Seguridad/autenticar")
@@ -24,10 +38,101 @@ CONSULTA_API = BASE_URL + os.getenv(
     "CONSULTA_API", "/FNB_Services/api/financiamiento/lineaCredito"
 )
 
-DELAY_MIN = float(os.getenv("DELAY_MIN", "10"))
-DELAY_MAX = float(os.getenv("DELAY_MAX", "207"))
+POWERBI_API_URL = os.getenv(
+    "POWERBI_API_URL",
+    "https://wabi-south-central-us-api.analysis.windows.net/public/reports/querydata",
+)
+
 TIMEOUT = int(os.getenv("TIMEOUT", "300"))
 MAX_CONSULTAS_POR_SESION = int(os.getenv("MAX_CONSULTAS_POR_SESION", "50"))
+# Seconds a pooled FNB session stays out of rotation after a 429
+SESSION_RATE_LIMIT_COOLDOWN = float(os.getenv("SESSION_RATE_LIMIT_COOLDOWN", "60"))
+# Background renewal of FNB sessions this many seconds before the JWT expires
+SESSION_REFRESH_AHEAD = float(os.getenv("SESSION_REFRESH_AHEAD", "300"))
+SESSION_REFRESH_INTERVAL = float(os.getenv("SESSION_REFRESH_INTERVAL", "30"))
+
+# Speculative fallback: start GASO while FNB is still running.
+# SPECULATIVE_HEDGE_DELAY is in seconds, or "p50" for the observed FNB median.
+SPECULATIVE_FALLBACK = os.getenv("SPECULATIVE_FALLBACK", "false").lower() == "true"
+SPECULATIVE_HEDGE_DELAY = os.getenv("SPECULATIVE_HEDGE_DELAY", "0")
+SPECULATIVE_MAX_WORKERS = int(os.getenv("SPECULATIVE_MAX_WORKERS", "16"))
+
+# In-process result cache. TTLs in seconds per outcome, 0 disables caching it.
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL_OFFER = float(os.getenv("CACHE_TTL_OFFER", "3600"))
+CACHE_TTL_NO_OFFER = float(os.getenv("CACHE_TTL_NO_OFFER", "3600"))
+CACHE_TTL_NOT_FOUND = float(os.getenv("CACHE_TTL_NOT_FOUND", "900"))
+CACHE_TTL_ERROR = float(os.getenv("CACHE_TTL_ERROR", "0"))
+CACHE_STALE_SECONDS = float(os.getenv("CACHE_STALE_SECONDS", "0"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", "50000000"))
+
+# "sqlite" shares results between the uvicorn workers of a node
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_SQLITE_PATH = ROOT_DIR / os.getenv("CACHE_SQLITE_PATH", ".cache/results.sqlite3")
+CACHE_SQLITE_MAX_ENTRIES = int(os.getenv("CACHE_SQLITE_MAX_ENTRIES", "1000000"))
+CACHE_SQLITE_MAX_BYTES = int(os.getenv("CACHE_SQLITE_MAX_BYTES", "500000000"))
+CACHE_COMPACT_INTERVAL = float(os.getenv("CACHE_COMPACT_INTERVAL", "300"))
+CACHE_WARM_ENTRIES = int(os.getenv("CACHE_WARM_ENTRIES", "5000"))
+
+# AIMD pacing of upstream calls, in requests/s per process.
+# RATE_INCREASE is added per second of successful traffic; RATE_DECREASE
+# multiplies the rate on 429, timeouts and 5xx.
+RATE_FNB_INITIAL = float(os.getenv("RATE_FNB_INITIAL", "2"))
+RATE_FNB_MIN = float(os.getenv("RATE_FNB_MIN", "0.05"))
+RATE_FNB_MAX = float(os.getenv("RATE_FNB_MAX", "20"))
+RATE_GASO_INITIAL = float(os.getenv("RATE_GASO_INITIAL", "10"))
+RATE_GASO_MIN = float(os.getenv("RATE_GASO_MIN", "0.5"))
+RATE_GASO_MAX = float(os.getenv("RATE_GASO_MAX", "50"))
+RATE_INCREASE = float(os.getenv("RATE_INCREASE", "0.5"))
+RATE_DECREASE = float(os.getenv("RATE_DECREASE", "0.5"))
+# Bulk runs are always paced; API and CLI queries only with RATE_PACE_ALL.
+# A paced call whose slot is more than RATE_MAX_WAIT seconds away is refused.
+RATE_PACE_ALL = os.getenv("RATE_PACE_ALL", "false").lower() == "true"
+RATE_MAX_WAIT = float(os.getenv("RATE_MAX_WAIT", "30"))
+
+# Circuit breakers around FNB queries, FNB login and PowerBI. A channel opens
+# after BREAKER_FAILURE_THRESHOLD consecutive failures, fails fast for
+# BREAKER_OPEN_SECONDS, then lets BREAKER_HALF_OPEN_PROBES calls through.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+# /readyz: background probes of a channel without recent traffic, and real
+# upstream failures in a row that mark it down
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "30"))
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "3"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+
+# Default time budget in seconds of an API query across all its upstream
+# calls, 0 for none. Requests can set their own with X-Deadline or "deadline".
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "0"))
+
+# Hedged async PowerBI queries: a query slower than the observed p95 (at least
+# GASO_HEDGE_MIN_DELAY seconds) is sent again and the first answer wins.
+# GASO_HEDGE_BUDGET caps the duplicates as a fraction of all queries.
+GASO_HEDGE_ENABLED = os.getenv("GASO_HEDGE_ENABLED", "false").lower() == "true"
+GASO_HEDGE_BUDGET = float(os.getenv("GASO_HEDGE_BUDGET", "0.05"))
+GASO_HEDGE_MIN_DELAY = float(os.getenv("GASO_HEDGE_MIN_DELAY", "0.05"))
+
+# POST /query/batch
+BATCH_MAX_DNIS = int(os.getenv("BATCH_MAX_DNIS", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "10"))
+
+# Shared HTTP connection pools for the FNB and PowerBI clients
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "50"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_KEEPALIVE = os.getenv("HTTP_KEEPALIVE", "true").lower() == "true"
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Upstream traffic: live, record (live + save to the cassette) or replay
+HTTP_TRANSPORT = os.getenv("HTTP_TRANSPORT", "live").lower()
+HTTP_CASSETTE_PATH = ROOT_DIR / os.getenv(
+    "HTTP_CASSETTE_PATH", ".cache/cassettes/upstream.jsonl"
+)
+# Multiplies the recorded latencies on replay, 0 answers immediately
+HTTP_REPLAY_LATENCY_SCALE = float(os.getenv("HTTP_REPLAY_LATENCY_SCALE", "1"))
 
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "consultas_credito")
 DNIS_FILE = os.getenv("DNIS_FILE", "lista_dnis.txt")
@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from vcc_totem.clients.ratelimit import paced
+from vcc_totem.core.query import query_with_fallback, validate_dni
+from vcc_totem.models import QueryResult
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FILE = "results.jsonl"
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_EVERY = 100
+
+
+def run_bulk(
+    input_path: Path,
+    output_dir: Path,
+    workers: int = 4,
+    use_cache: bool = True,
+    on_result: Optional[Callable[[QueryResult, dict], None]] = None,
+) -> dict:
+    """Query every DNI in ``input_path``, appending results to ``output_dir``.
+
+    Results are written to ``results.jsonl`` as they complete, so a crash or
+    Ctrl-C loses at most the in-flight lookups; the next run skips every DNI
+    already answered in that file and retries the failed ones.
+    ``checkpoint.json`` holds the running counters.
+
+    Lookups are paced by the clients' AIMD rate controllers, so throughput
+    follows whatever the upstreams accept. FNB sessions rotate inside the
+    session pool every ``MAX_CONSULTAS_POR_SESION`` queries per account.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results_path = output_dir / RESULTS_FILE
+    checkpoint_path = output_dir / CHECKPOINT_FILE
+
+    done = _load_done(results_path)
+    _terminate_partial_line(results_path)
+    stats = _load_checkpoint(checkpoint_path, input_path)
+    stats["resumed_from"] = len(done)
+    if done:
+        logger.info(f"Resuming bulk run, {len(done)} DNIs already done")
+
+    pending: set[Future] = set()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk")
+
+    with open(results_path, "a", encoding="utf-8") as out:
+
+        def drain(block_until_below: int) -> None:
+            nonlocal pending
+            while len(pending) >= block_until_below and pending:
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    _record(future.result(), out, stats, on_result)
+                    if stats["processed"] % CHECKPOINT_EVERY == 0:
+                        _save_checkpoint(checkpoint_path, input_path, stats)
+
+        try:
+            for dni in _read_dnis(input_path, stats):
+                if int(dni) in done:
+                    continue
+
+                pending.add(executor.submit(_query, dni, use_cache))
+                drain(workers * 2)
+
+            drain(1)
+        except KeyboardInterrupt:
+            logger.warning("Bulk run interrupted, finishing in-flight lookups")
+            for future in pending:
+                future.cancel()
+            pending = {future for future in pending if not future.cancelled()}
+            drain(1)
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            _save_checkpoint(checkpoint_path, input_path, stats)
+
+    return stats
+
+
+def _query(dni: str, use_cache: bool) -> QueryResult:
+    with paced():
+        return query_with_fallback(dni, use_cache=use_cache)
+
+
+def _read_dnis(input_path: Path, stats: dict) -> Iterator[str]:
+    with open(input_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split(",", 1)[0].strip()
+            if not line or line.startswith("#"):
+                continue
+
+            try:
+                yield validate_dni(line)
+            except ValueError as e:
+                logger.warning(f"Skipping invalid DNI '{line}': {e}")
+                stats["invalid"] += 1
+
+
+def _record(
+    result: QueryResult,
+    out,
+    stats: dict,
+    on_result: Optional[Callable[[QueryResult, dict], None]],
+) -> None:
+    out.write(json.dumps(_to_row(result), ensure_ascii=False) + "\n")
+    out.flush()
+
+    stats["processed"] += 1
+    if result.found_client:
+        stats["found"] += 1
+    if result.has_offer:
+        stats["offers"] += 1
+    if not result.success and result.status not in (None, "not_found"):
+        stats["errors"] += 1
+
+    if on_result:
+        on_result(result, stats)
+
+
+def _to_row(result: QueryResult) -> dict:
+    row = {
+        "dni": result.dni,
+        "success": result.success,
+        "channel": result.channel,
+        "status": result.status,
+        "has_offer": result.has_offer,
+        "fallback_mode": result.fallback_mode,
+    }
+    if result.data:
+        row["data"] = result.data
+    if result.error_message:
+        row["error"] = result.error_message
+    return row
+
+
+def _load_done(results_path: Path) -> set[int]:
+    """DNIs whose latest row is an answer (found or not_found).
+
+    Errors, timeouts and refused lookups are queried again on resume; the
+    row written then supersedes the earlier one.
+    """
+    # DNIs are stored as ints: a few million of them stay well under 200 MB
+    done: set[int] = set()
+    if not results_path.exists():
+        return done
+
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+                dni = int(row["dni"])
+            except (ValueError, KeyError):
+                # Partially written last line from a crash
+                continue
+
+            if row.get("success") or row.get("status") == "not_found":
+                done.add(dni)
+            else:
+                done.discard(dni)
+
+    return done
+
+
+def _terminate_partial_line(results_path: Path) -> None:
+    if not results_path.exists() or results_path.stat().st_size == 0:
+        return
+
+    with open(results_path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def _load_checkpoint(checkpoint_path: Path, input_path: Path) -> dict:
+    stats = {"processed": 0, "found": 0, "offers": 0, "errors": 0, "invalid": 0}
+
+    if checkpoint_path.exists():
+        saved = json.loads(checkpoint_path.read_text(encoding="utf-8"))
+        if saved.get("input") != str(input_path):
+            logger.warning(
+                f"Checkpoint was for {saved.get('input')}, now reading {input_path}"
+            )
+        stats.update({k: saved.get(k, 0) for k in stats})
+        # Invalid lines are re-counted while the file is read again
+        stats["invalid"] = 0
+
+    return stats
+
+
+def _save_checkpoint(checkpoint_path: Path, input_path: Path, stats: dict) -> None:
+    data = {**stats, "input": str(input_path), "updated_at": time.time()}
+    tmp_path = checkpoint_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp_path, checkpoint_path)
@@ -0,0 +1,551 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from vcc_totem.models import ClientRecord, QueryResult
+
+logger = logging.getLogger(__name__)
+
+CacheKey = tuple[str, str]
+
+# CacheEntry, its timestamps, the key tuple and the LRU link, per entry
+ENTRY_OVERHEAD = 250
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    result: ClientRecord
+    fresh_until: float
+    stale_until: float
+    size: int
+
+
+def classify(result: QueryResult) -> str:
+    """Outcome kind used to pick the TTL: offer, no_offer, not_found or error."""
+    if result.success:
+        return "offer" if result.has_offer else "no_offer"
+
+    if result.status == "not_found":
+        return "not_found"
+
+    return "error"
+
+
+class CacheBackend(ABC):
+    """Storage for cache entries. Expiry policy lives in ResultCache.
+
+    The ``*_async`` variants are for the event loop: backends doing blocking
+    I/O override them to run it in a worker thread.
+    """
+
+    @abstractmethod
+    def get(self, key: CacheKey) -> Optional[CacheEntry]: ...
+
+    @abstractmethod
+    def set(self, key: CacheKey, entry: CacheEntry) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: CacheKey) -> None: ...
+
+    async def get_async(self, key: CacheKey) -> Optional[CacheEntry]:
+        return self.get(key)
+
+    async def set_async(self, key: CacheKey, entry: CacheEntry) -> None:
+        self.set(key, entry)
+
+    async def delete_async(self, key: CacheKey) -> None:
+        self.delete(key)
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> dict: ...
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU bounded by entry count and estimated memory size."""
+
+    def __init__(self, max_entries: int = 10_000, max_bytes: int = 50_000_000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: CacheKey, entry: CacheEntry) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def delete(self, key: CacheKey) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self._evictions,
+            }
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+class SQLiteBackend(CacheBackend):
+    """Node-local cache file shared by every worker process.
+
+    Uses WAL so readers in other uvicorn workers never block on a writer.
+    Expired rows are dropped and the file is trimmed to the size cap (oldest
+    rows first) by ``compact``, which the compactor thread runs every
+    ``compact_interval`` seconds, off the request path.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = 1_000_000,
+        max_bytes: int = 500_000_000,
+        compact_interval: float = 300.0,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compact_interval = compact_interval
+        self._local = threading.local()
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    fresh_until REAL NOT NULL,
+                    stale_until REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at)"
+            )
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT payload, fresh_until, stale_until, size "
+                "FROM results WHERE key = ?",
+                (_encode_key(key),),
+            )
+            .fetchone()
+        )
+
+        if row is None:
+            return None
+
+        return _decode_entry(*row)
+
+    def set(self, key: CacheKey, entry: CacheEntry) -> None:
+        payload = json.dumps(asdict(entry.result.to_result()), default=str)
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(key, payload, fresh_until, stale_until, size, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    _encode_key(key),
+                    payload,
+                    entry.fresh_until,
+                    entry.stale_until,
+                    entry.size,
+                    time.time(),
+                ),
+            )
+
+    def delete(self, key: CacheKey) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE key = ?", (_encode_key(key),))
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
+
+    def recent(self, limit: int) -> Iterator[tuple[CacheKey, CacheEntry]]:
+        """Most recently stored live entries, for warm-loading a memory tier."""
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT key, payload, fresh_until, stale_until, size FROM results "
+                "WHERE stale_until > ? ORDER BY stored_at DESC LIMIT ?",
+                (time.time(), limit),
+            )
+            .fetchall()
+        )
+
+        for key, *entry in rows:
+            yield _decode_key(key), _decode_entry(*entry)
+
+    async def get_async(self, key: CacheKey) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key: CacheKey, entry: CacheEntry) -> None:
+        await asyncio.to_thread(self.set, key, entry)
+
+    async def delete_async(self, key: CacheKey) -> None:
+        await asyncio.to_thread(self.delete, key)
+
+    def compact(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE stale_until <= ?", (time.time(),))
+
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+
+            if count > self.max_entries or total > self.max_bytes:
+                ratio = min(self.max_entries / count, self.max_bytes / max(total, 1))
+                excess = count - int(count * ratio * 0.9)
+                conn.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY stored_at LIMIT ?)",
+                    (excess,),
+                )
+                self._evictions += excess
+
+        self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def start_compactor(self) -> None:
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._stop.clear()
+            self._compactor = threading.Thread(
+                target=self._compact_loop, name="cache-compactor", daemon=True
+            )
+            self._compactor.start()
+
+    def stop_compactor(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        count, total = (
+            self._connect()
+            .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results")
+            .fetchone()
+        )
+        return {"entries": count, "bytes": total, "evictions": self._evictions}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _compact_loop(self) -> None:
+        while not self._stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except sqlite3.Error as e:
+                logger.error(f"Shared cache compaction failed: {e}")
+
+
+class TieredBackend(CacheBackend):
+    """Per-process memory tier in front of a shared backend.
+
+    Hits in the shared tier are copied into memory, so a DNI resolved by one
+    worker is served by the others without an upstream call.
+    """
+
+    def __init__(self, memory: MemoryBackend, shared: SQLiteBackend):
+        self.memory = memory
+        self.shared = shared
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+        return self._get_shared(key)
+
+    def set(self, key: CacheKey, entry: CacheEntry) -> None:
+        self.memory.set(key, entry)
+        self._set_shared(key, entry)
+
+    def delete(self, key: CacheKey) -> None:
+        self.memory.delete(key)
+        self._delete_shared(key)
+
+    async def get_async(self, key: CacheKey) -> Optional[CacheEntry]:
+        # Memory hits stay on the loop; only the file is read in a thread
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+        return await asyncio.to_thread(self._get_shared, key)
+
+    async def set_async(self, key: CacheKey, entry: CacheEntry) -> None:
+        self.memory.set(key, entry)
+        await asyncio.to_thread(self._set_shared, key, entry)
+
+    async def delete_async(self, key: CacheKey) -> None:
+        self.memory.delete(key)
+        await asyncio.to_thread(self._delete_shared, key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.shared.clear()
+
+    def warm_load(self, limit: int) -> int:
+        loaded = 0
+        try:
+            for key, entry in self.shared.recent(limit):
+                self.memory.set(key, entry)
+                loaded += 1
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache warm-load failed: {e}")
+        return loaded
+
+    def stats(self) -> dict:
+        return {**self.memory.stats(), "shared": self.shared.stats()}
+
+    def _get_shared(self, key: CacheKey) -> Optional[CacheEntry]:
+        try:
+            entry = self.shared.get(key)
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache read failed: {e}")
+            return None
+
+        if entry is not None:
+            self.memory.set(key, entry)
+        return entry
+
+    def _set_shared(self, key: CacheKey, entry: CacheEntry) -> None:
+        try:
+            self.shared.set(key, entry)
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache write failed: {e}")
+
+    def _delete_shared(self, key: CacheKey) -> None:
+        try:
+            self.shared.delete(key)
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache delete failed: {e}")
+
+
+class ResultCache:
+    """TTL cache of QueryResults keyed by (dni, channel) over a CacheBackend.
+
+    A TTL of 0 disables caching for that outcome kind. Entries past their TTL
+    but inside ``stale_seconds`` are served as stale and refreshed by the
+    caller in the background.
+    """
+
+    def __init__(
+        self,
+        ttls: dict[str, float],
+        max_entries: int = 10_000,
+        max_bytes: int = 50_000_000,
+        stale_seconds: float = 0.0,
+        backend: Optional[CacheBackend] = None,
+    ):
+        self.ttls = ttls
+        self.stale_seconds = stale_seconds
+        self.backend = backend or MemoryBackend(max_entries, max_bytes)
+        self._refreshing: set[CacheKey] = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+    def get(self, key: CacheKey) -> tuple[Optional[QueryResult], bool]:
+        """Return ``(result, is_stale)``, or ``(None, False)`` on a miss."""
+        entry = self.backend.get(key)
+        if self._expired(entry):
+            self.backend.delete(key)
+        return self._found(entry)
+
+    async def get_async(self, key: CacheKey) -> tuple[Optional[QueryResult], bool]:
+        entry = await self.backend.get_async(key)
+        if self._expired(entry):
+            await self.backend.delete_async(key)
+        return self._found(entry)
+
+    def set(self, key: CacheKey, result: QueryResult) -> None:
+        entry = self._entry(key, result)
+        if entry is not None:
+            self.backend.set(key, entry)
+
+    async def set_async(self, key: CacheKey, result: QueryResult) -> None:
+        entry = self._entry(key, result)
+        if entry is not None:
+            await self.backend.set_async(key, entry)
+
+    def begin_refresh(self, key: CacheKey) -> bool:
+        """Claim the background refresh of a stale key; False if already claimed."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: CacheKey) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._refreshing.clear()
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._stats)
+
+        lookups = counts["hits"] + counts["stale_hits"] + counts["misses"]
+        hits = counts["hits"] + counts["stale_hits"]
+
+        return {
+            **counts,
+            **self.backend.stats(),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _expired(self, entry: Optional[CacheEntry]) -> bool:
+        return entry is not None and time.time() >= entry.stale_until
+
+    def _found(self, entry: Optional[CacheEntry]) -> tuple[Optional[QueryResult], bool]:
+        now = time.time()
+        if entry is None or now >= entry.stale_until:
+            self._count("misses")
+            return None, False
+
+        stale = now >= entry.fresh_until
+        self._count("stale_hits" if stale else "hits")
+        return entry.result.to_result(), stale
+
+    def _entry(self, key: CacheKey, result: QueryResult) -> Optional[CacheEntry]:
+        """The entry to store for ``result``, or None if it is not cached."""
+        ttl = self.ttls.get(classify(result), 0)
+
+        with self._lock:
+            self._refreshing.discard(key)
+
+        if ttl <= 0:
+            return None
+
+        now = time.time()
+        record = ClientRecord.from_result(result)
+        return CacheEntry(
+            result=record,
+            fresh_until=now + ttl,
+            stale_until=now + ttl + self.stale_seconds,
+            size=_estimate_size(record),
+        )
+
+
+def build_backend(
+    kind: str,
+    max_entries: int,
+    max_bytes: int,
+    sqlite_path: Optional[Path] = None,
+    sqlite_max_entries: int = 1_000_000,
+    sqlite_max_bytes: int = 500_000_000,
+    compact_interval: float = 300.0,
+    warm_entries: int = 0,
+) -> CacheBackend:
+    memory = MemoryBackend(max_entries, max_bytes)
+
+    if kind == "memory":
+        return memory
+
+    if kind == "sqlite":
+        if sqlite_path is None:
+            raise ValueError("The sqlite cache backend needs a sqlite_path")
+        shared = SQLiteBackend(
+            sqlite_path,
+            max_entries=sqlite_max_entries,
+            max_bytes=sqlite_max_bytes,
+            compact_interval=compact_interval,
+        )
+        shared.start_compactor()
+        backend = TieredBackend(memory, shared)
+        if warm_entries:
+            loaded = backend.warm_load(warm_entries)
+            logger.info(f"Warm-loaded {loaded} cached results from {sqlite_path}")
+        return backend
+
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+def _estimate_size(record: ClientRecord) -> int:
+    # Channel and status strings are interned, so only these are per entry
+    size = ENTRY_OVERHEAD + sys.getsizeof(record)
+    for value in (record.name, record.extra, record.error_message):
+        if value is not None:
+            size += sys.getsizeof(value)
+    return size
+
+
+def _encode_key(key: CacheKey) -> str:
+    return f"{key[0]}:{key[1]}"
+
+
+def _decode_key(key: str) -> CacheKey:
+    dni, channel = key.split(":", 1)
+    return dni, channel
+
+
+def _decode_entry(
+    payload: str, fresh_until: float, stale_until: float, size: int
+) -> CacheEntry:
+    return CacheEntry(
+        result=ClientRecord.from_result(QueryResult(**json.loads(payload))),
+        fresh_until=fresh_until,
+        stale_until=stale_until,
+        size=size,
+    )
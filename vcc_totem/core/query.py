@@ -1,92 +1,535 @@
+import asyncio
+import contextvars
 import logging
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import replace
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
+from vcc_totem.config import (
+    CACHE_BACKEND,
+    CACHE_COMPACT_INTERVAL,
+    CACHE_ENABLED,
+    CACHE_MAX_BYTES,
+    CACHE_MAX_ENTRIES,
+    CACHE_SQLITE_MAX_BYTES,
+    CACHE_SQLITE_MAX_ENTRIES,
+    CACHE_SQLITE_PATH,
+    CACHE_STALE_SECONDS,
+    CACHE_TTL_ERROR,
+    CACHE_TTL_NO_OFFER,
+    CACHE_TTL_NOT_FOUND,
+    CACHE_TTL_OFFER,
+    CACHE_WARM_ENTRIES,
+    SPECULATIVE_FALLBACK,
+    SPECULATIVE_HEDGE_DELAY,
+    SPECULATIVE_MAX_WORKERS,
+)
+from vcc_totem import deadline, metrics, timing
 from vcc_totem.models import QueryResult
-from vcc_totem.clients import fnb, gaso, session
+from vcc_totem.clients import fnb, session
+from vcc_totem.clients.breaker import FNB_BREAKER, LOGIN_BREAKER
+from vcc_totem.core.cache import ResultCache, build_backend
+from vcc_totem.core.singleflight import Group, WaitTimeout
 
 logger = logging.getLogger(__name__)
 
+_speculative_executor = ThreadPoolExecutor(
+    max_workers=SPECULATIVE_MAX_WORKERS, thread_name_prefix="gaso-speculative"
+)
+_fnb_latencies: deque[float] = deque(maxlen=200)
 
-def query_with_fallback(dni: str) -> QueryResult:
-    result_fnb = query_fnb(dni)
+RESULT_CACHE = ResultCache(
+    ttls={
+        "offer": CACHE_TTL_OFFER,
+        "no_offer": CACHE_TTL_NO_OFFER,
+        "not_found": CACHE_TTL_NOT_FOUND,
+        "error": CACHE_TTL_ERROR,
+    },
+    stale_seconds=CACHE_STALE_SECONDS,
+    backend=build_backend(
+        CACHE_BACKEND if CACHE_ENABLED else "memory",
+        max_entries=CACHE_MAX_ENTRIES,
+        max_bytes=CACHE_MAX_BYTES,
+        sqlite_path=CACHE_SQLITE_PATH,
+        sqlite_max_entries=CACHE_SQLITE_MAX_ENTRIES,
+        sqlite_max_bytes=CACHE_SQLITE_MAX_BYTES,
+        compact_interval=CACHE_COMPACT_INTERVAL,
+        warm_entries=CACHE_WARM_ENTRIES,
+    ),
+)
+_refresh_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="cache-refresh"
+)
+_refresh_tasks: set[asyncio.Task] = set()
+
+# Concurrent lookups of the same (dni, channel) share one upstream call
+FLIGHTS = Group()
+
+
+def query_with_fallback(
+    dni: str, speculative: Optional[bool] = None, use_cache: bool = True
+) -> QueryResult:
+    if speculative is None:
+        speculative = SPECULATIVE_FALLBACK
+
+    if not fnb_available():
+        logger.info(f"FNB circuit open, querying GASO directly for DNI {dni}")
+        result_gaso = query_gaso(dni, use_cache=use_cache)
+        result_gaso.fallback_mode = "fnb_skipped"
+        return result_gaso
+
+    if speculative:
+        return _query_speculative(dni, use_cache)
+
+    result_fnb = _timed_query_fnb(dni, use_cache)
+
+    if result_fnb.found_client:
+        result_fnb.fallback_mode = "sequential"
+        return result_fnb
+
+    if deadline.expired():
+        return _out_of_time(result_fnb)
+
+    result_gaso = query_gaso(dni, use_cache=use_cache)
+    result_gaso.fallback_mode = "sequential"
+    return result_gaso
+
+
+def _query_speculative(dni: str, use_cache: bool) -> QueryResult:
+    """Run GASO alongside FNB, starting it after the hedge delay.
+
+    FNB still wins when it finds the client; the GASO work is then cancelled
+    if it has not started yet, or discarded and reported as wasted.
+    """
+    cancelled = threading.Event()
+    gaso_span = {}
+
+    def run_gaso() -> Optional[QueryResult]:
+        if cancelled.wait(_hedge_delay()):
+            return None
+        with timing.timed("speculative_gaso") as span:
+            gaso_span["span"] = span
+            return query_gaso(dni, use_cache=use_cache)
+
+    # The copied context keeps GASO's spans in this request's trace
+    future = _speculative_executor.submit(contextvars.copy_context().run, run_gaso)
+    result_fnb = _timed_query_fnb(dni, use_cache)
+
+    if result_fnb.found_client:
+        cancelled.set()
+        future.cancel()
+        result_fnb.fallback_mode = "speculative"
+        result_fnb.wasted_seconds = _wasted(gaso_span)
+        return result_fnb
+
+    result_gaso = future.result()
+    if result_gaso is None:
+        # Not started, so ask GASO here as the sequential path does
+        result_gaso = query_gaso(dni, use_cache=use_cache)
+    result_gaso.fallback_mode = "speculative"
+    return result_gaso
+
+
+async def query_with_fallback_async(
+    dni: str, speculative: Optional[bool] = None, use_cache: bool = True
+) -> QueryResult:
+    if speculative is None:
+        speculative = SPECULATIVE_FALLBACK
+
+    if not fnb_available():
+        logger.info(f"FNB circuit open, querying GASO directly for DNI {dni}")
+        result_gaso = await query_gaso_async(dni, use_cache=use_cache)
+        result_gaso.fallback_mode = "fnb_skipped"
+        return result_gaso
+
+    if speculative:
+        return await _query_speculative_async(dni, use_cache)
+
+    result_fnb = await _timed_query_fnb_async(dni, use_cache)
+
+    if result_fnb.found_client:
+        result_fnb.fallback_mode = "sequential"
+        return result_fnb
+
+    if deadline.expired():
+        return _out_of_time(result_fnb)
+
+    result_gaso = await query_gaso_async(dni, use_cache=use_cache)
+    result_gaso.fallback_mode = "sequential"
+    return result_gaso
+
+
+async def _query_speculative_async(dni: str, use_cache: bool) -> QueryResult:
+    gaso_span = {}
+
+    async def run_gaso() -> QueryResult:
+        await asyncio.sleep(_hedge_delay())
+        with timing.timed("speculative_gaso") as span:
+            gaso_span["span"] = span
+            return await query_gaso_async(dni, use_cache=use_cache)
+
+    task = asyncio.create_task(run_gaso())
+    result_fnb = await _timed_query_fnb_async(dni, use_cache)
 
     if result_fnb.found_client:
+        task.cancel()
+        result_fnb.fallback_mode = "speculative"
+        result_fnb.wasted_seconds = _wasted(gaso_span)
         return result_fnb
 
-    return query_gaso(dni)
+    result_gaso = await task
+    result_gaso.fallback_mode = "speculative"
+    return result_gaso
+
+
+def _wasted(gaso_span: dict) -> float:
+    """Seconds GASO spent on an answer FNB made unneeded.
 
+    Its own span, not the time since it started: a GASO lookup that already
+    finished, say from the cache, wasted only what it took.
+    """
+    span = gaso_span.get("span")
+    return span.elapsed() if span is not None else 0.0
+
+
+def _out_of_time(result_fnb: QueryResult) -> QueryResult:
+    """FNB's answer when no time is left to ask GASO."""
+    logger.warning(f"Deadline exceeded, skipping GASO for DNI {result_fnb.dni}")
+    result_fnb.fallback_mode = "deadline"
+    return result_fnb
+
+
+def fnb_available() -> bool:
+    """False while the FNB query or login circuit is open."""
+    return FNB_BREAKER.available() and LOGIN_BREAKER.available()
+
+
+def _timed_query_fnb(dni: str, use_cache: bool) -> QueryResult:
+    start = time.monotonic()
+    result = query_fnb(dni, use_cache=use_cache)
+    _fnb_latencies.append(time.monotonic() - start)
+    return result
+
+
+async def _timed_query_fnb_async(dni: str, use_cache: bool) -> QueryResult:
+    start = time.monotonic()
+    result = await query_fnb_async(dni, use_cache=use_cache)
+    _fnb_latencies.append(time.monotonic() - start)
+    return result
+
+
+def _hedge_delay() -> float:
+    if SPECULATIVE_HEDGE_DELAY.strip().lower() != "p50":
+        return float(SPECULATIVE_HEDGE_DELAY)
+
+    if not _fnb_latencies:
+        return 0.0
+
+    return statistics.median(_fnb_latencies)
+
+
+def query_fnb(dni: str, use_cache: bool = True) -> QueryResult:
+    with timing.span("query_fnb"):
+        return _cached(dni, "fnb", _query_fnb, use_cache)
+
+
+async def query_fnb_async(dni: str, use_cache: bool = True) -> QueryResult:
+    with timing.span("query_fnb"):
+        return await _cached_async(dni, "fnb", _query_fnb_async, use_cache)
+
+
+def query_gaso(dni: str, use_cache: bool = True) -> QueryResult:
+    with timing.span("query_gaso"):
+        return _cached(dni, "gaso", _query_gaso, use_cache)
+
+
+async def query_gaso_async(dni: str, use_cache: bool = True) -> QueryResult:
+    with timing.span("query_gaso"):
+        return await _cached_async(dni, "gaso", _query_gaso_async, use_cache)
+
+
+def _cached(dni: str, channel: str, compute, use_cache: bool) -> QueryResult:
+    """Serve from RESULT_CACHE, refreshing stale entries in the background.
+
+    ``use_cache=False`` skips the lookup but still stores the fresh result.
+    """
+    key = (dni, channel)
+
+    if CACHE_ENABLED and use_cache:
+        cached, stale = RESULT_CACHE.get(key)
+        _count_lookup(channel, cached, stale)
+        if cached is not None:
+            if stale and RESULT_CACHE.begin_refresh(key):
+                _refresh_executor.submit(_refresh, key, compute, dni)
+            return cached
+    else:
+        metrics.CACHE_LOOKUPS.labels(channel, "bypass").inc()
 
-def query_fnb(dni: str) -> QueryResult:
     try:
-        sess, ally_id = session.get_session()
-        data, status, error = fnb.query_credit_line(sess, dni, ally_id)
-
-        if status == "success" and data:
-            return QueryResult(
-                success=True,
-                dni=dni,
-                channel="fnb",
-                data=data,
-                has_offer=data.get("tieneLineaCredito", False),
-            )
+        result = FLIGHTS.do(
+            key,
+            lambda: _compute_and_store(key, compute, dni),
+            timeout=deadline.remaining(),
+            shareable=_within_deadline,
+        )
+    except WaitTimeout:
+        return _deadline_result(dni, channel)
+    return replace(result)
+
+
+async def _cached_async(
+    dni: str, channel: str, compute, use_cache: bool
+) -> QueryResult:
+    key = (dni, channel)
+
+    if CACHE_ENABLED and use_cache:
+        cached, stale = await RESULT_CACHE.get_async(key)
+        _count_lookup(channel, cached, stale)
+        if cached is not None:
+            if stale and RESULT_CACHE.begin_refresh(key):
+                task = asyncio.create_task(_refresh_async(key, compute, dni))
+                _refresh_tasks.add(task)
+                task.add_done_callback(_refresh_tasks.discard)
+            return cached
+    else:
+        metrics.CACHE_LOOKUPS.labels(channel, "bypass").inc()
+
+    try:
+        result = await FLIGHTS.do_async(
+            key,
+            lambda: _compute_and_store_async(key, compute, dni),
+            timeout=deadline.remaining(),
+            shareable=_within_deadline,
+        )
+    except WaitTimeout:
+        return _deadline_result(dni, channel)
+    return replace(result)
+
+
+def _count_lookup(channel: str, cached: Optional[QueryResult], stale: bool) -> None:
+    result = "miss" if cached is None else "stale" if stale else "hit"
+    metrics.CACHE_LOOKUPS.labels(channel, result).inc()
+
 
-        if status == "not_found":
-            return QueryResult(
-                success=False,
-                dni=dni,
-                channel="fnb",
-                error_message=error or "Client not found",
+def _within_deadline() -> bool:
+    """Past the deadline some calls were skipped and the result may be
+    partial: it is neither cached nor handed to coalesced callers."""
+    return not deadline.expired()
+
+
+def _deadline_result(dni: str, channel: str) -> QueryResult:
+    data, status, error = deadline.exceeded()
+    return QueryResult(
+        success=False, dni=dni, channel=channel, error_message=error, status=status
+    )
+
+
+def _compute_and_store(key, compute, dni: str) -> QueryResult:
+    result = compute(dni)
+    if CACHE_ENABLED and _within_deadline():
+        RESULT_CACHE.set(key, result)
+    return result
+
+
+async def _compute_and_store_async(key, compute, dni: str) -> QueryResult:
+    result = await compute(dni)
+    if CACHE_ENABLED and _within_deadline():
+        await RESULT_CACHE.set_async(key, result)
+    return result
+
+
+def _refresh(key, compute, dni: str) -> None:
+    try:
+        FLIGHTS.do(key, lambda: _compute_and_store(key, compute, dni))
+    finally:
+        RESULT_CACHE.end_refresh(key)
+
+
+async def _refresh_async(key, compute, dni: str) -> None:
+    # The task inherited the request's context, not its hurry
+    try:
+        with deadline.unbounded():
+            await FLIGHTS.do_async(
+                key, lambda: _compute_and_store_async(key, compute, dni)
             )
+    finally:
+        RESULT_CACHE.end_refresh(key)
+
+
+def _query_fnb(dni: str) -> QueryResult:
+    if not fnb_available():
+        return _fnb_result(dni, None, "circuit_open", "FNB circuit open")
+    if deadline.expired():
+        return _fnb_result(dni, *deadline.exceeded())
 
-        if status == "session_expired":
+    try:
+        data, status, error = _query_fnb_pooled(dni)
+
+        if status == "session_expired" and not deadline.expired():
             logger.warning(f"Session expired for DNI {dni}, retrying")
-            session.invalidate_session()
-            sess, ally_id = session.get_session()
-            data, status, error = fnb.query_credit_line(sess, dni, ally_id)
-
-            if status == "success" and data:
-                return QueryResult(
-                    success=True,
-                    dni=dni,
-                    channel="fnb",
-                    data=data,
-                    has_offer=data.get("tieneLineaCredito", False),
-                )
+            data, status, error = _query_fnb_pooled(dni)
+
+        if status == "rate_limited" and not deadline.expired():
+            # The session is out of rotation and the rate controller backed off
+            logger.warning(f"FNB rate limited for DNI {dni}, retrying")
+            data, status, error = _query_fnb_pooled(dni)
+
+        return _fnb_result(dni, data, status, error)
 
+    except Exception as e:
+        logger.error(f"FNB query failed for DNI {dni}: {e}")
         return QueryResult(
-            success=False,
-            dni=dni,
-            channel="fnb",
-            error_message=error or f"Query failed: {status}",
+            success=False, dni=dni, channel="fnb", error_message=str(e), status="error"
         )
 
+
+async def _query_fnb_async(dni: str) -> QueryResult:
+    if not fnb_available():
+        return _fnb_result(dni, None, "circuit_open", "FNB circuit open")
+    if deadline.expired():
+        return _fnb_result(dni, *deadline.exceeded())
+
+    try:
+        data, status, error = await _query_fnb_pooled_async(dni)
+
+        if status == "session_expired" and not deadline.expired():
+            logger.warning(f"Session expired for DNI {dni}, retrying")
+            data, status, error = await _query_fnb_pooled_async(dni)
+
+        if status == "rate_limited" and not deadline.expired():
+            # The session is out of rotation and the rate controller backed off
+            logger.warning(f"FNB rate limited for DNI {dni}, retrying")
+            data, status, error = await _query_fnb_pooled_async(dni)
+
+        return _fnb_result(dni, data, status, error)
+
     except Exception as e:
         logger.error(f"FNB query failed for DNI {dni}: {e}")
-        return QueryResult(success=False, dni=dni, channel="fnb", error_message=str(e))
+        return QueryResult(
+            success=False, dni=dni, channel="fnb", error_message=str(e), status="error"
+        )
 
 
-def query_gaso(dni: str) -> QueryResult:
+def _query_fnb_pooled(dni: str) -> tuple[Optional[dict], str, Optional[str]]:
     try:
-        data, status, error = gaso.query_credit_line(dni)
+        handle = session.acquire()
+    except session.LoginWaitTimeout:
+        return deadline.exceeded()
+    status = "error"
+    try:
+        with metrics.upstream_call("fnb") as call:
+            data, status, error = fnb.query_credit_line(
+                handle.session, dni, handle.ally_id
+            )
+            call.status = status
+        return data, status, error
+    finally:
+        session.release(handle, status)
 
-        if status == "success" and data:
-            return QueryResult(
-                success=True,
-                dni=dni,
-                channel="gaso",
-                data=data,
-                has_offer=data.get("tieneLineaCredito", False),
+
+async def _query_fnb_pooled_async(
+    dni: str,
+) -> tuple[Optional[dict], str, Optional[str]]:
+    try:
+        handle = await session.acquire_async()
+    except session.LoginWaitTimeout:
+        return deadline.exceeded()
+    status = "error"
+    try:
+        with metrics.upstream_call("fnb") as call:
+            data, status, error = await fnb.query_credit_line_async(
+                handle.session, dni, handle.ally_id
             )
+            call.status = status
+        return data, status, error
+    finally:
+        session.release(handle, status)
+
+
+def _fnb_result(
+    dni: str, data: Optional[dict], status: str, error: Optional[str]
+) -> QueryResult:
+    if status == "success" and data:
+        return QueryResult(
+            success=True,
+            dni=dni,
+            channel="fnb",
+            data=data,
+            has_offer=data.get("tieneLineaCredito", False),
+            status=status,
+        )
 
+    if status == "not_found":
         return QueryResult(
             success=False,
             dni=dni,
-            channel="gaso",
+            channel="fnb",
             error_message=error or "Client not found",
+            status=status,
         )
 
+    return QueryResult(
+        success=False,
+        dni=dni,
+        channel="fnb",
+        error_message=error or f"Query failed: {status}",
+        status=status,
+    )
+
+
+def _query_gaso(dni: str) -> QueryResult:
+    # Imported on the first fallback: CLI runs answered by FNB never load it
+    from vcc_totem.clients import gaso
+
+    try:
+        data, status, error = gaso.query_credit_line(dni)
+        return _gaso_result(dni, data, status, error)
+
     except Exception as e:
         logger.error(f"GASO query failed for DNI {dni}: {e}")
-        return QueryResult(success=False, dni=dni, channel="gaso", error_message=str(e))
+        return QueryResult(
+            success=False, dni=dni, channel="gaso", error_message=str(e), status="error"
+        )
+
+
+async def _query_gaso_async(dni: str) -> QueryResult:
+    from vcc_totem.clients import gaso
+
+    try:
+        data, status, error = await gaso.query_credit_line_async(dni)
+        return _gaso_result(dni, data, status, error)
+
+    except Exception as e:
+        logger.error(f"GASO query failed for DNI {dni}: {e}")
+        return QueryResult(
+            success=False, dni=dni, channel="gaso", error_message=str(e), status="error"
+        )
+
+
+def _gaso_result(
+    dni: str, data: Optional[dict], status: str, error: Optional[str]
+) -> QueryResult:
+    if status == "success" and data:
+        return QueryResult(
+            success=True,
+            dni=dni,
+            channel="gaso",
+            data=data,
+            has_offer=data.get("tieneLineaCredito", False),
+            status=status,
+        )
+
+    return QueryResult(
+        success=False,
+        dni=dni,
+        channel="gaso",
+        error_message=error or "Client not found",
+        status=status,
+    )
 
 
 def validate_dni(dni: str) -> str:
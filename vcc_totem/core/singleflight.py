@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class WaitTimeout(TimeoutError):
+    """A waiter's own timeout passed before the flight it joined finished."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.shared = True
+
+
+class Group:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception). Threads
+    and asyncio tasks are tracked separately, so a sync and an async caller
+    for the same key each run their own computation.
+
+    ``shareable`` is checked in the leader's context right after the function
+    returns; a result it rejects goes to the leader only, and the waiters
+    run the function again. A waiter gives up after its own ``timeout`` with
+    WaitTimeout.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._tasks: dict[Hashable, list] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0, "unshared": 0}
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        timeout: Optional[float] = None,
+        shareable: Optional[Callable[[], bool]] = None,
+    ) -> Any:
+        with self._lock:
+            self._stats["calls"] += 1
+        until = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if call is None:
+                    call = _Call()
+                    self._calls[key] = call
+                    self._stats["executions"] += 1
+                else:
+                    self._stats["coalesced"] += 1
+
+            if leader:
+                return self._run(key, call, fn, shareable)
+
+            if not call.done.wait(_left(until)):
+                raise WaitTimeout(f"Gave up waiting for the flight of {key}")
+            if call.error is not None:
+                raise call.error
+            if call.shared:
+                return call.result
+
+    async def do_async(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None,
+        shareable: Optional[Callable[[], bool]] = None,
+    ) -> Any:
+        """Async variant; the shared task is cancelled only if every waiter is."""
+        with self._lock:
+            self._stats["calls"] += 1
+        until = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                flight = self._tasks.get(key)
+                leader = flight is None
+                if flight is None:
+                    task = asyncio.ensure_future(self._run_async(fn, shareable))
+                    flight = [task, 0]
+                    self._tasks[key] = flight
+                    self._stats["executions"] += 1
+                    task.add_done_callback(lambda _: self._forget(key, task))
+                else:
+                    self._stats["coalesced"] += 1
+                flight[1] += 1
+
+            task = flight[0]
+            try:
+                result, shared = await asyncio.wait_for(
+                    asyncio.shield(task), _left(until)
+                )
+            except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+                if not task.done():
+                    with self._lock:
+                        flight[1] -= 1
+                        abandoned = flight[1] == 0
+                    if abandoned:
+                        task.cancel()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                raise WaitTimeout(f"Gave up waiting for the flight of {key}") from None
+
+            if shared or leader:
+                return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls) + len(self._tasks)}
+
+    def _run(
+        self,
+        key: Hashable,
+        call: _Call,
+        fn: Callable[[], Any],
+        shareable: Optional[Callable[[], bool]],
+    ) -> Any:
+        try:
+            call.result = fn()
+            call.shared = shareable is None or shareable()
+            if not call.shared:
+                self._count_unshared()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def _run_async(
+        self, fn: Callable[[], Awaitable[Any]], shareable: Optional[Callable[[], bool]]
+    ) -> tuple[Any, bool]:
+        # Runs in the leader's context, so shareable sees its deadline
+        result = await fn()
+        shared = shareable is None or shareable()
+        if not shared:
+            self._count_unshared()
+        return result, shared
+
+    def _count_unshared(self) -> None:
+        with self._lock:
+            self._stats["unshared"] += 1
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        with self._lock:
+            flight = self._tasks.get(key)
+            if flight is not None and flight[0] is task:
+                del self._tasks[key]
+
+
+def _left(until: Optional[float]) -> Optional[float]:
+    return None if until is None else max(until - time.monotonic(), 0)
@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+EXCEEDED = "deadline_exceeded"
+# Never hand a zero or negative timeout to requests/httpx
+MIN_TIMEOUT = 0.01
+
+
+class _Budget:
+    # Mutable, so spend() reaches every thread and task sharing the request
+    __slots__ = ("at",)
+
+    def __init__(self, at: float):
+        self.at = at
+
+
+_deadline: ContextVar[Optional[_Budget]] = ContextVar("vcc_deadline", default=None)
+
+
+@contextmanager
+def limit(seconds: Optional[float]) -> Iterator[None]:
+    """Give the upstream calls made inside this block ``seconds`` in total.
+
+    Like the spans in ``timing``, the deadline follows the context into child
+    tasks and into threads started with ``contextvars.copy_context()``. A
+    nested limit can only shorten it; None or 0 keeps the current one.
+    """
+    current = _deadline.get()
+    if not seconds:
+        yield
+        return
+
+    at = time.monotonic() + seconds
+    token = _deadline.set(_Budget(at if current is None else min(current.at, at)))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def unbounded() -> Iterator[None]:
+    """Drop the caller's deadline, for background work it merely started."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left, or None without a deadline."""
+    budget = _deadline.get()
+    return None if budget is None else budget.at - time.monotonic()
+
+
+def spend() -> None:
+    """Mark the budget as used up, when the next call could not finish in it."""
+    budget = _deadline.get()
+    if budget is not None:
+        budget.at = min(budget.at, time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def timeout(default: float) -> float:
+    """``default`` capped at what is left of the deadline."""
+    left = remaining()
+    if left is None:
+        return default
+    return max(min(default, left), MIN_TIMEOUT)
+
+
+def exceeded() -> tuple[None, str, str]:
+    """The ``(data, status, error)`` answer of a call skipped or cut short."""
+    return None, EXCEEDED, "Deadline exceeded"
@@ -0,0 +1,206 @@
+"""
+Cached readiness of the FNB and PowerBI channels for /readyz.
+
+Every upstream call reports its outcome here through metrics.upstream_call.
+A background prober only checks a channel that saw no traffic for a whole
+interval, so serving /readyz never calls upstream.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+
+from vcc_totem.config import (
+    HEALTH_FAILURE_THRESHOLD,
+    HEALTH_PROBE_INTERVAL,
+    HEALTH_PROBE_TIMEOUT,
+    LOGIN_API,
+)
+
+logger = logging.getLogger(__name__)
+
+FAILURE_STATUSES = ("error", "timeout", "connection_error")
+# upstream_call channel -> health channel; a failing login means FNB is down
+CHANNELS = {"fnb": "fnb", "login": "fnb", "gaso": "gaso"}
+# Without any signal for this many intervals the status is no longer trusted
+STALE_INTERVALS = 3
+
+
+def is_failure(status: str) -> bool:
+    """Outcomes that say the upstream itself is unhealthy.
+
+    Not found, rate limited or expired sessions are answers, not failures.
+    """
+    return status in FAILURE_STATUSES or (status.isdigit() and int(status) >= 500)
+
+
+class ChannelHealth:
+    def __init__(self, name: str):
+        self.name = name
+        self.ok: Optional[bool] = None
+        self.failures = 0
+        self.checked_at = 0.0
+        self.source: Optional[str] = None
+        self.error: Optional[str] = None
+
+    def observe(
+        self, ok: bool, source: str, failure_threshold: int, error: Optional[str]
+    ) -> None:
+        self.checked_at = time.monotonic()
+        self.source = source
+
+        if ok:
+            self.ok = True
+            self.failures = 0
+            self.error = None
+            return
+
+        self.failures += 1
+        self.error = error
+        # A failed probe is conclusive, one failed customer query is not
+        if source == "probe" or self.failures >= failure_threshold:
+            self.ok = False
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        probes: dict[str, Callable[[], bool]],
+        interval: float = HEALTH_PROBE_INTERVAL,
+        failure_threshold: int = HEALTH_FAILURE_THRESHOLD,
+    ):
+        self.probes = probes
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self._channels = {name: ChannelHealth(name) for name in probes}
+        self._lock = threading.Lock()
+        self._prober: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._probe_count = 0
+
+    def observe(self, channel: str, status: str) -> None:
+        """Passive signal from a real upstream call."""
+        health = self._channels.get(CHANNELS.get(channel, channel))
+        if health is None:
+            return
+
+        failed = is_failure(status)
+        with self._lock:
+            health.observe(
+                not failed,
+                "traffic",
+                self.failure_threshold,
+                status if failed else None,
+            )
+
+    def probe(self, force: bool = False) -> None:
+        """Check every channel that had no signal during the last interval."""
+        for name, check in self.probes.items():
+            health = self._channels[name]
+            with self._lock:
+                quiet = time.monotonic() - health.checked_at >= self.interval
+            if not (force or quiet):
+                continue
+
+            error = None
+            try:
+                ok = bool(check())
+            except Exception as e:
+                ok = False
+                error = str(e)
+            if not ok:
+                logger.error(f"{name} health probe failed: {error or 'not reachable'}")
+
+            with self._lock:
+                self._probe_count += 1
+                health.observe(ok, "probe", self.failure_threshold, error)
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        stale_after = self.interval * STALE_INTERVALS
+        channels = {}
+
+        with self._lock:
+            for name, health in self._channels.items():
+                age = now - health.checked_at if health.checked_at else None
+                if health.ok is None or age is None or age > stale_after:
+                    state = "unknown"
+                else:
+                    state = "ok" if health.ok else "error"
+
+                channels[name] = {
+                    "status": state,
+                    "source": health.source,
+                    "age": round(age, 1) if age is not None else None,
+                    "consecutive_failures": health.failures,
+                    "error": health.error,
+                }
+            probes = self._probe_count
+
+        return {
+            "ready": all(c["status"] == "ok" for c in channels.values()),
+            "channels": channels,
+            "probes": probes,
+        }
+
+    def start_prober(self) -> None:
+        with self._lock:
+            if self._prober is not None and self._prober.is_alive():
+                return
+            self._stop.clear()
+            self._prober = threading.Thread(
+                target=self._probe_loop, name="health-prober", daemon=True
+            )
+            self._prober.start()
+
+    def stop_prober(self) -> None:
+        self._stop.set()
+
+    def _probe_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                logger.error(f"Health prober error: {e}")
+            # Wake up often enough to catch a channel going quiet
+            self._stop.wait(self.interval / 2)
+
+
+def _probe_fnb() -> bool:
+    """Reachability of the FNB login endpoint, without logging in.
+
+    Any answer below 500 (405 for a HEAD on a POST endpoint included) means
+    FNB is serving; the session pool and its query counts are left alone.
+    """
+    response = requests.head(
+        LOGIN_API, timeout=HEALTH_PROBE_TIMEOUT, allow_redirects=False
+    )
+    return response.status_code < 500
+
+
+def _probe_gaso() -> bool:
+    from vcc_totem.clients.gaso import check_connection
+
+    return check_connection()
+
+
+HEALTH = HealthMonitor({"fnb": _probe_fnb, "gaso": _probe_gaso})
+
+
+def observe(channel: str, status: str) -> None:
+    HEALTH.observe(channel, status)
+
+
+def readiness() -> dict:
+    return HEALTH.status()
+
+
+def start_prober() -> None:
+    HEALTH.start_prober()
+
+
+def stop_prober() -> None:
+    HEALTH.stop_prober()
@@ -5,8 +5,14 @@ uv run vcc_totem/main.py -- 12345678        (equivalente a python run vcc_totem/
 Si deseas una respuesta en formato JSON, agrega --json:
 uv run vcc_totem/main.py -- 12345678 --json
 
+Para responder con lo obtenido tras unos segundos, agrega --deadline:
+uv run vcc_totem/main.py -- 12345678 --deadline 5
+
 O solo ejecútalo para usar el modo interactivo:
 uv run vcc_totem/main.py
+
+Para consultar masivamente los DNIs de DNIS_FILE (reanudable con Ctrl-C):
+uv run vcc_totem/main.py -- bulk --workers 4
 """
 
 import logging
@@ -14,7 +20,8 @@ from pathlib import Path
 
 import click
 
-from vcc_totem.config import LOG_FILE, LOG_LEVEL
+from vcc_totem import deadline
+from vcc_totem.config import DNIS_FILE, LOG_FILE, LOG_LEVEL, OUTPUT_DIR, ROOT_DIR
 from vcc_totem.core.query import query_with_fallback, validate_dni
 from vcc_totem.core.messages import format_response
 
@@ -23,18 +30,47 @@ log_path.parent.mkdir(parents=True, exist_ok=True)
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL),
     format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler(log_path, encoding="utf-8"), logging.StreamHandler()],
+    handlers=[
+        # Opened on the first record, not at import
+        logging.FileHandler(log_path, encoding="utf-8", delay=True),
+        logging.StreamHandler(),
+    ],
 )
 logger = logging.getLogger(__name__)
 
 
-@click.command()
+class DefaultGroup(click.Group):
+    """Runs ``query`` when the first argument is not a subcommand.
+
+    Keeps ``vcc-totem 12345678`` and the interactive mode working alongside
+    ``vcc-totem bulk``.
+    """
+
+    def parse_args(self, ctx, args):
+        if not args or (args[0] not in self.commands and args[0] != "--help"):
+            args = ["query", *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup)
+def main():
+    pass
+
+
+@main.command("query")
 @click.argument("dni", required=False)
 @click.option("--json", is_flag=True, help="Salida en formato JSON")
-def main(dni, json):
+@click.option("--no-cache", is_flag=True, help="Ignorar resultados en caché")
+@click.option(
+    "--deadline",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Segundos máximos por consulta; al vencer responde con lo obtenido",
+)
+def query_command(dni, json, no_cache, deadline):
+    """Consulta un DNI, o entra al modo interactivo sin argumentos."""
     # Single query mode
     if dni:
-        query_dni(dni, json)
+        query_dni(dni, json, use_cache=not no_cache, deadline_seconds=deadline)
         return
 
     # Interactive mode
@@ -43,11 +79,62 @@ def main(dni, json):
         dni = click.prompt("DNI", type=str).strip()
         if dni.lower() == "q":
             break
-        query_dni(dni, json)
+        query_dni(dni, json, use_cache=not no_cache, deadline_seconds=deadline)
         click.echo()
 
 
-def query_dni(dni, as_json):
+@main.command("bulk")
+@click.option(
+    "--input",
+    "input_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=lambda: ROOT_DIR / DNIS_FILE,
+    help="Archivo con un DNI por línea (por defecto DNIS_FILE)",
+)
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=lambda: ROOT_DIR / OUTPUT_DIR,
+    help="Directorio de resultados y checkpoint (por defecto OUTPUT_DIR)",
+)
+@click.option("--workers", default=4, show_default=True, help="Consultas en paralelo")
+@click.option("--no-cache", is_flag=True, help="Ignorar resultados en caché")
+def bulk_command(input_path, output_dir, workers, no_cache):
+    """Consulta masiva reanudable de un archivo de DNIs."""
+    from vcc_totem.core.bulk import run_bulk
+    from vcc_totem.clients.ratelimit import rate_stats
+    from vcc_totem.clients.session import start_refresher
+
+    def progress(result, stats):
+        if stats["processed"] % 50 == 0:
+            rates = ", ".join(f"{k} {v['rate']}/s" for k, v in rate_stats().items())
+            click.echo(
+                f"{stats['processed']} procesados, {stats['offers']} con oferta, "
+                f"{stats['errors']} errores ({rates})"
+            )
+
+    start_refresher()
+    try:
+        stats = run_bulk(
+            input_path,
+            output_dir,
+            workers=workers,
+            use_cache=not no_cache,
+            on_result=progress,
+        )
+    except KeyboardInterrupt:
+        click.secho("\nInterrumpido, vuelve a ejecutar para continuar", fg="yellow")
+        return
+
+    click.secho(
+        f"Listo: {stats['processed']} procesados, {stats['found']} encontrados, "
+        f"{stats['offers']} con oferta, {stats['errors']} errores, "
+        f"{stats['invalid']} inválidos",
+        fg="green",
+    )
+
+
+def query_dni(dni, as_json, use_cache=True, deadline_seconds=None):
     """Query a single DNI."""
     try:
         dni = validate_dni(dni)
@@ -55,7 +142,8 @@ def query_dni(dni, as_json):
         click.secho(f"DNI inválido: {e}", fg="red", err=True)
         return
 
-    result = query_with_fallback(dni)
+    with deadline.limit(deadline_seconds):
+        result = query_with_fallback(dni, use_cache=use_cache)
     message, has_offer = format_response(result)
 
     if as_json:
@@ -66,6 +154,8 @@ def query_dni(dni, as_json):
             "dni": result.dni,
             "channel": result.channel,
             "has_offer": result.has_offer,
+            "fallback_mode": result.fallback_mode,
+            "wasted_seconds": result.wasted_seconds,
         }
         if result.data:
             response["data"] = result.data
@@ -0,0 +1,173 @@
+"""
+Prometheus collectors for the API and its upstream calls.
+
+prometheus_client is imported, and the collectors created, on first use:
+the one-shot CLI never serves /metrics and should not pay for it at startup.
+Module attributes such as ``metrics.CACHE_LOOKUPS`` still work as before.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+# Loads .env first, so PROMETHEUS_MULTIPROC_DIR is seen by prometheus_client
+import vcc_totem.config  # noqa: F401
+from vcc_totem import health, timing
+
+if TYPE_CHECKING:
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+# Upstream calls go up to TIMEOUT (300s by default)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+COLLECTORS = (
+    "REGISTRY",
+    "HTTP_REQUESTS",
+    "HTTP_SECONDS",
+    "HTTP_IN_FLIGHT",
+    "UPSTREAM_REQUESTS",
+    "UPSTREAM_SECONDS",
+    "UPSTREAM_IN_FLIGHT",
+    "CACHE_LOOKUPS",
+    "HEDGED_REQUESTS",
+)
+
+# Bound by load(); declared here, unassigned, so __getattr__ still sees them
+REGISTRY: "CollectorRegistry"
+HTTP_REQUESTS: "Counter"
+HTTP_SECONDS: "Histogram"
+HTTP_IN_FLIGHT: "Gauge"
+UPSTREAM_REQUESTS: "Counter"
+UPSTREAM_SECONDS: "Histogram"
+UPSTREAM_IN_FLIGHT: "Gauge"
+CACHE_LOOKUPS: "Counter"
+HEDGED_REQUESTS: "Counter"
+
+_lock = threading.Lock()
+_loaded = False
+
+
+def __getattr__(name: str):
+    if name in COLLECTORS:
+        load()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def load() -> None:
+    """Import prometheus_client and create the collectors, once."""
+    global _loaded, REGISTRY, HTTP_REQUESTS, HTTP_SECONDS, HTTP_IN_FLIGHT
+    global UPSTREAM_REQUESTS, UPSTREAM_SECONDS, UPSTREAM_IN_FLIGHT
+    global CACHE_LOOKUPS, HEDGED_REQUESTS
+
+    if _loaded:
+        return
+
+    with _lock:
+        if _loaded:
+            return
+
+        from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+
+        HTTP_REQUESTS = Counter(
+            "vcc_http_requests_total",
+            "API requests by endpoint and response status",
+            ["method", "endpoint", "status"],
+        )
+        HTTP_SECONDS = Histogram(
+            "vcc_http_request_seconds",
+            "API request latency until the response headers are sent",
+            ["method", "endpoint"],
+            buckets=LATENCY_BUCKETS,
+        )
+        HTTP_IN_FLIGHT = Gauge(
+            "vcc_http_in_flight",
+            "API requests being served",
+            multiprocess_mode="livesum",
+        )
+        UPSTREAM_REQUESTS = Counter(
+            "vcc_upstream_requests_total",
+            "Calls to FNB, FNB login and PowerBI by outcome",
+            ["channel", "field", "status"],
+        )
+        UPSTREAM_SECONDS = Histogram(
+            "vcc_upstream_seconds",
+            "Upstream call latency",
+            ["channel", "field"],
+            buckets=LATENCY_BUCKETS,
+        )
+        UPSTREAM_IN_FLIGHT = Gauge(
+            "vcc_upstream_in_flight",
+            "Upstream calls waiting for a response",
+            ["channel"],
+            multiprocess_mode="livesum",
+        )
+        CACHE_LOOKUPS = Counter(
+            "vcc_cache_lookups_total",
+            "Result cache lookups by channel and result (hit, stale, miss, bypass)",
+            ["channel", "result"],
+        )
+        HEDGED_REQUESTS = Counter(
+            "vcc_hedged_requests_total",
+            "Duplicated slow upstream calls (sent, won, budget_exhausted)",
+            ["channel", "outcome"],
+        )
+        _loaded = True
+
+
+class _Call:
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status = "error"
+
+
+@contextmanager
+def upstream_call(channel: str, field: str = "-"):
+    """Time one upstream call; set ``call.status`` before leaving the block.
+
+    The call also shows up as a span of the current request trace, and its
+    outcome feeds the channel's readiness.
+    """
+    load()
+    call = _Call()
+    in_flight = UPSTREAM_IN_FLIGHT.labels(channel)
+    in_flight.inc()
+    timing.count_upstream_call()
+    start = time.perf_counter()
+    try:
+        with timing.span(channel if field == "-" else f"{channel}.{field}"):
+            yield call
+    finally:
+        elapsed = time.perf_counter() - start
+        in_flight.dec()
+        UPSTREAM_SECONDS.labels(channel, field).observe(elapsed)
+        UPSTREAM_REQUESTS.labels(channel, field, call.status).inc()
+        health.observe(channel, call.status)
+
+
+def observe_request(method: str, endpoint: str, status: int, seconds: float) -> None:
+    load()
+    HTTP_REQUESTS.labels(method, endpoint, str(status)).inc()
+    HTTP_SECONDS.labels(method, endpoint).observe(seconds)
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition for /metrics, merged across workers in multiprocess mode.
+
+    Set PROMETHEUS_MULTIPROC_DIR to an empty directory before starting
+    uvicorn with several workers.
+    """
+    from prometheus_client import CollectorRegistry, generate_latest, multiprocess
+    from prometheus_client import CONTENT_TYPE_LATEST
+
+    load()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,5 +1,7 @@
+import json
+import sys
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Union
 
 
 @dataclass
@@ -10,7 +12,151 @@ class QueryResult:
     data: Optional[dict] = None
     error_message: Optional[str] = None
     has_offer: bool = False
+    status: Optional[str] = None
+    fallback_mode: Optional[str] = None
+    wasted_seconds: float = 0.0
 
     @property
     def found_client(self) -> bool:
         return self.success and self.data is not None
+
+
+# ClientRecord.flags
+SUCCESS = 1
+HAS_OFFER = 2
+HAS_DATA = 4
+DNI_IN_DATA = 8
+HAS_CREDIT_FLAG = 16
+CREDIT = 32
+SEGMENT_IS_CHANNEL = 64
+
+
+class ClientRecord:
+    """Compact form of a QueryResult, for results kept in memory by the cache.
+
+    The fields messages and bulk output read most (name, credit line, offer
+    flags) get their own slot, booleans share one int, and the rest of
+    ``data`` is kept as a compact JSON string. Channel and status strings
+    are interned. ``to_result`` rebuilds an equal QueryResult.
+    """
+
+    __slots__ = (
+        "dni",
+        "channel",
+        "status",
+        "flags",
+        "name",
+        "credit_line",
+        "extra",
+        "error_message",
+        "fallback_mode",
+        "wasted_seconds",
+    )
+
+    def __init__(
+        self,
+        dni: Union[int, str],
+        channel: str,
+        status: Optional[str],
+        flags: int,
+        name: Optional[str] = None,
+        credit_line: Optional[float] = None,
+        extra: Optional[str] = None,
+        error_message: Optional[str] = None,
+        fallback_mode: Optional[str] = None,
+        wasted_seconds: float = 0.0,
+    ):
+        self.dni = dni
+        self.channel = sys.intern(channel)
+        self.status = _intern(status)
+        self.flags = flags
+        self.name = name
+        self.credit_line = credit_line
+        self.extra = extra
+        self.error_message = error_message
+        self.fallback_mode = _intern(fallback_mode)
+        self.wasted_seconds = wasted_seconds
+
+    @classmethod
+    def from_result(cls, result: QueryResult) -> "ClientRecord":
+        flags = (SUCCESS if result.success else 0) | (
+            HAS_OFFER if result.has_offer else 0
+        )
+        name = credit_line = extra = None
+
+        if result.data is not None:
+            flags |= HAS_DATA
+            data = dict(result.data)
+
+            if data.get("dni") == result.dni:
+                flags |= DNI_IN_DATA
+                del data["dni"]
+            # Only lifted out when the type round-trips exactly
+            if type(data.get("nombre")) is str:
+                name = data.pop("nombre")
+            if type(data.get("lineaCredito")) is float:
+                credit_line = data.pop("lineaCredito")
+            if type(data.get("tieneLineaCredito")) is bool:
+                flags |= HAS_CREDIT_FLAG
+                flags |= CREDIT if data.pop("tieneLineaCredito") else 0
+            if "segmento" in data and data["segmento"] == result.channel:
+                flags |= SEGMENT_IS_CHANNEL
+                del data["segmento"]
+
+            if data:
+                extra = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+        # 8-digit DNIs fit in a small int
+        dni: Union[int, str] = result.dni
+        if len(result.dni) == 8 and result.dni.isdigit():
+            dni = int(result.dni)
+
+        return cls(
+            dni,
+            result.channel,
+            result.status,
+            flags,
+            name,
+            credit_line,
+            extra,
+            result.error_message,
+            result.fallback_mode,
+            result.wasted_seconds,
+        )
+
+    def to_result(self) -> QueryResult:
+        dni = f"{self.dni:08d}" if isinstance(self.dni, int) else self.dni
+        flags = self.flags
+
+        data: Optional[dict] = None
+        if flags & HAS_DATA:
+            # Same key order as the GASO client and FNB payloads build them
+            data = {}
+            if flags & DNI_IN_DATA:
+                data["dni"] = dni
+            if self.name is not None:
+                data["nombre"] = self.name
+            if self.extra is not None:
+                data.update(json.loads(self.extra))
+            if flags & HAS_CREDIT_FLAG:
+                data["tieneLineaCredito"] = bool(flags & CREDIT)
+            if self.credit_line is not None:
+                data["lineaCredito"] = self.credit_line
+            if flags & SEGMENT_IS_CHANNEL:
+                data["segmento"] = self.channel
+
+        return QueryResult(
+            success=bool(flags & SUCCESS),
+            dni=dni,
+            channel=self.channel,
+            data=data,
+            error_message=self.error_message,
+            has_offer=bool(flags & HAS_OFFER),
+            status=self.status,
+            fallback_mode=self.fallback_mode,
+            wasted_seconds=self.wasted_seconds,
+        )
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
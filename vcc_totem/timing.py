@@ -0,0 +1,106 @@
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "children", "upstream_calls")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.children: list["Span"] = []
+        self.upstream_calls = 0
+
+    def elapsed(self) -> float:
+        """Duration once closed, time since its start while still open."""
+        return self.duration or time.perf_counter() - self.start
+
+    def to_dict(self) -> dict:
+        data = {"name": self.name, "ms": round(self.duration * 1000, 1)}
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("vcc_span", default=None)
+_root: ContextVar[Optional[Span]] = ContextVar("vcc_trace", default=None)
+
+
+@contextmanager
+def trace(name: str = "request") -> Iterator[Span]:
+    """Collect the spans opened inside this block, including in child tasks."""
+    root = Span(name)
+    root_token = _root.set(root)
+    token = _current.set(root)
+    try:
+        yield root
+    finally:
+        root.duration = time.perf_counter() - root.start
+        _current.reset(token)
+        _root.reset(root_token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[Optional[Span]]:
+    """Time a stage of the current trace; a no-op outside ``trace``."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name)
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield child
+    finally:
+        child.duration = time.perf_counter() - child.start
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[Span]:
+    """Like ``span``, but outside ``trace`` the Span is still timed, detached."""
+    with span(name) as child:
+        own = child or Span(name)
+        try:
+            yield own
+        finally:
+            if child is None:
+                own.duration = time.perf_counter() - own.start
+
+
+def count_upstream_call() -> None:
+    root = _root.get()
+    if root is not None:
+        root.upstream_calls += 1
+
+
+def summary(root: Span) -> dict:
+    return {
+        "total_ms": round(root.duration * 1000, 1),
+        "upstream_calls": root.upstream_calls,
+        "spans": [child.to_dict() for child in root.children],
+    }
+
+
+def server_timing(root: Span) -> str:
+    """Flatten the span tree, depth first, into a Server-Timing header value."""
+    entries = [f"total;dur={root.duration * 1000:.1f}"]
+
+    def walk(spans: list[Span]) -> None:
+        for s in spans:
+            entries.append(f"{_token(s.name)};dur={s.duration * 1000:.1f}")
+            walk(s.children)
+
+    walk(root.children)
+    return ", ".join(entries)
+
+
+def _token(name: str) -> str:
+    # Server-Timing metric names are HTTP tokens
+    return re.sub(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]", "_", name)